@@ -6,6 +6,7 @@ from django.utils import timezone
 from datetime import timedelta
 from users.models import User
 from courses.models import Course, Enrollment, UserProgress, Module, ModuleProgress, Lesson 
+from courses.completion import course_completion_rates
 from assessments.models import UserAttempt
 from .models import UserActivity
 from .serializers import (
@@ -241,72 +242,12 @@ class EnrollmentAnalyticsView(APIView):
 
 class CompletionRateAnalyticsView(APIView):
     def get(self, request):
-        courses = Course.objects.filter(status='PUBLISHED')
-        completion_data = []
-        total_enrollments_all = 0
-        total_completions_all = 0
-        
-        for course in courses:
-            enrollments_count = Enrollment.objects.filter(course=course).count()
-            total_enrollments_all += enrollments_count
-            
-            if enrollments_count == 0:
-                completion_data.append({
-                    'course_id': str(course.id),
-                    'course_title': course.title,
-                    'total_enrollments': 0,
-                    'completion_rate': 0.0,
-                    'completed_enrollments': 0
-                })
-                continue
-            
-            total_lessons = Lesson.objects.filter(module__course=course).count()
-            if total_lessons == 0:
-                completion_data.append({
-                    'course_id': str(course.id),
-                    'course_title': course.title,
-                    'total_enrollments': enrollments_count,
-                    'completion_rate': 0.0,
-                    'completed_enrollments': 0
-                })
-                continue
-            
-            # Aggregated query for users who completed all lessons (100%)
-            user_completed = UserProgress.objects.filter(
-                lesson__module__course=course,
-                is_completed=True
-            ).values('user__id').annotate(
-                completed_count=Count('lesson', distinct=True)
-            ).filter(
-                completed_count=total_lessons
-            )
-            
-            completed_enrollments = user_completed.count()
-            total_completions_all += completed_enrollments
-            
-            try:
-                completion_rate = round((completed_enrollments / enrollments_count) * 100, 2) if enrollments_count > 0 else 0.0
-            except (ZeroDivisionError, TypeError):
-                completion_rate = 0.0
-            
-            completion_data.append({
-                'course_id': str(course.id),
-                'course_title': course.title,
-                'total_enrollments': enrollments_count,
-                'completion_rate': completion_rate,
-                'completed_enrollments': completed_enrollments
-            })
-        
-        try:
-            overall_rate = round((total_completions_all / total_enrollments_all) * 100, 2) if total_enrollments_all > 0 else 0.0
-        except (ZeroDivisionError, TypeError):
-            overall_rate = 0.0
-        
+        rates = course_completion_rates()
         return Response({
-            'overall_completion_rate': overall_rate,
-            'total_enrollments': total_enrollments_all,
-            'completed_enrollments': total_completions_all,
-            'completion_rates': CompletionRateSerializer(completion_data, many=True).data
+            'overall_completion_rate': rates['overall_completion_rate'],
+            'total_enrollments': rates['total_enrollments'],
+            'completed_enrollments': rates['completed_enrollments'],
+            'completion_rates': CompletionRateSerializer(rates['courses'], many=True).data
         })
 
 class QuizPerformanceAnalyticsView(APIView):
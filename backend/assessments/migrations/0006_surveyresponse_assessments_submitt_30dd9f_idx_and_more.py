@@ -0,0 +1,25 @@
+# Generated by Django 4.2.21 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0005_alter_userresponse_text_response'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='surveyresponse',
+            index=models.Index(fields=['submitted_at'], name='assessments_submitt_30dd9f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresponse',
+            index=models.Index(fields=['user', 'submitted_at'], name='assessments_user_id_8d7d94_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userattempt',
+            index=models.Index(fields=['user', 'attempt_date'], name='assessments_user_id_491e54_idx'),
+        ),
+    ]
@@ -17,9 +17,11 @@ class Question(models.Model):
     points = models.PositiveIntegerField(default=1)
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order']
+        indexes = [models.Index(fields=['lesson', 'updated_at'])]
     
     def __str__(self):
         return f"{self.lesson.title} - {self.question_text[:50]}"
@@ -30,6 +32,10 @@ class Answer(models.Model):
     answer_text = models.TextField()
     is_correct = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['question', 'updated_at'])]
     
     def __str__(self):
         return f"{self.question.question_text[:30]} - {self.answer_text[:30]}"
@@ -43,6 +49,11 @@ class UserAttempt(models.Model):
     passed = models.BooleanField(default=False)
     attempt_date = models.DateTimeField(default=timezone.now)
     completion_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'attempt_date']),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.lesson.title}"
@@ -105,6 +116,12 @@ class SurveyResponse(models.Model):
     user = models.ForeignKey('users.User', on_delete=models.CASCADE)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['submitted_at']),
+            models.Index(fields=['user', 'submitted_at']),
+        ]
+
 class SurveyAnswer(models.Model):
     response = models.ForeignKey(SurveyResponse, on_delete=models.CASCADE, related_name='answers')
     question = models.ForeignKey(SurveyQuestion, on_delete=models.CASCADE)
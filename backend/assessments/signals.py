@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from courses.models import Course, Lesson, Tombstone
+from courses.signals import bump_for_delete, course_for_delete, deleted_directly
+from .models import Question, Answer
+
+# Quiz changes are part of the course content snapshot
+@receiver(post_save, sender=Question)
+def bump_version_from_question(sender, instance, **kwargs):
+    course_id = Lesson.objects.filter(pk=instance.lesson_id).values_list('module__course_id', flat=True).first()
+    Course.bump_content_version(course_id)
+
+@receiver(post_save, sender=Answer)
+def bump_version_from_answer(sender, instance, **kwargs):
+    course_id = Question.objects.filter(pk=instance.question_id).values_list('lesson__module__course_id', flat=True).first()
+    Course.bump_content_version(course_id)
+
+@receiver(post_delete, sender=Question)
+def record_question_deletion(sender, instance, origin=None, **kwargs):
+    if deleted_directly(instance, origin):
+        course_id = course_for_delete(origin, Lesson, instance.lesson_id, 'module__course_id')
+        bump_for_delete(origin, course_id)
+        Tombstone.record('question', instance, course_id)
+
+@receiver(post_delete, sender=Answer)
+def record_answer_deletion(sender, instance, origin=None, **kwargs):
+    if deleted_directly(instance, origin):
+        course_id = course_for_delete(origin, Question, instance.question_id, 'lesson__module__course_id')
+        bump_for_delete(origin, course_id)
+        Tombstone.record('answer', instance, course_id)
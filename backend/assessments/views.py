@@ -15,8 +15,10 @@ from .serializers import (
     SurveyResponseSerializer,  SurveyQuestionSerializer 
 )
 from courses.models import Lesson, Module
+from courses.reorder import ReorderMixin
+from backend.pagination import KeysetPagination
 
-class QuestionViewSet(viewsets.ModelViewSet):
+class QuestionViewSet(ReorderMixin, viewsets.ModelViewSet):
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -24,6 +26,9 @@ class QuestionViewSet(viewsets.ModelViewSet):
         lesson_id = self.kwargs['lesson_pk']
         return Question.objects.filter(lesson_id=lesson_id).order_by('order')
 
+    def get_reorder_course_id(self):
+        return get_object_or_404(Lesson.objects.select_related('module'), pk=self.kwargs['lesson_pk']).module.course_id
+
     def perform_create(self, serializer):
         lesson = get_object_or_404(Lesson, pk=self.kwargs['lesson_pk'])
         serializer.save(lesson=lesson)
@@ -264,7 +269,7 @@ class ModuleSurveyViewSet(viewsets.ModelViewSet):
         serializer = SurveyResponseSerializer(responses, many=True)
         return Response(serializer.data)
 
-class SurveyQuestionViewSet(viewsets.ModelViewSet):
+class SurveyQuestionViewSet(ReorderMixin, viewsets.ModelViewSet):
     serializer_class = SurveyQuestionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -272,6 +277,12 @@ class SurveyQuestionViewSet(viewsets.ModelViewSet):
         survey_id = self.kwargs['survey_pk']
         return SurveyQuestion.objects.filter(survey_id=survey_id).order_by('order').prefetch_related('choices')
 
+    def get_reorder_queryset(self):
+        return SurveyQuestion.objects.filter(survey_id=self.kwargs['survey_pk'])
+
+    def get_reorder_course_id(self):
+        return get_object_or_404(Survey.objects.select_related('module'), pk=self.kwargs['survey_pk']).module.course_id
+
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
@@ -401,10 +412,18 @@ class SurveyViewSet(viewsets.ModelViewSet):
         })
 
 
+class SurveyResponsePagination(KeysetPagination):
+    ordering = ('-submitted_at', '-id')
+
+class UserAttemptPagination(KeysetPagination):
+    page_size = 50
+    ordering = ('-attempt_date', '-id')
+
 class SurveyResponseViewSet(viewsets.ModelViewSet):
     queryset = SurveyResponse.objects.all()
     serializer_class = SurveyResponseSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SurveyResponsePagination
     lookup_field = 'pk'
 
     def perform_create(self, serializer):
@@ -441,6 +460,7 @@ class SurveyResponseViewSet(viewsets.ModelViewSet):
 class UserAttemptViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = UserAttemptSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = UserAttemptPagination
 
     def get_queryset(self):
         return UserAttempt.objects.filter(
@@ -461,8 +481,9 @@ class UserAttemptViewSet(viewsets.ReadOnlyModelViewSet):
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
         data = {}
-        for idx, attempt in enumerate(queryset, start=1):
+        for idx, attempt in enumerate(page, start=1):
             data[str(idx)] = {
                 'id': str(attempt.id),
                 'score': round(attempt.score, 2),
@@ -479,10 +500,13 @@ class UserAttemptViewSet(viewsets.ReadOnlyModelViewSet):
                 }
             }
         
+        # next/previous, plus count when the paginator computed a real total
+        links = self.get_paginated_response(data).data
+        links.pop('results')
         return Response({
             'status': 'success',
             'data': data,
-            'count': len(data)
+            **links
         })
 
 class UserAttemptsListView(APIView):
@@ -0,0 +1,110 @@
+"""
+Resized derivatives of uploaded images (course thumbnails, profile images).
+
+Each source image is decoded once, EXIF orientation is applied and the
+metadata dropped, and every width is written as WebP and JPEG next to the
+original under a `derived/` folder. The result is stored on the model as
+
+    {'source': <original name>, 'sizes': {'320': {'webp': <name>, 'jpeg': <name>}, ...}}
+
+so serializers can list the variants without touching storage. A source
+that cannot be read is recorded with empty sizes and an `error`, so it is
+not decoded again on every save; generate_image_derivatives --force retries.
+
+Variant names keep the whole source file name and storage picks a free name
+for each, so two sources never share a variant. Only the variants recorded
+on an instance are deleted, when its image changes.
+"""
+import os
+import tempfile
+from django.core.files import File
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+AVATAR_WIDTHS = (64, 128, 256)
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Encoded variants larger than this spill from memory to a temporary file
+SPOOL_SIZE = 1024 * 1024
+
+
+def _derived_name(name, width, extension):
+    folder, filename = os.path.split(name)
+    return os.path.join(folder, 'derived', f'{filename}_{width}.{extension}')
+
+
+def make_derivatives(field_file, widths, storage=default_storage):
+    """Write every width of `field_file` to storage and return the variants dict"""
+    sizes = {}
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        # Let the JPEG decoder downscale while decoding when the source is much larger
+        image.draft('RGB', (max(widths), max(widths) * 4))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        # Never upscale; a small source still gets its own size as one variant
+        targets = sorted({min(width, image.width) for width in widths})
+        for width in targets:
+            resized = image if width == image.width else image.resize(
+                (width, max(round(image.height * width / image.width), 1)), Image.LANCZOS
+            )
+            variant = {}
+            for extension, (format_name, options) in FORMATS.items():
+                frame = resized.convert('RGB') if format_name == 'JPEG' else resized
+                with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as buffer:
+                    # No exif= argument, so no metadata is carried over
+                    frame.save(buffer, format_name, **options)
+                    buffer.seek(0)
+                    name = _derived_name(field_file.name, width, extension)
+                    variant[extension] = storage.save(name, File(buffer, name=name))
+            sizes[str(width)] = variant
+    return {'source': field_file.name, 'sizes': sizes}
+
+
+def delete_derivatives(variants, storage=default_storage):
+    for variant in (variants or {}).get('sizes', {}).values():
+        for name in variant.values():
+            if storage.exists(name):
+                storage.delete(name)
+
+
+def refresh_derivatives(instance, image_field, variants_field, widths, force=False):
+    """
+    Regenerate the derivatives of `instance.<image_field>` if the image file
+    changed since they were made (or always with `force`), and delete the
+    variants they replace. Returns True when the variants were updated.
+    """
+    field_file = getattr(instance, image_field)
+    old_variants = getattr(instance, variants_field) or {}
+    if field_file and old_variants.get('source') == field_file.name and not force:
+        return False
+    if not field_file and not old_variants:
+        return False
+
+    try:
+        variants = make_derivatives(field_file, widths) if field_file else {}
+    except (OSError, Image.DecompressionBombError) as e:
+        # Missing or unreadable image: keep serving the original
+        variants = {'source': field_file.name, 'sizes': {}, 'error': str(e)[:200]}
+    setattr(instance, variants_field, variants)
+    type(instance).objects.filter(pk=instance.pk).update(**{variants_field: variants})
+    delete_derivatives(old_variants)
+    return True
+
+
+def variant_urls(variants, request=None):
+    """{width: {format: url}} for the stored variants dict"""
+    urls = {}
+    for width, variant in (variants or {}).get('sizes', {}).items():
+        urls[width] = {}
+        for extension, name in variant.items():
+            url = default_storage.url(name)
+            urls[width][extension] = request.build_absolute_uri(url) if request else url
+    return urls
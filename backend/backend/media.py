@@ -0,0 +1,163 @@
+"""
+Serving of uploaded media (lesson PDFs, course thumbnails, profile images).
+
+Files are served with byte-range support, ETag/Last-Modified validators and
+conditional requests, so PDF viewers can fetch just the pages they show.
+
+With MEDIA_SERVE_MODE set to 'x-accel-redirect' (nginx) or 'x-sendfile'
+(Apache/lighttpd) Django only performs the permission check and the front
+proxy transfers the file. For nginx, MEDIA_ACCEL_PREFIX must be an internal
+location aliased to MEDIA_ROOT, e.g.
+
+    location /protected-media/ {
+        internal;
+        alias /srv/elearning/backend/media/;
+    }
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _authenticated_user(request):
+    """The session user, or the user of a JWT bearer token"""
+    if request.user.is_authenticated:
+        return request.user
+
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def has_media_permission(request, path):
+    """Files under a MEDIA_PROTECTED_PREFIXES prefix are only served to signed-in users"""
+    if any(path.startswith(prefix) for prefix in getattr(settings, 'MEDIA_PROTECTED_PREFIXES', [])):
+        return _authenticated_user(request) is not None
+    return True
+
+
+def _file_range(request, size, etag, last_modified):
+    """
+    The (start, end) byte range requested, both inclusive, None to send the
+    whole file, or False when the range cannot be satisfied.
+    """
+    header = request.META.get('HTTP_RANGE', '').replace(' ', '')
+    if not header:
+        return None
+
+    # A stale If-Range means the client's partial copy is out of date
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        date = parse_http_date_safe(if_range)
+        if date is None or date < int(last_modified):
+            return None
+
+    # Multiple ranges are rare for media; answering with the whole file is allowed
+    match = RANGE_RE.match(header)
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve(request, path):
+    """Serve a file from MEDIA_ROOT after the permission check"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except (ValueError, SuspiciousFileOperation):
+        raise Http404('File not found')
+    try:
+        info = os.stat(full_path)
+    except OSError:
+        raise Http404('File not found')
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404('File not found')
+
+    if not has_media_permission(request, path):
+        return HttpResponse('Authentication required', status=401)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+
+    size = info.st_size
+    last_modified = info.st_mtime
+    etag = f'"{info.st_mtime_ns:x}-{size:x}"'
+
+    # 304 Not Modified / 412 Precondition Failed
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:
+        return conditional
+
+    byte_range = _file_range(request, size, etag, last_modified)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        response = StreamingHttpResponse(_read(full_path, 0, size), content_type=content_type)
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read(full_path, start, end - start + 1), content_type=content_type, status=206
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination over a stable, indexed ordering.
+
+    Pages are fetched with `WHERE <ordering field> < <cursor position>`
+    instead of OFFSET, and no COUNT(*) is issued unless the client asks
+    for it with ?include_count=true.
+
+    Clients that still need page numbers can pass ?page=<n> or
+    ?pagination=page to get the regular page-number response.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    page_number_class = StandardResultsSetPagination
+
+    def use_page_numbers(self, request):
+        return (
+            request.query_params.get('pagination') == 'page'
+            or self.page_number_class.page_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_number_paginator = None
+        self.count = None
+
+        if self.use_page_numbers(request):
+            self.page_number_paginator = self.page_number_class()
+            self.page_number_paginator.page_size = self.page_size
+            self.page_number_paginator.max_page_size = self.max_page_size
+            ordering = self.get_ordering(request, queryset, view)
+            return self.page_number_paginator.paginate_queryset(
+                queryset.order_by(*ordering), request, view
+            )
+
+        if request.query_params.get('include_count') in ('1', 'true'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_next_link(self):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_previous_link()
+        return super().get_previous_link()
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+
+        fields = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ]
+        if self.count is not None:
+            fields.insert(0, ('count', self.count))
+        return Response(OrderedDict(fields + [('results', data)]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return schema
@@ -168,6 +168,14 @@ CORS_ALLOW_CREDENTIALS = True
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# 'django' streams files itself; 'x-accel-redirect' (nginx) and 'x-sendfile'
+# (Apache/lighttpd) hand the transfer to the front proxy after the permission check
+MEDIA_SERVE_MODE = config('MEDIA_SERVE_MODE', default='django')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Seconds between writes of buffered lesson resume positions
+RESUME_FLUSH_SECONDS = config('RESUME_FLUSH_SECONDS', default=30, cast=int)
+# Media path prefixes only served to signed-in users, e.g. lesson_pdfs/
+MEDIA_PROTECTED_PREFIXES = config('MEDIA_PROTECTED_PREFIXES', default='', cast=Csv())
 
 # Authentication
 AUTH_USER_MODEL = 'users.User'
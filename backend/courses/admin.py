@@ -1,11 +1,15 @@
 from django.contrib import admin
 from django.http import HttpResponse
 from django.urls import path
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponseRedirect
 from django.contrib import messages
 from django.utils import timezone
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Q
 import pandas as pd
+import io
 from .models import (
     CourseCategory,
     Course,
@@ -14,72 +18,41 @@ from .models import (
     LessonSection,
     UserProgress,
     Enrollment,
-    ModuleProgress
+    ModuleProgress,
+    BackgroundJob
 )
 from users.models import User
-import random
-import string
+from .jobs import enqueue, fail_stale
+from . import progress_import
 
-def migrate_lesson_completions(modeladmin, request, queryset):
+# Error rows kept in the session for the bulk enrollment report download
+BULK_ENROLL_REPORT_ROWS = 1000
+
+def run_lesson_completion_migration(job):
+    """Background job body: run the migrate_lesson_completions command against `job`"""
+    call_command('migrate_lesson_completions', job=str(job.pk), stdout=io.StringIO())
+    job.refresh_from_db()
+    return job.result
+
+def enqueue_lesson_completion_migration(request):
     """
-    Admin action to migrate lesson completions based on module completions
+    Queue the migrate_lesson_completions command in the background.
+
+    An unfinished earlier run is resumed from its checkpoint rather than
+    started again; a run that is still going is left alone unless it has
+    stopped reporting progress, in which case it is resumed too.
     """
-    try:
-        completed_modules = ModuleProgress.objects.filter(is_completed=True)
-        stats = {
-            'total_module_completions': completed_modules.count(),
-            'lessons_processed': 0,
-            'users_processed': 0
-        }
-        
-        user_cache = set()
-        
-        for module_progress in completed_modules:
-            user = module_progress.user
-            module = module_progress.module
-            completed_at = module_progress.completed_at or timezone.now()
-            
-            # Get all lessons in this module
-            lessons = Lesson.objects.filter(module=module)
-            
-            for lesson in lessons:
-                UserProgress.objects.update_or_create(
-                    user=user,
-                    lesson=lesson,
-                    defaults={
-                        'is_completed': True,
-                        'completed_at': completed_at
-                    }
-                )
-                stats['lessons_processed'] += 1
-            
-            if user.id not in user_cache:
-                user_cache.add(user.id)
-                stats['users_processed'] += 1
-        
-        # Show success message
-        modeladmin.message_user(
-            request,
-            f"✅ Successfully migrated lesson completions! "
-            f"Processed {stats['lessons_processed']} lessons for {stats['users_processed']} users "
-            f"based on {stats['total_module_completions']} module completions.",
-            messages.SUCCESS
-        )
-        
-    except Exception as e:
-        modeladmin.message_user(
-            request,
-            f"❌ Error during migration: {str(e)}",
-            messages.ERROR
+    job = BackgroundJob.objects.filter(kind='LESSON_COMPLETION_MIGRATION').exclude(status='COMPLETED').first()
+    if job is None:
+        job = BackgroundJob.objects.create(
+            kind='LESSON_COMPLETION_MIGRATION',
+            stage='Queued',
+            created_by=request.user
         )
-
-# Add description for the admin action
-migrate_lesson_completions.short_description = "📊 Migrate lesson completions from module completions"
-
-def generate_random_password(length=12):
-    """Generate a random password"""
-    characters = string.ascii_letters + string.digits + string.punctuation
-    return ''.join(random.choice(characters) for i in range(length))
+    elif job.status == 'RUNNING' and not job.is_stale:
+        return job
+    enqueue(job, run_lesson_completion_migration)
+    return job
 
 @admin.register(CourseCategory)
 class CourseCategoryAdmin(admin.ModelAdmin):
@@ -103,62 +76,55 @@ class CourseAdmin(admin.ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('bulk-enroll/', self.admin_site.admin_view(self.bulk_enroll_view), name='courses_course_bulk_enroll'),
+            path('bulk-enroll/report/', self.admin_site.admin_view(self.bulk_enroll_report_view), name='courses_course_bulk_enroll_report'),
             path('export-enrollment-template/', self.admin_site.admin_view(self.export_enrollment_template_view), name='courses_course_export_template'),
         ]
         return custom_urls + urls
 
     def bulk_enroll_view(self, request):
         """Handle bulk enrollment from Excel"""
+        summary = None
         if request.method == 'POST' and request.FILES.get('excel_file'):
             excel_file = request.FILES['excel_file']
             course_id = request.POST.get('course_id')
+            dry_run = bool(request.POST.get('dry_run'))
             
             try:
                 course = Course.objects.get(id=course_id)
-                df = pd.read_excel(excel_file)
-                enrolled_count = 0
-                errors = []
-                
-                for index, row in df.iterrows():
-                    try:
-                        user_email = row.get('user_email', '').strip()
-                        user_id = row.get('user_id', '')
-                        
-                        if user_email:
-                            user = User.objects.get(email=user_email)
-                        elif user_id:
-                            user = User.objects.get(id=user_id)
-                        else:
-                            errors.append(f"Row {index+1}: No user identifier provided")
-                            continue
-                        
-                        enrollment, created = Enrollment.objects.get_or_create(
-                            user=user,
-                            course=course
-                        )
-                        if created:
-                            enrolled_count += 1
-                            
-                    except User.DoesNotExist:
-                        errors.append(f"Row {index+1}: User not found")
-                    except Exception as e:
-                        errors.append(f"Row {index+1}: {str(e)}")
-                
-                if errors:
-                    self.message_user(
-                        request,
-                        f'Enrolled {enrolled_count} users. Errors: {len(errors)}',
-                        level='warning'
-                    )
-                    # Store errors in session to display
-                    request.session['bulk_operation_errors'] = errors[:10]
+                df = pd.read_excel(excel_file, dtype=str)
+                df, new_user_ids, summary = self._plan_bulk_enrollment(df, course)
+
+                errors = df[df['error'] != '']
+                # Sessions live in the database; keep the stored report bounded
+                request.session['bulk_enroll_report'] = (
+                    errors[['row', 'user_email', 'user_id', 'error']].head(BULK_ENROLL_REPORT_ROWS).values.tolist()
+                )
+                if len(errors):
+                    request.session['bulk_operation_errors'] = [
+                        f"Row {row}: {error}" for row, error in errors[['row', 'error']].values[:10]
+                    ]
                 else:
-                    self.message_user(
-                        request,
-                        f'Successfully enrolled {enrolled_count} users in {course.title}'
-                    )
-                
-                return redirect('admin:courses_course_changelist')
+                    request.session.pop('bulk_operation_errors', None)
+
+                if dry_run:
+                    summary['course'] = course
+                else:
+                    from notifications.signals import create_enrollment_notifications
+                    with transaction.atomic():
+                        created = Enrollment.enroll_many((user_id, course.id) for user_id in new_user_ids)
+                        create_enrollment_notifications((user_id, course) for user_id, _ in created)
+
+                    if len(errors):
+                        message = f'Enrolled {len(created)} users. Errors: {len(errors)}'
+                        if len(errors) > BULK_ENROLL_REPORT_ROWS:
+                            message += f' (the error report lists the first {BULK_ENROLL_REPORT_ROWS})'
+                        self.message_user(request, message, level='warning')
+                    else:
+                        self.message_user(
+                            request,
+                            f'Successfully enrolled {len(created)} users in {course.title}'
+                        )
+                    return redirect('admin:courses_course_changelist')
                     
             except Exception as e:
                 self.message_user(
@@ -172,10 +138,84 @@ class CourseAdmin(admin.ModelAdmin):
         context = {
             'title': 'Bulk Enroll Users',
             'courses': courses,
+            'summary': summary,
             'opts': self.model._meta,
         }
         return render(request, 'admin/courses/bulk_enroll_upload.html', context)
 
+    def _plan_bulk_enrollment(self, df, course):
+        """
+        Work out which spreadsheet rows need a new enrollment in `course`.
+
+        Returns the annotated frame (with `row` and `error` columns), the ids of
+        users to enroll and a summary of counts. Runs two queries regardless of
+        the number of rows.
+        """
+        df = df.reindex(columns=['user_email', 'user_id']).fillna('')
+        df['row'] = df.index + 2  # spreadsheet row, after the header
+        df['user_email'] = df['user_email'].str.strip().str.lower()
+        df['user_id'] = df['user_id'].str.strip().str.lower()
+        df['error'] = ''
+
+        # Email wins over user id, as before
+        user_hex = df['user_id'].str.replace('-', '', regex=False)
+        has_email = df['user_email'] != ''
+        valid_id = user_hex.str.fullmatch(r'[0-9a-f]{32}')
+        df['key'] = df['user_email'].where(has_email, user_hex.where(valid_id, ''))
+
+        df.loc[~has_email & (df['user_id'] == ''), 'error'] = 'No user identifier provided'
+        df.loc[~has_email & (df['user_id'] != '') & ~valid_id, 'error'] = 'Invalid user ID'
+
+        pending = df['error'] == ''
+        duplicate = pending & df.duplicated('key')
+        pending &= ~duplicate
+
+        keys = df.loc[pending, 'key']
+        users = User.objects.filter(
+            Q(email__in=keys[has_email].tolist()) | Q(id__in=keys[~has_email].tolist())
+        ).values_list('id', 'email')
+        lookup = {}
+        for user_id, email in users:
+            lookup[email.lower()] = user_id
+            lookup[user_id.hex] = user_id
+        df['resolved'] = df['key'].map(lookup)
+
+        not_found = pending & df['resolved'].isna()
+        df.loc[not_found, 'error'] = 'User not found'
+        pending &= ~not_found
+
+        # The same user may be listed once by email and once by id
+        duplicate |= pending & df.duplicated('resolved')
+        pending &= ~duplicate
+
+        resolved = df.loc[pending, 'resolved'].tolist()
+        enrolled = set(
+            Enrollment.objects.filter(course=course, user_id__in=resolved).values_list('user_id', flat=True)
+        )
+        new_user_ids = [user_id for user_id in resolved if user_id not in enrolled]
+
+        summary = {
+            'rows': len(df),
+            'duplicates': int(duplicate.sum()),
+            'errors': int((df['error'] != '').sum()),
+            'already_enrolled': len(resolved) - len(new_user_ids),
+            'to_enroll': len(new_user_ids),
+        }
+        return df, new_user_ids, summary
+
+    def bulk_enroll_report_view(self, request):
+        """Download the errors from the last bulk enrollment upload"""
+        df = pd.DataFrame(
+            request.session.get('bulk_enroll_report', []),
+            columns=['row', 'user_email', 'user_id', 'error']
+        )
+
+        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        response['Content-Disposition'] = 'attachment; filename="bulk_enrollment_errors.xlsx"'
+
+        df.to_excel(response, index=False)
+        return response
+
     def export_enrollment_template_view(self, request):
         """Export Excel template for bulk enrollment"""
         df = pd.DataFrame(columns=[
@@ -376,8 +416,8 @@ class UserProgressAdmin(admin.ModelAdmin):
         Handle the migration via a dedicated admin view
         """
         if request.method == 'POST':
-            migrate_lesson_completions(self, request, UserProgress.objects.all())
-            return HttpResponseRedirect('../../')
+            job = enqueue_lesson_completion_migration(request)
+            return redirect('admin:courses_moduleprogress_import_status', job_id=job.id)
         
         completed_modules_count = ModuleProgress.objects.filter(is_completed=True).count()
         context = {
@@ -407,6 +447,7 @@ class ModuleProgressAdmin(admin.ModelAdmin):
             path('export-module-progress-template/', self.admin_site.admin_view(self.export_module_progress_template_view), name='courses_moduleprogress_export_template'),
             path('migrate-lesson-completions/', self.admin_site.admin_view(self.migrate_lesson_completions_view), name='courses_moduleprogress_migrate_lessons'),
             path('verify-migration/', self.admin_site.admin_view(self.verify_migration_view), name='courses_moduleprogress_verify_migration'),
+            path('import-status/<uuid:job_id>/', self.admin_site.admin_view(self.import_status_view), name='courses_moduleprogress_import_status'),
         ]
         return custom_urls + urls
    
@@ -416,9 +457,8 @@ class ModuleProgressAdmin(admin.ModelAdmin):
         Handle the migration via a dedicated admin view
         """
         if request.method == 'POST':
-            # Call the migration function without queryset parameter
-            self.migrate_lesson_completions_action(request)
-            return HttpResponseRedirect('../../')
+            job = enqueue_lesson_completion_migration(request)
+            return redirect('admin:courses_moduleprogress_import_status', job_id=job.id)
         
         # Show confirmation page
         completed_modules_count = ModuleProgress.objects.filter(is_completed=True).count()
@@ -429,95 +469,6 @@ class ModuleProgressAdmin(admin.ModelAdmin):
         }
         return render(request, 'admin/courses/migrate_lesson_completions_confirm.html', context)
 
-    def migrate_lesson_completions_action(self, request):
-        """
-        Separate method for the migration logic that can be called from both actions and views
-        """
-        try:
-            completed_modules = ModuleProgress.objects.filter(is_completed=True)
-            stats = {
-                'total_module_completions': completed_modules.count(),
-                'lessons_processed': 0,
-                'users_processed': 0,
-                'created_count': 0,
-                'updated_count': 0,
-                'errors': []
-            }
-            
-            user_cache = set()
-            
-            for module_progress in completed_modules:
-                try:
-                    user = module_progress.user
-                    module = module_progress.module
-                    completed_at = module_progress.completed_at or timezone.now()
-                    
-                    # Get all lessons in this module
-                    lessons = Lesson.objects.filter(module=module)
-                    
-                    for lesson in lessons:
-                        try:
-                            # Use update_or_create to ensure the record is properly set
-                            user_progress, created = UserProgress.objects.update_or_create(
-                                user=user,
-                                lesson=lesson,
-                                defaults={
-                                    'is_completed': True,
-                                    'completed_at': completed_at
-                                }
-                            )
-                            
-                            if created:
-                                stats['created_count'] += 1
-                            else:
-                                # Check if we actually updated an incomplete record
-                                if not user_progress.is_completed:
-                                    stats['updated_count'] += 1
-                            
-                            stats['lessons_processed'] += 1
-                            
-                        except Exception as e:
-                            stats['errors'].append(f"Error processing lesson {lesson.id} for user {user.email}: {str(e)}")
-                            continue
-                    
-                    if user.id not in user_cache:
-                        user_cache.add(user.id)
-                        stats['users_processed'] += 1
-                        
-                except Exception as e:
-                    stats['errors'].append(f"Error processing module {module_progress.id}: {str(e)}")
-                    continue
-            
-            # Show detailed success message
-            message = (
-                f"✅ Migration completed!\n"
-                f"• Processed {stats['lessons_processed']} lessons\n"
-                f"• Affected {stats['users_processed']} users\n"
-                f"• Based on {stats['total_module_completions']} module completions\n"
-                f"• Created {stats['created_count']} new records\n"
-                f"• Updated {stats['updated_count']} existing records\n"
-            )
-            
-            if stats['errors']:
-                message += f"• {len(stats['errors'])} errors occurred"
-            
-            self.message_user(
-                request,
-                message,
-                messages.SUCCESS if not stats['errors'] else messages.WARNING
-            )
-            
-            # Log errors for debugging
-            for error in stats['errors'][:5]:
-                self.message_user(request, f"Error: {error}", messages.ERROR)
-            
-        except Exception as e:
-            self.message_user(
-                request,
-                f"❌ Critical error during migration: {str(e)}",
-                messages.ERROR
-            )
-
     def verify_migration_view(self, request):
         """
         Verify that lesson completions match module completions
@@ -576,162 +527,30 @@ class ModuleProgressAdmin(admin.ModelAdmin):
             excel_file = request.FILES['excel_file']
             
             try:
-                df = pd.read_excel(excel_file)
-                updated_count = 0
-                user_created_count = 0
-                enrollment_count = 0
-                errors = []
-                
+                df = pd.read_excel(excel_file, dtype=str)
+                if len(df.columns) < 4:
+                    raise ValueError('Expected No., NAME, EMAIL ADDRESS and PHONE NUMBER columns')
+
                 # Get the target course for enrollment
-                target_course_id = '8960c8009c79401ba38ce11b9eced6e9'
-                try:
-                    target_course = Course.objects.get(id=target_course_id)
-                except Course.DoesNotExist:
-                    errors.append(f"Target course with ID {target_course_id} not found")
-                    self.message_user(request, f"Error: {errors[0]}", level='error')
-                    return redirect('admin:courses_moduleprogress_changelist')
-                
-                # Get all module IDs from columns (skip first 4 columns: No, NAME, EMAIL ADDRESS, PHONE NUMBER)
-                module_columns = df.columns[4:]  # Skip first 4 columns (No., NAME, EMAIL ADDRESS, PHONE NUMBER)
-                
-                for index, row in df.iterrows():
-                    try:
-                        user_email = str(row.iloc[2]).strip().lower()  # EMAIL ADDRESS is 3rd column (index 2)
-                        user_name = str(row.iloc[1]).strip()  # NAME is 2nd column (index 1)
-                        phone_number = str(row.iloc[3]).strip()  # PHONE NUMBER is 4th column (index 3)
-                        
-                        if not user_email or user_email.lower() == 'nan' or user_email == 'email address':
-                            continue  # Skip header rows or empty emails
-                        
-                        # Try to find user by email
-                        try:
-                            user = User.objects.get(email__iexact=user_email)
-                        except User.DoesNotExist:
-                            # Create new user
-                            try:
-                                # Split name into first and last name
-                                name_parts = user_name.split(' ', 1)
-                                first_name = name_parts[0] if name_parts else user_name
-                                last_name = name_parts[1] if len(name_parts) > 1 else 'User'
-                                
-                                # Generate random password
-                                temp_password = generate_random_password()
-                                
-                                # Create user with minimal required fields
-                                user = User.objects.create_user(
-                                    email=user_email,
-                                    password=temp_password,
-                                    first_name=first_name,
-                                    last_name=last_name,
-                                    phone=phone_number,
-                                    gender='Other',  # Default value
-                                    date_of_birth='1900-01-01',  # Default value
-                                    county='Unknown',  # Default value
-                                    education='Not specified',  # Default value
-                                    role='LEARNER',
-                                    is_verified=True,  # Auto-verify since we're creating via admin
-                                    force_password_change=True  # Force password change on first login
-                                )
-                                
-                                user_created_count += 1
-                                errors.append(f"Row {index+1}: Created new user '{user_email}' with temporary password")
-                                
-                            except Exception as e:
-                                errors.append(f"Row {index+1}: Failed to create user '{user_email}' - {str(e)}")
-                                continue
-                        
-                        # Enroll user in the target course if not already enrolled
-                        try:
-                            enrollment, created = Enrollment.objects.get_or_create(
-                                user=user,
-                                course=target_course
-                            )
-                            if created:
-                                enrollment_count += 1
-                        except Exception as e:
-                            errors.append(f"Row {index+1}: Failed to enroll user '{user_email}' in course - {str(e)}")
-                        
-                        # Process each module column
-                        for module_id_col in module_columns:
-                            cell_value = str(row[module_id_col])
-                            
-                            # Skip empty cells
-                            if pd.isna(row[module_id_col]) or cell_value.lower() == 'nan' or not cell_value.strip():
-                                continue
-                            
-                            # Check if cell contains completion data
-                            if 'completed' in cell_value.lower():
-                                try:
-                                    # Clean the module ID - remove any non-alphanumeric characters except hyphens
-                                    clean_module_id = str(module_id_col).strip()
-                                    
-                                    # Fix common UUID formatting issues
-                                    # Remove any whitespace
-                                    clean_module_id = clean_module_id.replace(' ', '')
-                                    
-                                    # If UUID is missing characters, try to pad it (this is a workaround)
-                                    if len(clean_module_id) == 31 and '-' not in clean_module_id:
-                                        # Try adding a character at the end (this might not be accurate)
-                                        clean_module_id = clean_module_id + '0'
-                                    
-                                    # Extract date from "completed YYYY-MM-DD"
-                                    date_str = cell_value.lower().replace('completed', '').strip()
-                                    try:
-                                        completed_date = pd.to_datetime(date_str)
-                                    except:
-                                        # If date parsing fails, use current date
-                                        completed_date = timezone.now()
-                                    
-                                    try:
-                                        module = Module.objects.get(id=clean_module_id)
-                                        
-                                        progress, created = ModuleProgress.objects.update_or_create(
-                                            user=user,
-                                            module=module,
-                                            defaults={
-                                                'is_completed': True,
-                                                'completed_at': completed_date
-                                            }
-                                        )
-                                        updated_count += 1
-                                        
-                                    except Module.DoesNotExist:
-                                        errors.append(f"Row {index+1}: Module '{clean_module_id}' not found in database")
-                                    except ValueError as e:
-                                        if 'invalid UUID' in str(e):
-                                            errors.append(f"Row {index+1}: Invalid UUID format '{clean_module_id}' - {str(e)}")
-                                        else:
-                                            errors.append(f"Row {index+1}: Error with module '{clean_module_id}' - {str(e)}")
-                                    
-                                except Exception as e:
-                                    errors.append(f"Row {index+1}: Error processing module '{module_id_col}' - {str(e)}")
-                            
-                    except Exception as e:
-                        errors.append(f"Row {index+1}: General error - {str(e)}")
-                
-                # Show success message with summary
-                success_message = f"""
-                Bulk update completed:
-                - Created {user_created_count} new users
-                - Enrolled {enrollment_count} users in course
-                - Updated {updated_count} module progress records
-                """
-                
-                if errors:
-                    self.message_user(
-                        request,
-                        f'{success_message} {len(errors)} errors occurred.',
-                        level='warning'
-                    )
-                    # Store only first 20 errors to avoid session size issues
-                    request.session['bulk_operation_errors'] = errors[:20]
-                else:
+                if not Course.objects.filter(id=progress_import.TARGET_COURSE_ID).exists():
                     self.message_user(
                         request,
-                        success_message
+                        f"Error: Target course with ID {progress_import.TARGET_COURSE_ID} not found",
+                        level='error'
                     )
-                
-                return redirect('admin:courses_moduleprogress_changelist')
+                    return redirect('admin:courses_moduleprogress_changelist')
+
+                # Parse and validate the whole sheet now; the writes run in the background
+                staged = progress_import.stage_sheet(df)
+                job = BackgroundJob.objects.create(
+                    kind='MODULE_PROGRESS_IMPORT',
+                    stage='Queued',
+                    total=len(staged['completions']),
+                    created_by=request.user
+                )
+                enqueue(job, progress_import.import_module_progress, staged)
+                request.session.pop('bulk_operation_errors', None)
+                return redirect('admin:courses_moduleprogress_import_status', job_id=job.id)
                     
             except Exception as e:
                 self.message_user(
@@ -746,6 +565,18 @@ class ModuleProgressAdmin(admin.ModelAdmin):
         }
         return render(request, 'admin/courses/bulk_module_progress_upload.html', context)
 
+    def import_status_view(self, request, job_id):
+        """Progress page for a module progress import; refreshes itself until the job finishes"""
+        # An import whose worker died stays RUNNING; it cannot be resumed, so fail it
+        fail_stale('MODULE_PROGRESS_IMPORT')
+        job = get_object_or_404(BackgroundJob, id=job_id)
+        context = {
+            'title': job.get_kind_display(),
+            'job': job,
+            'opts': self.model._meta,
+        }
+        return render(request, 'admin/courses/background_job_status.html', context)
+
     def export_module_progress_template_view(self, request):
         """Export Excel template for bulk module progress update in the new format"""
         # Get some example modules
@@ -776,4 +607,17 @@ class ModuleProgressAdmin(admin.ModelAdmin):
         response['Content-Disposition'] = 'attachment; filename="module_progress_template_new_format.xlsx"'
         
         df.to_excel(response, index=False)
-        return response
\ No newline at end of file
+        return response
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'stage', 'processed', 'total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = [field.name for field in BackgroundJob._meta.fields]
+
+    def changelist_view(self, request, extra_context=None):
+        fail_stale('MODULE_PROGRESS_IMPORT')
+        return super().changelist_view(request, extra_context)
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,315 @@
+"""
+Course bundles: a zip that carries one course between environments.
+
+    manifest.json            format version, course fields, row counts
+    modules.jsonl ...        one JSON object per row, one file per level
+    files/<storage name>     thumbnail and lesson PDFs
+
+Rows keep their original ids; import assigns new ones and remaps every
+foreign key. Export streams the zip from database iterators and storage
+chunks, and import streams rows and files back, inserting each level with
+bulk_create inside one transaction, so neither side holds the whole
+course or any whole file in memory.
+"""
+import io
+import json
+import uuid
+import zipfile
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+from .models import Course, CourseCategory, Module, Lesson, LessonSection
+from .rendering import render_instance, RENDERED_FIELDS
+from . import search
+
+FORMAT = 'course-bundle'
+FORMAT_VERSION = 1
+BATCH_SIZE = 500
+# Not carried over: recomputed or reset on import
+SKIPPED_FIELDS = {'created_at', 'updated_at', *RENDERED_FIELDS}
+
+
+class BundleError(Exception):
+    pass
+
+
+def _levels():
+    """(name, model, parent fields, queryset for a course) from parents to children"""
+    from assessments.models import Question, Answer, Survey, SurveyQuestion, SurveyChoice
+
+    return [
+        ('modules', Module, ['course_id'], lambda course: Module.objects.filter(course=course)),
+        ('lessons', Lesson, ['module_id'], lambda course: Lesson.objects.filter(module__course=course)),
+        ('sections', LessonSection, ['lesson_id', 'parent_section_id'], None),
+        ('questions', Question, ['lesson_id'], lambda course: Question.objects.filter(lesson__module__course=course)),
+        ('answers', Answer, ['question_id'], lambda course: Answer.objects.filter(question__lesson__module__course=course)),
+        ('surveys', Survey, ['module_id'], lambda course: Survey.objects.filter(module__course=course)),
+        ('survey_questions', SurveyQuestion, ['survey_id'],
+         lambda course: SurveyQuestion.objects.filter(survey__module__course=course)),
+        ('survey_choices', SurveyChoice, ['question_id'],
+         lambda course: SurveyChoice.objects.filter(question__survey__module__course=course)),
+    ]
+
+
+def _fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if field.name not in SKIPPED_FIELDS
+    ]
+
+
+def _sections(course):
+    """Sections level by level, so parents always come before their children"""
+    level = LessonSection.objects.filter(lesson__module__course=course, parent_section__isnull=True)
+    while True:
+        ids = []
+        for section in level.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+            ids.append(section.pk)
+            yield section
+        if not ids:
+            return
+        level = LessonSection.objects.filter(parent_section_id__in=ids)
+
+
+def _row(instance, fields, files):
+    row = {}
+    for field in fields:
+        value = getattr(instance, field.attname)
+        if field.get_internal_type() in ('FileField', 'ImageField'):
+            name = value.name if value else ''
+            if name:
+                files.append(name)
+                value = f'files/{name}'
+            else:
+                value = None
+        row[field.attname] = value
+    return row
+
+
+class _Pipe(io.RawIOBase):
+    """Write-only sink that hands written bytes to a streaming response"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def export_course(course, chunk_size=64 * 1024):
+    """Yield the bytes of a bundle for `course`"""
+    pipe = _Pipe()
+    files = []
+    counts = {}
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        for name, model, _, queryset in _levels():
+            fields = _fields(model)
+            rows = _sections(course) if name == 'sections' else queryset(course).order_by('pk').iterator(chunk_size=BATCH_SIZE)
+            counts[name] = 0
+            with bundle.open(f'{name}.jsonl', 'w', force_zip64=True) as out:
+                for instance in rows:
+                    out.write(json.dumps(_row(instance, fields, files), cls=DjangoJSONEncoder).encode() + b'\n')
+                    counts[name] += 1
+                    if counts[name] % BATCH_SIZE == 0:
+                        yield pipe.drain()
+            yield pipe.drain()
+
+        course_row = _row(course, [course._meta.get_field(f) for f in ('title', 'description', 'duration_hours', 'thumbnail')], files)
+        course_row['category'] = course.category.name if course.category_id else None
+        bundle.writestr('manifest.json', json.dumps({
+            'format': FORMAT,
+            'version': FORMAT_VERSION,
+            'source_id': str(course.id),
+            'course': course_row,
+            'counts': counts,
+        }, cls=DjangoJSONEncoder, indent=2))
+
+        for name in dict.fromkeys(files):
+            try:
+                source = default_storage.open(name, 'rb')
+            except OSError:
+                continue
+            with source, bundle.open(f'files/{name}', 'w', force_zip64=True) as out:
+                for chunk in iter(lambda: source.read(chunk_size), b''):
+                    out.write(chunk)
+                    yield pipe.drain()
+    yield pipe.drain()
+
+
+class _Importer:
+    def __init__(self, bundle, created_by):
+        self.bundle = bundle
+        self.created_by = created_by
+        self.ids = {}
+        self.int_pks = {}
+        self.saved_files = []
+
+    def rows(self, name):
+        try:
+            source = self.bundle.open(f'{name}.jsonl')
+        except KeyError:
+            return
+        with io.TextIOWrapper(source, encoding='utf-8') as lines:
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    raise BundleError(f"{name}.jsonl line {number} is not valid JSON")
+                if not isinstance(row, dict):
+                    raise BundleError(f"{name}.jsonl line {number} is not an object")
+                yield row
+
+    def file(self, path):
+        """Stream a bundled file into storage and return its new name"""
+        if not path:
+            return None
+        if not path.startswith('files/') or path not in self.bundle.NameToInfo:
+            raise BundleError(f"Missing file {path}")
+        with self.bundle.open(path) as source:
+            name = default_storage.save(path[len('files/'):], File(source, name=path))
+        self.saved_files.append(name)
+        return name
+
+    def build(self, model, row, parent_fields):
+        fields = {field.attname: field for field in _fields(model)}
+        data = {}
+        for attname, value in row.items():
+            field = fields.get(attname)
+            if field is None:
+                continue
+            if field.primary_key:
+                continue
+            if attname in parent_fields:
+                if value is not None and str(value) not in self.ids:
+                    raise BundleError(f"{model.__name__} refers to unknown {attname} {value}")
+                value = self.ids.get(str(value)) if value is not None else None
+            elif field.get_internal_type() in ('FileField', 'ImageField'):
+                value = self.file(value)
+            else:
+                try:
+                    value = field.to_python(value)
+                except ValidationError:
+                    raise BundleError(f"{model.__name__} has an invalid {attname}")
+            data[attname] = value
+        instance = model(**data)
+        if model._meta.pk.get_internal_type() == 'UUIDField':
+            if row.get(model._meta.pk.attname) is None:
+                raise BundleError(f"{model.__name__} row without an id")
+            instance.pk = uuid.uuid4()
+            self.ids[str(row[model._meta.pk.attname])] = instance.pk
+        return instance
+
+    def insert(self, course, name, model, parent_fields):
+        batch, old_ids, created = [], [], 0
+        uuid_pk = model._meta.pk.get_internal_type() == 'UUIDField'
+
+        def flush():
+            if model in (Lesson, LessonSection):
+                for instance in batch:
+                    render_instance(instance)
+            objs = model.objects.bulk_create(batch)
+            if not uuid_pk:
+                self.remember_int_pks(model, objs, old_ids, parent_fields[0])
+            if model is Lesson:
+                search.index_lessons_and_sections(course, objs, [])
+            elif model is LessonSection:
+                search.index_lessons_and_sections(course, [], objs)
+            batch.clear()
+            old_ids.clear()
+            return len(objs)
+
+        for row in self.rows(name):
+            batch.append(self.build(model, row, parent_fields))
+            old_ids.append(str(row.get(model._meta.pk.attname)))
+            if len(batch) >= BATCH_SIZE:
+                created += flush()
+        if batch:
+            created += flush()
+        return created
+
+    def remember_int_pks(self, model, objs, old_ids, parent_field):
+        if objs and objs[0].pk is None:
+            # MySQL does not return auto-increment ids from a bulk insert. All
+            # rows under these new parents were inserted by this import, in
+            # order, so read the ids back in pk order.
+            known = self.int_pks.setdefault(model, set())
+            new_pks = model.objects.filter(
+                **{f'{parent_field}__in': {getattr(obj, parent_field) for obj in objs}}
+            ).exclude(pk__in=known).order_by('pk').values_list('pk', flat=True)
+            for obj, pk in zip(objs, new_pks):
+                obj.pk = pk
+        for old_id, obj in zip(old_ids, objs):
+            self.ids[old_id] = obj.pk
+            self.int_pks.setdefault(model, set()).add(obj.pk)
+
+    def discard_files(self):
+        for name in self.saved_files:
+            default_storage.delete(name)
+
+
+def import_course(file, created_by):
+    """
+    Create a new draft course owned by `created_by` from a bundle (a path or
+    a seekable file object). Returns (course, counts).
+    """
+    try:
+        bundle = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise BundleError("Not a zip file")
+
+    with bundle:
+        try:
+            manifest = json.loads(bundle.read('manifest.json'))
+        except (KeyError, ValueError):
+            raise BundleError("manifest.json is missing or invalid")
+        if not isinstance(manifest, dict) or (manifest.get('format'), manifest.get('version')) != (FORMAT, FORMAT_VERSION):
+            raise BundleError("Unsupported bundle format")
+        data = manifest.get('course')
+        if not isinstance(data, dict) or not isinstance(data.get('title'), str) or not data['title'].strip():
+            raise BundleError("manifest.json has no course title")
+        try:
+            duration_hours = Course._meta.get_field('duration_hours').to_python(data.get('duration_hours') or 0)
+        except ValidationError:
+            raise BundleError("manifest.json has an invalid duration_hours")
+
+        importer = _Importer(bundle, created_by)
+        counts = {}
+        try:
+            with transaction.atomic():
+                category = None
+                if data.get('category'):
+                    category = CourseCategory.objects.filter(name=data['category']).first()
+                course = Course(
+                    title=data['title'],
+                    description=data.get('description') or '',
+                    duration_hours=duration_hours,
+                    category=category,
+                    created_by=created_by,
+                    status='DRAFT',
+                )
+                course.thumbnail = importer.file(data.get('thumbnail'))
+                course.save()
+                importer.ids[str(manifest.get('source_id'))] = course.pk
+
+                for name, model, parent_fields, _ in _levels():
+                    counts[name] = importer.insert(course, name, model, parent_fields)
+        except (IntegrityError, DataError) as e:
+            # Rows that pass field parsing but break a constraint, e.g. a missing title
+            importer.discard_files()
+            raise BundleError(f"Invalid bundle content: {e}")
+        except Exception:
+            importer.discard_files()
+            raise
+    return course, counts
@@ -0,0 +1,117 @@
+import uuid
+from django.db import connection, transaction
+from .models import Course, Module, Lesson, LessonSection
+from . import search
+
+
+def _copy(instance, **changes):
+    """Unsaved copy of a model instance with the given field changes; created_at starts afresh"""
+    data = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name != 'created_at'
+    }
+    data.update(changes)
+    return type(instance)(**data)
+
+
+def _depth(section, sections_by_id):
+    depth = 0
+    while section.parent_section_id in sections_by_id:
+        section = sections_by_id[section.parent_section_id]
+        depth += 1
+    return depth
+
+
+def clone_course(course, created_by, title=None):
+    """
+    Copy a course with its modules, lessons, sections, quiz questions and answers
+    and module surveys.
+
+    Every level is written with one bulk_create and parent ids are remapped in
+    memory, so the number of queries does not grow with the size of the course.
+    The copy starts as a draft owned by `created_by`.
+    """
+    from assessments.models import Question, Answer, Survey, SurveyQuestion, SurveyChoice
+
+    modules = list(Module.objects.filter(course=course))
+    lessons = list(Lesson.objects.filter(module__course=course))
+    sections = list(LessonSection.objects.filter(lesson__module__course=course))
+    questions = list(Question.objects.filter(lesson__module__course=course))
+    answers = list(Answer.objects.filter(question__lesson__module__course=course))
+    surveys = list(Survey.objects.filter(module__course=course))
+    survey_questions = list(SurveyQuestion.objects.filter(survey__module__course=course))
+    choices = list(SurveyChoice.objects.filter(question__survey__module__course=course))
+
+    with transaction.atomic():
+        new_course = _copy(
+            course,
+            id=uuid.uuid4(),
+            title=title or f"{course.title} (Copy)",
+            created_by_id=created_by.id,
+            status='DRAFT',
+            published_at=None,
+            is_featured=False,
+            content_version=1,
+            # The copy shares the thumbnail file but gets variants of its own,
+            # so replacing either thumbnail cannot delete the other's
+            thumbnail_variants={}
+        )
+        new_course.save(force_insert=True)
+
+        # Old id -> new id for every UUID-keyed level, filled in before any insert
+        ids = {course.id: new_course.id}
+        for obj in modules + lessons + sections + questions + answers + surveys:
+            ids[obj.id] = uuid.uuid4()
+
+        def remap(objs, *parent_fields):
+            return [
+                _copy(obj, id=ids[obj.id], **{field: ids.get(getattr(obj, field)) for field in parent_fields})
+                for obj in objs
+            ]
+
+        # Parents before children, since InnoDB checks foreign keys row by row
+        sections_by_id = {section.id: section for section in sections}
+        sections.sort(key=lambda section: _depth(section, sections_by_id))
+
+        new_lessons = remap(lessons, 'module_id')
+        new_sections = remap(sections, 'lesson_id', 'parent_section_id')
+        Module.objects.bulk_create(remap(modules, 'course_id'))
+        Lesson.objects.bulk_create(new_lessons)
+        LessonSection.objects.bulk_create(new_sections)
+        Question.objects.bulk_create(remap(questions, 'lesson_id'))
+        Answer.objects.bulk_create(remap(answers, 'question_id'))
+        Survey.objects.bulk_create(remap(surveys, 'module_id'))
+
+        # Survey questions and choices have auto-increment ids. MySQL does not
+        # return them from a bulk insert, so read them back in pk order, which
+        # matches the insertion order.
+        new_survey_questions = SurveyQuestion.objects.bulk_create([
+            SurveyQuestion(
+                survey_id=ids[question.survey_id],
+                question_text=question.question_text,
+                question_type=question.question_type,
+                is_required=question.is_required,
+                order=question.order
+            )
+            for question in survey_questions
+        ])
+        if survey_questions and not connection.features.can_return_rows_from_bulk_insert:
+            new_pks = SurveyQuestion.objects.filter(
+                survey_id__in=[ids[survey.id] for survey in surveys]
+            ).order_by('pk').values_list('pk', flat=True)
+            for question, pk in zip(new_survey_questions, new_pks):
+                question.pk = pk
+        survey_question_ids = {old.pk: new.pk for old, new in zip(survey_questions, new_survey_questions)}
+        SurveyChoice.objects.bulk_create([
+            SurveyChoice(
+                question_id=survey_question_ids[choice.question_id],
+                choice_text=choice.choice_text,
+                order=choice.order
+            )
+            for choice in choices
+        ])
+
+        search.index_lessons_and_sections(new_course, new_lessons, new_sections)
+
+    return new_course
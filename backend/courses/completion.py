@@ -0,0 +1,70 @@
+from collections import Counter
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Subquery
+from .models import Course, Enrollment, Lesson, UserProgress
+
+
+def _rate(completed, enrolled):
+    return round(completed / enrolled * 100, 2) if enrolled else 0.0
+
+
+def course_completion_rates(courses=None):
+    """
+    Enrollments, lesson totals and fully-completed learners for every course.
+
+    A learner counts as completed when they are enrolled and have completed
+    every lesson of the course. Everything comes from four grouped queries:
+    the courses, enrollments per course, lessons per course, and the
+    (user, course) completed-lesson counts matched against the lesson totals.
+
+    Returns {'courses': [...], 'total_enrollments', 'completed_enrollments',
+    'overall_completion_rate'} with one row per course, in course order.
+    """
+    if courses is None:
+        courses = Course.objects.filter(status='PUBLISHED')
+    courses = list(courses.values('id', 'title'))
+    course_ids = [course['id'] for course in courses]
+
+    enrollments = dict(
+        Enrollment.objects.filter(course_id__in=course_ids)
+        .values('course_id').annotate(total=Count('id')).values_list('course_id', 'total')
+    )
+    lessons = dict(
+        Lesson.objects.filter(module__course_id__in=course_ids)
+        .values('module__course_id').annotate(total=Count('id')).values_list('module__course_id', 'total')
+    )
+
+    lesson_total = Lesson.objects.filter(
+        module__course_id=OuterRef('lesson__module__course_id')
+    ).order_by().values('module__course_id').annotate(total=Count('id')).values('total')
+    completed_pairs = UserProgress.objects.filter(
+        lesson__module__course_id__in=course_ids,
+        is_completed=True
+    ).filter(Exists(Enrollment.objects.filter(
+        user_id=OuterRef('user_id'), course_id=OuterRef('lesson__module__course_id')
+    ))).values('user_id', 'lesson__module__course_id').annotate(
+        done=Count('lesson_id', distinct=True),
+        total=Subquery(lesson_total, output_field=IntegerField())
+    ).filter(done=F('total')).values_list('lesson__module__course_id', flat=True)
+    completions = Counter(completed_pairs)
+
+    rows = []
+    for course in courses:
+        enrolled = enrollments.get(course['id'], 0)
+        completed = completions.get(course['id'], 0)
+        rows.append({
+            'course_id': course['id'],
+            'course_title': course['title'],
+            'total_lessons': lessons.get(course['id'], 0),
+            'total_enrollments': enrolled,
+            'completed_enrollments': completed,
+            'completion_rate': _rate(completed, enrolled),
+        })
+
+    total_enrollments = sum(enrollments.values())
+    completed_enrollments = sum(completions.values())
+    return {
+        'courses': rows,
+        'total_enrollments': total_enrollments,
+        'completed_enrollments': completed_enrollments,
+        'overall_completion_rate': _rate(completed_enrollments, total_enrollments),
+    }
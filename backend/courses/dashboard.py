@@ -0,0 +1,157 @@
+"""
+Everything the learner dashboard shows, in one response: enrolled courses
+with their progress, certificates, the unread notification count and recent
+quiz attempts.
+
+Each part is one query over all of the learner's courses, so the cost does
+not grow with the number of enrollments. dashboard_etag() summarises the
+same state with a single query of counts and latest timestamps, letting an
+unchanged dashboard be answered with 304 before anything is built.
+"""
+from hashlib import md5
+from django.db.models import Avg, Count, Max, OuterRef, Q, Subquery, Sum
+from users.models import User
+from .models import Enrollment, Module, UserProgress, ModuleProgress
+from .serializers import CourseSerializer
+
+RECENT_ATTEMPTS = 10
+
+
+def _stat(queryset, user_field, aggregate):
+    """Scalar subquery of one aggregate over the outer user's rows"""
+    return Subquery(
+        queryset.filter(**{user_field: OuterRef('pk')}).order_by().values(user_field)
+        .annotate(value=aggregate).values('value')[:1]
+    )
+
+
+def _file_url(file, request):
+    if not file:
+        return None
+    return request.build_absolute_uri(file.url) if request else file.url
+
+
+def dashboard_etag(user):
+    from assessments.models import UserAttempt
+    from certificates.models import Certificate
+    from notifications.models import Notification
+
+    enrollments = Enrollment.objects.all()
+    progress = UserProgress.objects.all()
+    module_progress = ModuleProgress.objects.all()
+    state = User.objects.filter(pk=user.pk).values_list(
+        _stat(enrollments, 'user', Count('id')),
+        _stat(enrollments, 'user', Max('enrolled_at')),
+        # Course renames and content changes move these
+        _stat(enrollments, 'user', Max('course__updated_at')),
+        _stat(enrollments, 'user', Sum('course__content_version')),
+        _stat(progress, 'user', Count('id')),
+        _stat(progress, 'user', Max('updated_at')),
+        _stat(module_progress, 'user', Count('id')),
+        _stat(module_progress, 'user', Max('updated_at')),
+        _stat(Certificate.objects.all(), 'user', Count('id')),
+        _stat(Certificate.objects.all(), 'user', Max('issued_date')),
+        _stat(Notification.objects.filter(is_read=False), 'recipient', Count('id')),
+        _stat(UserAttempt.objects.all(), 'user', Count('id')),
+        _stat(UserAttempt.objects.all(), 'user', Max('attempt_date')),
+        _stat(UserAttempt.objects.all(), 'user', Max('completion_date')),
+    ).first()
+    return '"%s"' % md5(repr(state).encode()).hexdigest()
+
+
+def learner_dashboard(user, context=None):
+    from assessments.models import UserAttempt
+    from assessments.serializers import UserAttemptSerializer
+    from certificates.models import Certificate
+    from notifications.models import Notification
+
+    context = context or {}
+    request = context.get('request')
+    enrollments = list(
+        Enrollment.objects.filter(user=user).select_related('course').order_by('-enrolled_at')
+    )
+    course_ids = [enrollment.course_id for enrollment in enrollments]
+
+    totals = {
+        row['course_id']: row
+        for row in Module.objects.filter(course_id__in=course_ids).values('course_id').annotate(
+            modules=Count('id', distinct=True), lessons=Count('lessons')
+        )
+    }
+    progress = {
+        row['lesson__module__course_id']: row
+        for row in UserProgress.objects.filter(user=user, lesson__module__course_id__in=course_ids).values(
+            'lesson__module__course_id'
+        ).annotate(completed=Count('id', filter=Q(is_completed=True)), last_accessed=Max('last_accessed'))
+    }
+    completed_modules = {}
+    for module_id, course_id in ModuleProgress.objects.filter(
+        user=user, is_completed=True, module__course_id__in=course_ids
+    ).values_list('module_id', 'module__course_id'):
+        completed_modules.setdefault(course_id, []).append(str(module_id))
+
+    # Only used for its thumbnail URL method, which needs no queries
+    course_serializer = CourseSerializer(context=context)
+    courses = []
+    for enrollment in enrollments:
+        course = enrollment.course
+        total = totals.get(course.id, {})
+        done = progress.get(course.id, {})
+        lessons, completed = total.get('lessons', 0), done.get('completed', 0)
+        modules = completed_modules.get(course.id, [])
+        courses.append({
+            'course_id': str(course.id),
+            'course_title': course.title,
+            'thumbnail_url': course_serializer.get_thumbnail_url(course),
+            'enrolled_at': enrollment.enrolled_at,
+            'last_accessed': done.get('last_accessed'),
+            'completed': completed,
+            'total': lessons,
+            'percentage': round(completed / lessons * 100, 2) if lessons else 0,
+            'completed_modules': modules,
+            'completed_modules_count': len(modules),
+            'total_modules_count': total.get('modules', 0),
+            'is_course_completed': bool(total.get('modules')) and len(modules) == total['modules'],
+        })
+
+    certificates = [
+        {
+            'id': str(certificate.id),
+            'course_id': str(certificate.course_id),
+            'course_title': certificate.course.title,
+            'certificate_number': certificate.certificate_number,
+            'issued_date': certificate.issued_date,
+            'pdf_url': _file_url(certificate.pdf_file, request),
+            'verification_url': certificate.verification_url,
+        }
+        for certificate in Certificate.objects.filter(user=user).select_related('course')
+    ]
+
+    attempts = UserAttempt.objects.filter(user=user)
+    attempt_stats = attempts.aggregate(
+        count=Count('id'), passed=Count('id', filter=Q(passed=True)), average_score=Avg('score')
+    )
+    recent_attempts = UserAttemptSerializer(
+        attempts.filter(lesson__module__course__isnull=False).select_related('lesson__module__course').only(
+            'id', 'score', 'passed', 'attempt_date',
+            'lesson__title', 'lesson__module__title', 'lesson__module__course__title'
+        ).order_by('-attempt_date')[:RECENT_ATTEMPTS],
+        many=True, context=context
+    ).data
+
+    unread = Notification.objects.filter(recipient=user, is_read=False).count()
+
+    return {
+        'stats': {
+            'enrolled_courses': len(courses),
+            'completed_courses': sum(1 for course in courses if course['total'] and course['percentage'] == 100),
+            'certificates': len(certificates),
+            'unread_notifications': unread,
+            'quiz_attempts': attempt_stats['count'],
+            'quizzes_passed': attempt_stats['passed'],
+            'average_score': round(attempt_stats['average_score'] or 0, 2),
+        },
+        'courses': courses,
+        'certificates': certificates,
+        'recent_attempts': recent_attempts,
+    }
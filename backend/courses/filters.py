@@ -1,5 +1,6 @@
 import django_filters
-from .models import Course
+from django.db.models import Count, Q
+from .models import Course, CourseCategory
 
 class CourseFilter(django_filters.FilterSet):
     class Meta:
@@ -11,3 +12,92 @@ class CourseFilter(django_filters.FilterSet):
             'duration_hours': ['gte', 'lte'],
             'is_featured': ['exact'],
         }
+
+
+# Duration facet: key -> (label, min hours inclusive, max hours exclusive)
+DURATION_BANDS = {
+    'under_2': ('Under 2 hours', None, 2),
+    '2_to_5': ('2 to 5 hours', 2, 5),
+    '5_to_10': ('5 to 10 hours', 5, 10),
+    'over_10': ('10+ hours', 10, None),
+}
+
+FACETS = ('status', 'category', 'duration')
+
+
+def _duration_q(key):
+    _, low, high = DURATION_BANDS[key]
+    q = Q()
+    if low is not None:
+        q &= Q(duration_hours__gte=low)
+    if high is not None:
+        q &= Q(duration_hours__lt=high)
+    return q
+
+
+def _count(q):
+    return Count('pk', filter=q) if q else Count('pk')
+
+
+def _any_of(qs):
+    combined = Q()
+    for q in qs:
+        combined |= q
+    return combined
+
+
+class CourseFacets:
+    """
+    Faceted filtering of the course catalog.
+
+    Facet parameters (status, category, duration) accept comma-separated
+    values. Each facet's counts apply every other selected facet but not its
+    own, so the UI can show how many courses each alternative would give.
+    All counts come from one query of conditional aggregates.
+    """
+
+    def __init__(self, params, queryset=None):
+        self.params = params
+        # Non-facet filters (title, is_featured, duration_hours range) come from CourseFilter
+        data = {key: value for key, value in params.items() if key not in FACETS}
+        self.queryset = CourseFilter(data, queryset=queryset if queryset is not None else Course.objects.all()).qs
+        self.categories = list(CourseCategory.objects.values_list('id', 'name'))
+        self.options = {
+            'status': [(value, label, Q(status=value)) for value, label in Course.STATUS_CHOICES],
+            'category': [(str(pk), name, Q(category_id=pk)) for pk, name in self.categories],
+            'duration': [(key, band[0], _duration_q(key)) for key, band in DURATION_BANDS.items()],
+        }
+        self.selected = {facet: self._selected_q(facet) for facet in FACETS}
+
+    def _selected_q(self, facet):
+        values = {value for value in self.params.get(facet, '').split(',') if value}
+        if not values:
+            return Q()
+        return _any_of(q for value, _, q in self.options[facet] if value in values) or Q(pk__in=[])
+
+    def _others(self, facet):
+        q = Q()
+        for other in FACETS:
+            if other != facet:
+                q &= self.selected[other]
+        return q
+
+    def results(self):
+        return self.queryset.filter(self._others(None))
+
+    def counts(self):
+        """({facet: [{'value', 'label', 'count'}]}, total matching courses) from a single query"""
+        aggregates = {'total': _count(self._others(None))}
+        names = {}
+        for facet in FACETS:
+            others = self._others(facet)
+            for i, (value, label, q) in enumerate(self.options[facet]):
+                alias = f'{facet}_{i}'
+                names[alias] = (facet, value, label)
+                aggregates[alias] = _count(q & others)
+
+        row = self.queryset.order_by().aggregate(**aggregates)
+        facets = {facet: [] for facet in FACETS}
+        for alias, (facet, value, label) in names.items():
+            facets[facet].append({'value': value, 'label': label, 'count': row[alias]})
+        return facets, row['total']
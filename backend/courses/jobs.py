@@ -0,0 +1,58 @@
+import logging
+import threading
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(job, func, *args):
+    """Run func(job, *args) on a background thread once the current transaction commits"""
+    thread = threading.Thread(target=run_job, args=(job.pk, func, args), daemon=True)
+    transaction.on_commit(thread.start)
+
+
+def run_job(job_id, func, args=()):
+    """
+    Run a job in the current thread, recording its status and result.
+
+    func returns the result dict and may append non-fatal errors to job.errors.
+    """
+    close_old_connections()
+    job = BackgroundJob.objects.get(pk=job_id)
+    now = timezone.now()
+    BackgroundJob.objects.filter(pk=job_id).update(status='RUNNING', started_at=now, heartbeat_at=now)
+    try:
+        result = func(job, *args) or {}
+        BackgroundJob.objects.filter(pk=job_id).update(
+            status='COMPLETED', result=result, errors=job.errors, finished_at=timezone.now()
+        )
+    except Exception as e:
+        logger.exception("Background job %s failed", job_id)
+        BackgroundJob.objects.filter(pk=job_id).update(
+            status='FAILED', errors=job.errors + [str(e)], finished_at=timezone.now()
+        )
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def fail_stale(kind):
+    """
+    Mark running jobs of `kind` that stopped reporting progress as failed.
+
+    For jobs that cannot be resumed because their input only lived in the
+    worker that ran them, such as module progress imports.
+    """
+    failed = []
+    for job in BackgroundJob.objects.filter(kind=kind, status='RUNNING'):
+        if not job.is_stale:
+            continue
+        # Skip a job that reported progress since it was read
+        if BackgroundJob.objects.filter(pk=job.pk, status='RUNNING', heartbeat_at=job.heartbeat_at).update(
+            status='FAILED', finished_at=timezone.now(),
+            errors=job.errors + ['The job stopped reporting progress and did not finish']
+        ):
+            failed.append(job.pk)
+    return failed
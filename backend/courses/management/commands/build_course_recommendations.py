@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from courses.recommendations import build_recommendations, METRICS
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the \"learners also enrolled in\" course recommendations from all enrollments. "
+        "Meant to run nightly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=10,
+                            help='Neighbours to keep per course (default 10)')
+        parser.add_argument('--metric', choices=METRICS, default='cosine',
+                            help='Similarity used to rank co-enrolled courses (default cosine)')
+        parser.add_argument('--block-size', type=int, default=5000,
+                            help='Users per block when building the co-enrollment matrix')
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1 or options['block_size'] < 1:
+            raise CommandError('--top-k and --block-size must be at least 1')
+
+        started = time.monotonic()
+        stored = build_recommendations(options['top_k'], options['metric'], options['block_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {stored} recommendations in {time.monotonic() - started:.1f}s"
+        ))
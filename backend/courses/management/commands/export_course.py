@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from courses.bundle import export_course
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Write a course with its modules, lessons, quizzes, surveys and files to a bundle zip."
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id')
+        parser.add_argument('output', help='Path of the zip file to write')
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(pk=options['course_id'])
+        except (Course.DoesNotExist, ValueError):
+            raise CommandError(f"Course {options['course_id']} not found")
+
+        size = 0
+        with open(options['output'], 'wb') as out:
+            for chunk in export_course(course):
+                out.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported '{course.title}' to {options['output']} ({size} bytes)"))
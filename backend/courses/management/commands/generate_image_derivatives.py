@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from backend.images import refresh_derivatives, THUMBNAIL_WIDTHS, AVATAR_WIDTHS
+from courses.models import Course
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Create resized thumbnail and profile image variants for images uploaded before they existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate variants even when they are up to date')
+
+    def handle(self, *args, **options):
+        targets = [
+            (Course, 'thumbnail', 'thumbnail_variants', THUMBNAIL_WIDTHS),
+            (User, 'profile_image', 'profile_image_variants', AVATAR_WIDTHS),
+        ]
+        for model, image_field, variants_field, widths in targets:
+            updated = 0
+            queryset = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+            for instance in queryset.only('pk', image_field, variants_field).iterator():
+                updated += refresh_derivatives(instance, image_field, variants_field, widths, force=options['force'])
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {updated} updated")
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from courses.bundle import import_course, BundleError
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Create a new draft course from a bundle zip written by export_course."
+
+    def add_arguments(self, parser):
+        parser.add_argument('bundle', help='Path of the bundle zip')
+        parser.add_argument('--owner', required=True, help='Email of the user who will own the course')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(email=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['owner']} not found")
+
+        try:
+            course, counts = import_course(options['bundle'], owner)
+        except (BundleError, OSError) as e:
+            raise CommandError(str(e))
+
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Imported '{course.title}' as {course.id}: {summary}"))
@@ -0,0 +1,191 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from courses.models import ModuleProgress, BackgroundJob
+from courses.signals import backfill_lesson_progress
+
+KIND = 'LESSON_COMPLETION_MIGRATION'
+
+
+def completed_modules():
+    return ModuleProgress.objects.filter(is_completed=True)
+
+
+def plan_ranges(parallel):
+    """Split the completed ModuleProgress rows into `parallel` contiguous pk ranges of similar size"""
+    queryset = completed_modules().order_by('pk').values_list('pk', flat=True)
+    count = queryset.count()
+    if not count:
+        return []
+
+    parallel = max(min(parallel, count), 1)
+    bounds = [queryset[count * i // parallel - 1] for i in range(1, parallel)]
+    bounds.append(queryset[count - 1])
+    ranges = []
+    after = 0
+    for end in bounds:
+        # Each range covers after < pk <= end; `last` is its checkpoint
+        ranges.append({'after': after, 'end': end, 'last': after})
+        after = end
+    return ranges
+
+
+def migrate_range(index, end, last, chunk_size, dry_run=False, job_id=None, on_chunk=None):
+    """
+    Backfill lessons for completed modules with last < pk <= end in pk order.
+
+    Each chunk is written together with its checkpoint in one transaction,
+    so an interrupted run resumes after the last committed chunk.
+    """
+    totals = {'modules': 0, 'created': 0, 'updated': 0}
+    while True:
+        rows = list(
+            completed_modules().filter(pk__gt=last, pk__lte=end).order_by('pk')
+            .values_list('pk', 'user_id', 'module_id', 'completed_at')[:chunk_size]
+        )
+        if not rows:
+            break
+
+        with transaction.atomic():
+            created, updated = backfill_lesson_progress([row[1:] for row in rows], dry_run=dry_run)
+            last = rows[-1][0]
+            if job_id and not dry_run:
+                job = BackgroundJob.objects.select_for_update().get(pk=job_id)
+                job.result['ranges'][index]['last'] = last
+                job.save(update_fields=['result'])
+                BackgroundJob.objects.filter(pk=job_id).update(
+                    processed=F('processed') + len(rows), heartbeat_at=timezone.now()
+                )
+
+        totals['modules'] += len(rows)
+        totals['created'] += created
+        totals['updated'] += updated
+        if on_chunk:
+            on_chunk(totals)
+    return totals
+
+
+def _migrate_range_worker(*args):
+    """Entry point for worker processes"""
+    try:
+        return migrate_range(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark every lesson of every completed module as completed. Runs in pk-ordered "
+        "chunks and checkpoints after each one, so it can be stopped and resumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Module completions per chunk (default 1000)')
+        parser.add_argument('--parallel', type=int, default=1,
+                            help='Number of worker processes, each handling its own pk range')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing anything')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore any saved checkpoint and start from the beginning')
+        parser.add_argument('--job', help='BackgroundJob to record progress on (used by the admin)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        parallel = options['parallel']
+        dry_run = options['dry_run']
+        if chunk_size < 1 or parallel < 1:
+            raise CommandError('--chunk-size and --parallel must be at least 1')
+
+        job = self.get_job(options['job'], options['restart'])
+        if job and job.result.get('ranges'):
+            ranges = job.result['ranges']
+            self.stdout.write(f"Resuming job {job.pk} from its checkpoint")
+        else:
+            ranges = plan_ranges(parallel)
+
+        remaining = sum(
+            completed_modules().filter(pk__gt=r['last'], pk__lte=r['end']).count() for r in ranges
+        )
+        if job and not dry_run:
+            done = completed_modules().count() - remaining
+            job.result = dict(job.result, ranges=ranges)
+            job.status = 'RUNNING'
+            job.stage = 'Migrating lesson completions'
+            job.processed = done
+            job.total = done + remaining
+            job.started_at = job.started_at or timezone.now()
+            job.heartbeat_at = timezone.now()
+            job.save()
+
+        self.stdout.write(
+            f"{'[dry run] ' if dry_run else ''}{remaining} module completions to process "
+            f"in {len(ranges)} range(s), {chunk_size} per chunk"
+        )
+        started = time.monotonic()
+        job_id = job.pk if job and not dry_run else None
+        pending = [(i, r['end'], r['last']) for i, r in enumerate(ranges) if r['last'] < r['end']]
+
+        if len(pending) <= 1 or parallel == 1:
+            totals = {'modules': 0, 'created': 0, 'updated': 0}
+            for index, end, last in pending:
+                base = dict(totals)
+                result = migrate_range(
+                    index, end, last, chunk_size, dry_run, job_id,
+                    on_chunk=lambda t, base=base: self.report({k: base[k] + t[k] for k in t}, started)
+                )
+                totals = {k: totals[k] + result[k] for k in totals}
+        else:
+            # Children must not share the parent's database connections
+            connections.close_all()
+            totals = {'modules': 0, 'created': 0, 'updated': 0}
+            with ProcessPoolExecutor(max_workers=min(parallel, len(pending))) as pool:
+                futures = [
+                    pool.submit(_migrate_range_worker, index, end, last, chunk_size, dry_run, job_id)
+                    for index, end, last in pending
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    totals = {k: totals[k] + result[k] for k in totals}
+                    self.report(totals, started)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry run] ' if dry_run else ''}Done: {totals['modules']} module completions, "
+            f"{totals['created']} lesson completions created, {totals['updated']} updated "
+            f"in {elapsed:.1f}s ({totals['modules'] / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+
+        if job and not dry_run:
+            job.refresh_from_db()
+            job.result = dict(job.result, **totals)
+            job.stage = 'Done'
+            job.save(update_fields=['result', 'stage'])
+            if not options['job']:
+                BackgroundJob.objects.filter(pk=job.pk).update(status='COMPLETED', finished_at=timezone.now())
+
+    def report(self, totals, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"  {totals['modules']} module completions, {totals['created']} created, "
+            f"{totals['updated']} updated ({totals['modules'] / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+
+    def get_job(self, job_id, restart):
+        """The job holding the checkpoint: the one given, or the latest unfinished run"""
+        if job_id:
+            try:
+                job = BackgroundJob.objects.get(pk=job_id, kind=KIND)
+            except (BackgroundJob.DoesNotExist, ValueError):
+                raise CommandError(f"Job {job_id} not found")
+        else:
+            job = BackgroundJob.objects.filter(kind=KIND).exclude(status='COMPLETED').first()
+            if job is None or restart:
+                job = BackgroundJob(kind=KIND)
+
+        if restart:
+            job.result = {}
+        return job
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from courses.rendering import render_existing
+
+
+class Command(BaseCommand):
+    help = (
+        "Render sanitized HTML, excerpts, word counts and reading times for existing lessons "
+        "and sections. Runs in pk-ordered chunks, one bulk update per chunk. Migration "
+        "0024_render_lesson_content backfilled them once with the renderer of its time; rerun "
+        "this after changing the sanitizer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Rows per chunk (default 500)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        refreshed = render_existing(
+            chunk_size,
+            report=lambda model, done: self.stdout.write(f"  {model._meta.verbose_name_plural}: {done}")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done; {refreshed} courses refreshed"))
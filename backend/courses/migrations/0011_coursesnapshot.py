@@ -0,0 +1,28 @@
+# Generated by Django 4.2.21 on 2026-10-19 08:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_course_content_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version_key', models.CharField(max_length=64)),
+                ('payload', models.BinaryField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='courses.course')),
+            ],
+            options={
+                'unique_together': {('course', 'version_key')},
+            },
+        ),
+    ]
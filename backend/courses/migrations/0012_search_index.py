@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    from courses.search import create_search_table
+    create_search_table(schema_editor)
+
+
+def drop_search_table(apps, schema_editor):
+    from courses.search import drop_search_table
+    drop_search_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_coursesnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-19 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('MODULE_PROGRESS_IMPORT', 'Module progress import'), ('LESSON_COMPLETION_MIGRATION', 'Lesson completion migration')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.21 on 2026-10-19 09:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_course_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprogress',
+            name='position_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprogress',
+            name='resume_position',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprogress',
+            name='resume_section',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.lessonsection'),
+        ),
+    ]
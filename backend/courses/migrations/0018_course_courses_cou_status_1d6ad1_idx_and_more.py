@@ -0,0 +1,21 @@
+# Generated by Django 4.2.21 on 2026-10-19 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0017_courserecommendation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['status', 'category'], name='courses_cou_status_1d6ad1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['status', 'is_featured', 'published_at'], name='courses_cou_status_2a7f82_idx'),
+        ),
+    ]
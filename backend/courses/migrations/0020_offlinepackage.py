@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-19 09:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0019_lesson_content_html_lesson_excerpt_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfflinePackage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version_key', models.CharField(max_length=64)),
+                ('content_version', models.PositiveIntegerField()),
+                ('file', models.FileField(blank=True, upload_to='offline_packages/')),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('manifest', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='offline_packages', to='courses.course')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'unique_together': {('course', 'version_key')},
+            },
+        ),
+    ]
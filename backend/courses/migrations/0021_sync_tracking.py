@@ -0,0 +1,74 @@
+# Generated by Django 4.2.21 on 2026-10-19 09:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_offlinepackage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('module', 'Module'), ('lesson', 'Lesson'), ('section', 'Lesson section'), ('question', 'Question'), ('answer', 'Answer'), ('progress', 'Lesson progress'), ('module_progress', 'Module progress')], max_length=20)),
+                ('object_id', models.CharField(max_length=64)),
+                ('course_id', models.UUIDField(null=True)),
+                ('user_id', models.UUIDField(null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='lessonsection',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='moduleprogress',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='userprogress',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['module', 'updated_at'], name='courses_les_module__93cc1b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonsection',
+            index=models.Index(fields=['lesson', 'updated_at'], name='courses_les_lesson__f5d7b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['course', 'updated_at'], name='courses_mod_course__670728_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moduleprogress',
+            index=models.Index(fields=['user', 'updated_at'], name='courses_mod_user_id_f380e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprogress',
+            index=models.Index(fields=['user', 'updated_at'], name='courses_use_user_id_042564_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['course_id', 'deleted_at'], name='courses_tom_course__caeeb5_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0021_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprogress',
+            name='completion_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
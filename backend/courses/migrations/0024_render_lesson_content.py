@@ -0,0 +1,178 @@
+import math
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+from django.db import migrations
+from django.db.models import F
+from django.utils import timezone
+
+# Frozen copy of courses.rendering as of this migration, so later changes
+# to the renderer do not change what it does on a fresh database. Rerun
+# render_lesson_content to apply a newer renderer to existing rows.
+ALLOWED_TAGS = {
+    'p': (), 'br': (), 'hr': (), 'div': (), 'span': (),
+    'h1': (), 'h2': (), 'h3': (), 'h4': (), 'h5': (), 'h6': (),
+    'strong': (), 'b': (), 'em': (), 'i': (), 'u': (), 's': (), 'strike': (), 'mark': (),
+    'sub': (), 'sup': (), 'code': (), 'pre': (), 'blockquote': (),
+    'ul': (), 'ol': ('start',), 'li': (),
+    'a': ('href', 'title', 'target'),
+    'img': ('src', 'alt', 'title', 'width', 'height'),
+    'table': (), 'thead': (), 'tbody': (), 'tr': (), 'th': ('colspan', 'rowspan'), 'td': ('colspan', 'rowspan'),
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math'}
+HTML_VOID_TAGS = VOID_TAGS | {'area', 'base', 'col', 'embed', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+URL_ATTRIBUTES = {'href', 'src'}
+URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+BLOCK_TAGS = {'p', 'br', 'div', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'hr'}
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 200
+RENDERED_FIELDS = ['content_html', 'excerpt', 'word_count', 'reading_minutes']
+CHUNK_SIZE = 500
+
+
+class Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropped_tags = []
+        self.source = ''
+        self.drop_end = None
+
+    def feed(self, data):
+        self.source += data
+        super().feed(data)
+
+    def _offset(self):
+        line, column = self.getpos()
+        return sum(len(text) + 1 for text in self.source.split('\n')[:line - 1]) + column
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropped_tags or tag in DROP_CONTENT_TAGS:
+            if not self.dropped_tags:
+                self.drop_end = self._offset() + len(self.get_starttag_text())
+            if tag not in HTML_VOID_TAGS:
+                self.dropped_tags.append(tag)
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_TAGS[tag] or value is None:
+                continue
+            if name in URL_ATTRIBUTES and urlsplit(value.strip()).scheme.lower() not in URL_SCHEMES:
+                continue
+            kept.append((name, value))
+        if tag == 'a' and dict(kept).get('target') == '_blank':
+            kept.append(('rel', 'noopener noreferrer'))
+
+        self.html.append('<%s%s>' % (tag, ''.join(f' {name}="{escape(value)}"' for name, value in kept)))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.dropped_tags or tag in DROP_CONTENT_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag in self.open_tags and self.open_tags[-1] == tag and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropped_tags:
+            if tag in self.dropped_tags:
+                while self.dropped_tags.pop() != tag:
+                    pass
+                return
+            if tag not in self.open_tags:
+                return
+            self.dropped_tags = []
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+    def handle_data(self, data):
+        if self.dropped_tags:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.dropped_tags:
+            rest = self.source[self.drop_end:]
+            self.dropped_tags = []
+            self.source = ''
+            self.reset()
+            self.feed(rest)
+            super().close()
+        while self.open_tags:
+            self.html.append(f'</{self.open_tags.pop()}>')
+
+
+def render(instance):
+    # Video lessons keep the video URL in `content`; there is nothing to render
+    parser = Sanitizer()
+    parser.feed((instance.content or '') if instance.content_type != 'VIDEO' else '')
+    parser.close()
+
+    text = re.sub(r'\s+', ' ', ''.join(parser.text)).strip()
+    if len(text) > EXCERPT_LENGTH:
+        text_excerpt = text[:EXCERPT_LENGTH].rsplit(' ', 1)[0].rstrip(' ,.;:') + '…'
+    else:
+        text_excerpt = text
+    instance.content_html = ''.join(parser.html)
+    instance.excerpt = text_excerpt
+    instance.word_count = len(text.split())
+    instance.reading_minutes = math.ceil(instance.word_count / WORDS_PER_MINUTE)
+
+
+def render_lesson_content(apps, schema_editor):
+    # Rows saved before content_html existed would otherwise have nothing to display
+    Course = apps.get_model('courses', 'Course')
+    course_ids = set()
+    for model_name, course_path in (('Lesson', 'module__course_id'), ('LessonSection', 'lesson__module__course_id')):
+        model = apps.get_model('courses', model_name)
+        last = None
+        while True:
+            queryset = model.objects.order_by('pk').annotate(course_id=F(course_path)).only(
+                'pk', 'content', 'content_type', *RENDERED_FIELDS
+            )
+            if last is not None:
+                queryset = queryset.filter(pk__gt=last)
+            rows = list(queryset[:CHUNK_SIZE])
+            if not rows:
+                break
+
+            now = timezone.now()
+            for row in rows:
+                render(row)
+                row.updated_at = now
+                course_ids.add(row.course_id)
+            model.objects.bulk_update(rows, [*RENDERED_FIELDS, 'updated_at'])
+            last = rows[-1].pk
+
+    # Cached course trees were built without the rendered fields
+    Course.objects.filter(pk__in=course_ids).update(content_version=F('content_version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0023_backgroundjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(render_lesson_content, migrations.RunPython.noop),
+    ]
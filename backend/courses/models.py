@@ -2,6 +2,7 @@ from django.db import models
 from django.utils import timezone
 from users.models import User
 import uuid
+from datetime import timedelta
 
 class CourseCategory(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -25,6 +26,8 @@ class Course(models.Model):
     description = models.TextField()
     category = models.ForeignKey(CourseCategory, on_delete=models.SET_NULL, null=True)
     thumbnail = models.ImageField(upload_to='course_thumbnails/', null=True, blank=True)
+    # Resized copies of the thumbnail, see backend.images
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_courses')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
     created_at = models.DateTimeField(default=timezone.now)
@@ -32,6 +35,14 @@ class Course(models.Model):
     published_at = models.DateTimeField(null=True, blank=True)
     duration_hours = models.PositiveIntegerField(default=0)
     is_featured = models.BooleanField(default=False)
+    content_version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        indexes = [
+            # Catalog filtering and facet counts
+            models.Index(fields=['status', 'category']),
+            models.Index(fields=['status', 'is_featured', 'published_at']),
+        ]
 
     def calculate_total_duration(self):
         """Calculate total duration from all lessons in the course"""
@@ -52,6 +63,14 @@ class Course(models.Model):
             self.duration_hours = self.calculate_total_duration()
         super().save(*args, **kwargs)
 
+    @classmethod
+    def bump_content_version(cls, course_id):
+        """Invalidate cached course content after a module, lesson, section or quiz change"""
+        from django.db.models import F
+
+        if course_id:
+            cls.objects.filter(pk=course_id).update(content_version=F('content_version') + 1)
+
     def has_modules(self):
         """Check if the course has at least one module"""
         return self.modules.exists()
@@ -96,6 +115,20 @@ class Course(models.Model):
     
     def __str__(self):
         return self.title
+
+class CourseSnapshot(models.Model):
+    """Pre-serialized JSON of a course's content, rebuilt when the content version changes"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='snapshots')
+    version_key = models.CharField(max_length=64)
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('course', 'version_key')
+
+    def __str__(self):
+        return f"{self.course.title} - {self.version_key}"
+
 class Module(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='modules')
@@ -103,9 +136,11 @@ class Module(models.Model):
     description = models.TextField(blank=True)
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order']
+        indexes = [models.Index(fields=['course', 'updated_at'])]
     
     def __str__(self):
         return f"{self.course.title} - {self.title}"
@@ -115,9 +150,11 @@ class ModuleProgress(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE)
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ('user', 'module')
+        indexes = [models.Index(fields=['user', 'updated_at'])]
     
     def save(self, *args, **kwargs):
         if self.is_completed and not self.completed_at:
@@ -149,16 +186,27 @@ class Lesson(models.Model):
     title = models.CharField(max_length=200)
     content_type = models.CharField(max_length=10, choices=CONTENT_TYPES)
     content = models.TextField(blank=True)
+    # Rendered from `content` on save, see courses.rendering
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=255, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_minutes = models.PositiveIntegerField(default=0, editable=False)
     description = models.TextField(blank=True, null=True)
     pdf_file = models.FileField(upload_to='lesson_pdfs/', null=True, blank=True)
     duration_minutes = models.PositiveIntegerField(default=0)
     order = models.PositiveIntegerField(default=0)
     is_required = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order']
+        indexes = [models.Index(fields=['module', 'updated_at'])]
     
+    def save(self, *args, **kwargs):
+        from .rendering import render_on_save
+        super().save(*args, **render_on_save(self, kwargs))
+
     def __str__(self):
         return f"{self.module.title} - {self.title}"
 
@@ -172,6 +220,11 @@ class LessonSection(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='sections')
     title = models.CharField(max_length=200)
     content = models.TextField(blank=True)
+    # Rendered from `content` on save, see courses.rendering
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=255, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_minutes = models.PositiveIntegerField(default=0, editable=False)
     description = models.TextField(blank=True, null=True)
     content_type = models.CharField(max_length=10, choices=CONTENT_TYPES, default='TEXT')
     video_url = models.URLField(blank=True, null=True)  # Add this field
@@ -179,10 +232,16 @@ class LessonSection(models.Model):
     is_subsection = models.BooleanField(default=False)
     parent_section = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subsections')
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order']
+        indexes = [models.Index(fields=['lesson', 'updated_at'])]
     
+    def save(self, *args, **kwargs):
+        from .rendering import render_on_save
+        super().save(*args, **render_on_save(self, kwargs))
+
     def __str__(self):
         return f"{self.lesson.title} - {self.title}"
 
@@ -192,9 +251,17 @@ class UserProgress(models.Model):
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
     last_accessed = models.DateTimeField(auto_now=True)
+    # Where the learner left off: a section of the lesson and a media time or scroll offset
+    resume_section = models.ForeignKey(LessonSection, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    resume_position = models.FloatField(default=0)
+    position_updated_at = models.DateTimeField(null=True, blank=True)
+    # When the completion flag was last set; client time for offline sync events
+    completion_updated_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ('user', 'lesson')
+        indexes = [models.Index(fields=['user', 'updated_at'])]
     
     def save(self, *args, **kwargs):
         if self.is_completed and not self.completed_at:
@@ -247,10 +314,11 @@ class UserProgress(models.Model):
         progress, created = cls.objects.get_or_create(
             user=user,
             lesson=lesson,
-            defaults={'is_completed': True}
+            defaults={'is_completed': True, 'completion_updated_at': timezone.now()}
         )
         if not created:
             progress.is_completed = not progress.is_completed
+            progress.completion_updated_at = timezone.now()
             progress.save()
         return progress
 
@@ -261,3 +329,169 @@ class Enrollment(models.Model):
 
     class Meta:
         unique_together = ('user', 'course')
+
+    @classmethod
+    def enroll_many(cls, pairs, batch_size=1000):
+        """
+        Enroll (user_id, course_id) pairs in bulk.
+
+        Returns the set of pairs that were newly enrolled; pairs that already
+        existed are skipped. No post_save signals are sent.
+
+        The new pairs are read back after the insert by the enrolled_at stamp
+        of this call, so a concurrent call enrolling the same pair does not
+        also report it.
+        """
+        pairs = set(pairs)
+        if not pairs:
+            return set()
+
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, course_id=course_id, enrolled_at=now) for user_id, course_id in pairs],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        inserted = cls.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            course_id__in={course_id for _, course_id in pairs},
+            enrolled_at=now
+        ).values_list('user_id', 'course_id')
+        return pairs & set(inserted)
+
+
+class CourseRecommendation(models.Model):
+    """Precomputed "learners also enrolled in" neighbours, rebuilt by build_course_recommendations"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    co_enrollments = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('course', 'recommended')
+        ordering = ['course', 'rank']
+        indexes = [models.Index(fields=['course', 'rank'])]
+
+    def __str__(self):
+        return f"{self.course} -> {self.recommended} ({self.score:.3f})"
+
+
+class OfflinePackage(models.Model):
+    """Offline download of a course for one content version, built by courses.offline"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='offline_packages')
+    version_key = models.CharField(max_length=64)
+    content_version = models.PositiveIntegerField()
+    # Cleared once a newer version is built; the manifest is kept for deltas
+    file = models.FileField(upload_to='offline_packages/', blank=True)
+    size = models.PositiveBigIntegerField(default=0)
+    manifest = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('course', 'version_key')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.course.title} - v{self.content_version}"
+
+
+class Tombstone(models.Model):
+    """
+    A deleted module, lesson, section, quiz question or answer, or a learner's
+    lesson or module progress, kept so sync clients can drop their copy.
+    Only rows deleted directly get one; their cascaded children do not.
+    """
+    KINDS = (
+        ('module', 'Module'),
+        ('lesson', 'Lesson'),
+        ('section', 'Lesson section'),
+        ('question', 'Question'),
+        ('answer', 'Answer'),
+        ('progress', 'Lesson progress'),
+        ('module_progress', 'Module progress'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.CharField(max_length=64)
+    course_id = models.UUIDField(null=True)
+    # Set for progress rows only
+    user_id = models.UUIDField(null=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['course_id', 'deleted_at'])]
+
+    @classmethod
+    def record(cls, kind, instance, course_id, user_id=None):
+        """Store a tombstone for a directly deleted `instance`; callers skip cascaded rows"""
+        if course_id:
+            cls.objects.create(kind=kind, object_id=str(instance.pk), course_id=course_id, user_id=user_id)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class BackgroundJob(models.Model):
+    """A long-running admin operation whose progress is polled from the admin"""
+    KINDS = (
+        ('MODULE_PROGRESS_IMPORT', 'Module progress import'),
+        ('LESSON_COMPLETION_MIGRATION', 'Lesson completion migration'),
+    )
+    STATUSES = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50, choices=KINDS)
+    status = models.CharField(max_length=20, choices=STATUSES, default='PENDING')
+    stage = models.CharField(max_length=100, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched whenever a running job reports progress
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    # A running job silent for this long is assumed dead (e.g. its process restarted)
+    STALE_AFTER = timedelta(minutes=10)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.get_status_display()})"
+
+    @property
+    def percentage(self):
+        return round(self.processed / self.total * 100) if self.total else 0
+
+    @property
+    def is_finished(self):
+        return self.status in ('COMPLETED', 'FAILED')
+
+    @property
+    def is_stale(self):
+        last_seen = self.heartbeat_at or self.started_at or self.created_at
+        return self.status == 'RUNNING' and last_seen < timezone.now() - self.STALE_AFTER
+
+    def report(self, stage=None, processed=None, total=None):
+        """Record progress without touching the other fields"""
+        fields = {'heartbeat_at': timezone.now()}
+        self.heartbeat_at = fields['heartbeat_at']
+        if stage is not None:
+            fields['stage'] = self.stage = stage
+        if processed is not None:
+            fields['processed'] = self.processed = processed
+        if total is not None:
+            fields['total'] = self.total = total
+        if fields:
+            type(self).objects.filter(pk=self.pk).update(**fields)
@@ -0,0 +1,105 @@
+"""
+Linear lesson order of a course, for next/previous links and resuming.
+
+The index is built from one query and cached under the course content key,
+so module/lesson saves, deletes and reorders (which all bump the course's
+content_version) invalidate it without any explicit cache deletes.
+"""
+from django.core.cache import cache
+from .models import Lesson, UserProgress
+from .tree import course_content_key
+from . import resume
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def navigation_index(course):
+    """
+    {'lessons': [{'id', 'title', 'module'}...] in module then lesson order,
+     'modules': [{'id', 'title', 'start', 'end'}...]} where start/end are
+    indexes into `lessons` (end exclusive).
+    """
+    key = f'course-navigation:{course_content_key(course)}'
+    index = cache.get(key)
+    if index is not None:
+        return index
+
+    lessons = []
+    modules = []
+    rows = Lesson.objects.filter(module__course=course).order_by(
+        'module__order', 'module__created_at', 'module_id', 'order', 'created_at', 'id'
+    ).values_list('id', 'title', 'module_id', 'module__title')
+    for lesson_id, title, module_id, module_title in rows:
+        module_id = str(module_id)
+        if not modules or modules[-1]['id'] != module_id:
+            modules.append({'id': module_id, 'title': module_title, 'start': len(lessons), 'end': len(lessons)})
+        lessons.append({'id': str(lesson_id), 'title': title, 'module': module_id})
+        modules[-1]['end'] = len(lessons)
+
+    index = {'lessons': lessons, 'modules': modules}
+    cache.set(key, index, CACHE_TIMEOUT)
+    return index
+
+
+def lesson_navigation(course, user, lesson_id=None):
+    """
+    Previous/next lessons around `lesson_id` and where the user should resume,
+    from the cached index and a single UserProgress query.
+    """
+    index = navigation_index(course)
+    lessons = index['lessons']
+    positions = {lesson['id']: i for i, lesson in enumerate(lessons)}
+
+    progress = {
+        str(lesson_id): (is_completed, max(filter(None, (accessed, position_at))), section_id, position)
+        for lesson_id, is_completed, accessed, position_at, section_id, position in UserProgress.objects.filter(
+            user=user, lesson__module__course=course
+        ).values_list(
+            'lesson_id', 'is_completed', 'last_accessed', 'position_updated_at', 'resume_section_id', 'resume_position'
+        )
+    }
+    # Heartbeats not yet flushed are newer than anything in the database
+    for pending_lesson, (section_id, position, at) in resume.buffer.pending(user.id).items():
+        pending_lesson = str(pending_lesson)
+        if pending_lesson in positions:
+            is_completed = progress.get(pending_lesson, (False,))[0]
+            progress[pending_lesson] = (is_completed, at, section_id, position)
+
+    result = {
+        'total': len(lessons),
+        'completed': sum(1 for entry in progress.values() if entry[0]),
+        'resume': _resume(lessons, positions, progress),
+    }
+    if lesson_id is not None:
+        i = positions.get(str(lesson_id))
+        if i is None:
+            return None
+        module = next(m for m in index['modules'] if m['start'] <= i < m['end'])
+        result.update({
+            'lesson': lessons[i],
+            'position': i,
+            'module': {'id': module['id'], 'title': module['title'],
+                       'position': i - module['start'], 'lesson_count': module['end'] - module['start']},
+            'previous': lessons[i - 1] if i > 0 else None,
+            'next': lessons[i + 1] if i + 1 < len(lessons) else None,
+            'is_completed': progress.get(lessons[i]['id'], (False,))[0],
+        })
+    return result
+
+
+def _resume(lessons, positions, progress):
+    """
+    The most recently used lesson if it is unfinished, otherwise the first
+    unfinished lesson after it (wrapping to the start of the course).
+    """
+    if not lessons:
+        return None
+    touched = [(entry[1], lesson_id) for lesson_id, entry in progress.items() if lesson_id in positions]
+    start = positions[max(touched)[1]] if touched else 0
+
+    for i in list(range(start, len(lessons))) + list(range(0, start)):
+        entry = progress.get(lessons[i]['id'])
+        if entry is None or not entry[0]:
+            section_id, position = (entry[2], entry[3]) if entry else (None, 0)
+            return dict(lessons[i], section=str(section_id) if section_id else None, offset=position)
+    return None
@@ -0,0 +1,235 @@
+"""
+Offline course packages for learners who download a course once and study
+without a connection.
+
+    manifest.json            package version and a sha1 for every item
+    course.json              course, modules and lesson outline
+    lessons/<id>.json        rendered lesson content with its section tree
+    pdfs/<lesson id>.pdf     lesson PDFs
+
+A package is built the first time a content version is requested and kept
+in storage. Older packages lose their file but keep their manifest, so a
+client holding any recent version can be sent a delta zip with just the
+added and changed items and a list of the removed ones.
+"""
+import hashlib
+import json
+import shutil
+import tempfile
+import zipfile
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Module, Lesson, LessonSection, OfflinePackage
+from .tree import course_content_key
+
+FORMAT = 'offline-course'
+FORMAT_VERSION = 1
+BATCH_SIZE = 200
+CHUNK_SIZE = 64 * 1024
+# Manifests kept per course; clients on an older version download the full package again
+KEEP_VERSIONS = 20
+
+
+class _Writer:
+    """Writes items into a package zip and records their hashes"""
+
+    def __init__(self, package):
+        self.zip = package
+        self.hashes = {}
+
+    def json(self, path, data):
+        payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':')).encode()
+        self.zip.writestr(path, payload, zipfile.ZIP_DEFLATED)
+        self.hashes[path] = hashlib.sha1(payload).hexdigest()
+
+    def file(self, path, name):
+        try:
+            source = default_storage.open(name, 'rb')
+        except OSError:
+            return False
+        digest = hashlib.sha1()
+        # PDFs are compressed already
+        with source, self.zip.open(zipfile.ZipInfo(path, timezone.now().timetuple()[:6]), 'w', force_zip64=True) as out:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        self.hashes[path] = digest.hexdigest()
+        return True
+
+
+def _section_tree(sections):
+    """Nest section rows of one lesson under their parents"""
+    children = {}
+    for section in sections:
+        section['subsections'] = children.setdefault(section['id'], [])
+    roots = []
+    for section in sections:
+        parent = section.pop('parent_section_id')
+        (children[parent] if parent in children else roots).append(section)
+    return roots
+
+
+def _write_package(course, out):
+    writer = _Writer(out)
+    modules = [
+        dict(module, id=str(module['id']), lessons=[])
+        for module in Module.objects.filter(course=course).order_by('order', 'created_at').values(
+            'id', 'title', 'description', 'order'
+        )
+    ]
+    outline = {module['id']: module['lessons'] for module in modules}
+
+    lessons = Lesson.objects.filter(module__course=course).order_by('order', 'created_at', 'id').values(
+        'id', 'module_id', 'title', 'description', 'content_type', 'content', 'content_html', 'excerpt',
+        'word_count', 'reading_minutes', 'pdf_file', 'duration_minutes', 'order', 'is_required'
+    )
+    batch = []
+    for lesson in lessons.iterator(chunk_size=BATCH_SIZE):
+        batch.append(lesson)
+        if len(batch) == BATCH_SIZE:
+            _write_lessons(writer, batch, outline)
+            batch = []
+    _write_lessons(writer, batch, outline)
+
+    writer.json('course.json', {
+        'id': str(course.id),
+        'title': course.title,
+        'description': course.description,
+        'modules': modules,
+    })
+    return writer.hashes
+
+
+def _write_lessons(writer, lessons, outline):
+    sections = {}
+    for section in LessonSection.objects.filter(lesson_id__in=[lesson['id'] for lesson in lessons]).order_by(
+        'order', 'created_at'
+    ).values('id', 'lesson_id', 'parent_section_id', 'title', 'content_type', 'content_html', 'video_url', 'order'):
+        section['id'] = str(section['id'])
+        section['parent_section_id'] = str(section['parent_section_id']) if section['parent_section_id'] else None
+        sections.setdefault(section.pop('lesson_id'), []).append(section)
+
+    for lesson in lessons:
+        lesson_id = str(lesson['id'])
+        pdf = f'pdfs/{lesson_id}.pdf' if lesson['pdf_file'] and writer.file(f'pdfs/{lesson_id}.pdf', lesson['pdf_file']) else None
+        # Video lessons keep the video URL in `content`
+        video_url = lesson['content'] if lesson['content_type'] == 'VIDEO' else None
+        entry = {
+            'id': lesson_id,
+            'title': lesson['title'],
+            'content_type': lesson['content_type'],
+            'excerpt': lesson['excerpt'],
+            'reading_minutes': lesson['reading_minutes'],
+            'duration_minutes': lesson['duration_minutes'],
+            'order': lesson['order'],
+            'is_required': lesson['is_required'],
+            'path': f'lessons/{lesson_id}.json',
+            'pdf': pdf,
+        }
+        outline.get(str(lesson['module_id']), []).append(entry)
+        writer.json(entry['path'], dict(
+            entry,
+            description=lesson['description'],
+            content_html=lesson['content_html'],
+            word_count=lesson['word_count'],
+            video_url=video_url,
+            sections=_section_tree(sections.get(lesson['id'], [])),
+        ))
+
+
+def _manifest(package):
+    return {
+        'format': FORMAT,
+        'format_version': FORMAT_VERSION,
+        'course': str(package.course_id),
+        'version': package.version_key,
+        'content_version': package.content_version,
+        'created_at': package.created_at,
+        'items': package.manifest,
+    }
+
+
+def get_package(course):
+    """The package for the course's current content version, building it if needed"""
+    version_key = course_content_key(course)
+    existing = OfflinePackage.objects.filter(course=course, version_key=version_key).first()
+    if existing is not None and existing.file:
+        return existing
+
+    package = OfflinePackage(course=course, version_key=version_key, content_version=course.content_version)
+    with tempfile.TemporaryFile() as tmp:
+        with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as out:
+            package.manifest = _write_package(course, out)
+            out.writestr('manifest.json', json.dumps(_manifest(package), cls=DjangoJSONEncoder, indent=2))
+        package.size = tmp.tell()
+        tmp.seek(0)
+        package.file.save(f'{course.id}/{version_key}.zip', File(tmp), save=False)
+
+    # Concurrent builds of one version save distinct file names; the first to
+    # record its package wins and the others delete their own file
+    if existing is None:
+        try:
+            with transaction.atomic():
+                package.save(force_insert=True)
+        except IntegrityError:
+            default_storage.delete(package.file.name)
+            return OfflinePackage.objects.get(course=course, version_key=version_key)
+    else:
+        # A row whose file was pruned is only refilled while it is still empty
+        claimed = OfflinePackage.objects.filter(pk=existing.pk, file='').update(
+            content_version=package.content_version, file=package.file.name, size=package.size,
+            manifest=package.manifest, created_at=package.created_at
+        )
+        if not claimed:
+            default_storage.delete(package.file.name)
+            return OfflinePackage.objects.get(pk=existing.pk)
+        package.pk = existing.pk
+
+    _prune(course, version_key)
+    return package
+
+
+def _prune(course, current_key):
+    """Drop the files of older packages and the manifests beyond KEEP_VERSIONS"""
+    older = OfflinePackage.objects.filter(course=course).exclude(version_key=current_key).order_by('-created_at')
+    for package in older.exclude(file=''):
+        package.file.delete(save=False)
+    older.update(file='')
+    expired = list(older.values_list('pk', flat=True)[KEEP_VERSIONS - 1:])
+    OfflinePackage.objects.filter(pk__in=expired).delete()
+
+
+def diff_manifests(old, new):
+    return {
+        'added': sorted(path for path in new if path not in old),
+        'changed': sorted(path for path in new if path in old and old[path] != new[path]),
+        'removed': sorted(path for path in old if path not in new),
+    }
+
+
+def build_delta(package, since):
+    """
+    A temporary file holding a zip with delta.json, the new manifest and the
+    added and changed items of `package` relative to the `since` package.
+    """
+    changes = diff_manifests(since.manifest, package.manifest)
+    delta = tempfile.TemporaryFile()
+    with package.file.open('rb') as source, zipfile.ZipFile(source) as full, \
+            zipfile.ZipFile(delta, 'w', zipfile.ZIP_DEFLATED) as out:
+        out.writestr('delta.json', json.dumps(dict(
+            changes, format=FORMAT, format_version=FORMAT_VERSION,
+            course=str(package.course_id), since=since.version_key, version=package.version_key,
+            content_version=package.content_version,
+        ), indent=2))
+        out.writestr('manifest.json', full.read('manifest.json'))
+        for path in changes['added'] + changes['changed']:
+            info = full.getinfo(path)
+            target = zipfile.ZipInfo(path, info.date_time)
+            target.compress_type = info.compress_type
+            with full.open(info) as item, out.open(target, 'w', force_zip64=True) as copy:
+                shutil.copyfileobj(item, copy, CHUNK_SIZE)
+    delta.seek(0)
+    return delta
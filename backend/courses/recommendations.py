@@ -0,0 +1,109 @@
+"""
+Co-enrollment course recommendations.
+
+build_recommendations() reads every (user, course) enrollment once, builds
+the course x course co-enrollment counts as C = X^T X from a user x course
+incidence matrix X (accumulated over blocks of users so memory stays
+bounded), normalises C and keeps the top-K neighbours of each course in
+CourseRecommendation. Run it nightly with build_course_recommendations.
+"""
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .models import Course, CourseRecommendation, Enrollment
+
+METRICS = ('cosine', 'jaccard')
+
+
+def co_enrollment_matrix(user_idx, course_idx, n_courses, block_size=5000):
+    """Course x course co-enrollment counts; the diagonal holds each course's enrollments"""
+    counts = np.zeros((n_courses, n_courses), dtype=np.float64)
+    order = np.argsort(user_idx, kind='stable')
+    user_idx, course_idx = user_idx[order], course_idx[order]
+    n_users = int(user_idx.max()) + 1 if len(user_idx) else 0
+
+    for start in range(0, n_users, block_size):
+        lo, hi = np.searchsorted(user_idx, [start, start + block_size])
+        block = np.zeros((min(block_size, n_users - start), n_courses), dtype=np.float32)
+        block[user_idx[lo:hi] - start, course_idx[lo:hi]] = 1
+        counts += block.T @ block
+    return counts
+
+
+def similarity(counts, metric='cosine'):
+    """Normalise co-enrollment counts; the diagonal is zeroed so a course never recommends itself"""
+    sizes = np.diag(counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric == 'jaccard':
+            scores = counts / (sizes[:, None] + sizes[None, :] - counts)
+        else:
+            scores = counts / np.sqrt(np.outer(sizes, sizes))
+    scores = np.nan_to_num(scores, nan=0.0, posinf=0.0)
+    np.fill_diagonal(scores, 0)
+    return scores
+
+
+def build_recommendations(top_k=10, metric='cosine', block_size=5000):
+    """Recompute and replace every course's top-K neighbours; returns the number of rows stored"""
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+
+    # Courses are indexed from the enrollment rows themselves, so a course or
+    # enrollment created while this runs is simply left for the next run
+    user_index, course_index = {}, {}
+    user_idx, course_idx = [], []
+    for user_id, course_id in Enrollment.objects.values_list('user_id', 'course_id').iterator(chunk_size=10000):
+        user_idx.append(user_index.setdefault(user_id, len(user_index)))
+        course_idx.append(course_index.setdefault(course_id, len(course_index)))
+    course_ids = list(course_index)
+
+    # Only published courses are worth suggesting
+    published = np.zeros(len(course_ids), dtype=bool)
+    for course_id in Course.objects.filter(status='PUBLISHED').values_list('id', flat=True):
+        if course_id in course_index:
+            published[course_index[course_id]] = True
+
+    counts = co_enrollment_matrix(
+        np.array(user_idx, dtype=np.int64), np.array(course_idx, dtype=np.int64), len(course_ids), block_size
+    )
+    scores = similarity(counts, metric)
+    scores[:, ~published] = 0
+
+    now = timezone.now()
+    rows = []
+    for i, course_id in enumerate(course_ids):
+        candidates = np.flatnonzero(scores[i] > 0)
+        if not len(candidates):
+            continue
+        best = candidates[np.argsort(-scores[i, candidates], kind='stable')[:top_k]]
+        rows.extend(
+            CourseRecommendation(
+                course_id=course_id,
+                recommended_id=course_ids[j],
+                rank=rank,
+                score=float(scores[i, j]),
+                co_enrollments=int(counts[i, j]),
+                computed_at=now
+            )
+            for rank, j in enumerate(best)
+        )
+
+    with transaction.atomic():
+        # Leave out courses deleted since the enrollments were read
+        remaining = set(Course.objects.filter(id__in=course_ids).values_list('id', flat=True))
+        rows = [row for row in rows if row.course_id in remaining and row.recommended_id in remaining]
+        CourseRecommendation.objects.all().delete()
+        CourseRecommendation.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def recommended_courses(course, user=None, limit=5):
+    """Published neighbours of `course` in rank order, minus courses `user` is enrolled in"""
+    recommendations = CourseRecommendation.objects.filter(
+        course=course, recommended__status='PUBLISHED'
+    ).select_related('recommended').order_by('rank')
+    if user is not None and user.is_authenticated:
+        recommendations = recommendations.exclude(
+            recommended__in=Enrollment.objects.filter(user=user).values('course_id')
+        )
+    return list(recommendations[:limit])
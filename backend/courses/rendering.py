@@ -0,0 +1,233 @@
+"""
+Render pipeline for lesson and section rich text.
+
+The editor stores HTML. On save it is run through an allowlist sanitizer
+and the sanitized HTML, a plain-text excerpt, a word count and a reading
+time are stored next to the source, so read endpoints can ship content
+that is ready to display.
+"""
+import math
+import re
+from html import escape
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+# Tags the lesson editor produces, with the attributes kept on each
+ALLOWED_TAGS = {
+    'p': (), 'br': (), 'hr': (), 'div': (), 'span': (),
+    'h1': (), 'h2': (), 'h3': (), 'h4': (), 'h5': (), 'h6': (),
+    'strong': (), 'b': (), 'em': (), 'i': (), 'u': (), 's': (), 'strike': (), 'mark': (),
+    'sub': (), 'sup': (), 'code': (), 'pre': (), 'blockquote': (),
+    'ul': (), 'ol': ('start',), 'li': (),
+    'a': ('href', 'title', 'target'),
+    'img': ('src', 'alt', 'title', 'width', 'height'),
+    'table': (), 'thead': (), 'tbody': (), 'tr': (), 'th': ('colspan', 'rowspan'), 'td': ('colspan', 'rowspan'),
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Dropped together with everything inside them
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math'}
+# Elements that never have content or an end tag, allowed or not
+HTML_VOID_TAGS = VOID_TAGS | {'area', 'base', 'col', 'embed', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+URL_ATTRIBUTES = {'href', 'src'}
+URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+BLOCK_TAGS = {'p', 'br', 'div', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'hr'}
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 200
+
+
+class _Sanitizer(HTMLParser):
+    """
+    Allowlist sanitizer. Dropped elements lose their content up to their end
+    tag, the end of their parent element, or, when neither comes, the end of
+    input: the text after an unclosed drop tag is then parsed again without it.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        # The element being dropped and the elements opened inside it
+        self.dropped_tags = []
+        self.source = ''
+        self.drop_end = None
+
+    def feed(self, data):
+        self.source += data
+        super().feed(data)
+
+    def _offset(self):
+        """Index in `source` of the tag being handled"""
+        line, column = self.getpos()
+        return sum(len(text) + 1 for text in self.source.split('\n')[:line - 1]) + column
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropped_tags or tag in DROP_CONTENT_TAGS:
+            if not self.dropped_tags:
+                self.drop_end = self._offset() + len(self.get_starttag_text())
+            if tag not in HTML_VOID_TAGS:
+                self.dropped_tags.append(tag)
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_TAGS[tag] or value is None:
+                continue
+            if name in URL_ATTRIBUTES and urlsplit(value.strip()).scheme.lower() not in URL_SCHEMES:
+                continue
+            kept.append((name, value))
+        if tag == 'a' and dict(kept).get('target') == '_blank':
+            kept.append(('rel', 'noopener noreferrer'))
+
+        self.html.append('<%s%s>' % (tag, ''.join(f' {name}="{escape(value)}"' for name, value in kept)))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # A self-closed <svg/> has no content and no end tag to stop the dropping
+        if self.dropped_tags or tag in DROP_CONTENT_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag in self.open_tags and self.open_tags[-1] == tag and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropped_tags:
+            if tag in self.dropped_tags:
+                while self.dropped_tags.pop() != tag:
+                    pass
+                return
+            if tag not in self.open_tags:
+                return
+            # The parent closed around an unclosed dropped element; stop dropping there
+            self.dropped_tags = []
+        if tag not in self.open_tags:
+            return
+        # Close anything left open inside this tag so the output stays well formed
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+    def handle_data(self, data):
+        if self.dropped_tags:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.dropped_tags:
+            # Keep what follows a drop tag that was never closed
+            rest = self.source[self.drop_end:]
+            self.dropped_tags = []
+            self.source = ''
+            self.reset()
+            self.feed(rest)
+            super().close()
+        while self.open_tags:
+            self.html.append(f'</{self.open_tags.pop()}>')
+
+
+def _excerpt(text):
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    cut = text[:EXCERPT_LENGTH].rsplit(' ', 1)[0]
+    return cut.rstrip(' ,.;:') + '…'
+
+
+def render_content(source):
+    """Sanitized HTML, plain-text excerpt, word count and reading minutes for rich text"""
+    parser = _Sanitizer()
+    parser.feed(source or '')
+    parser.close()
+
+    text = re.sub(r'\s+', ' ', ''.join(parser.text)).strip()
+    word_count = len(text.split())
+    return {
+        'content_html': ''.join(parser.html),
+        'excerpt': _excerpt(text),
+        'word_count': word_count,
+        'reading_minutes': math.ceil(word_count / WORDS_PER_MINUTE),
+    }
+
+
+RENDERED_FIELDS = ['content_html', 'excerpt', 'word_count', 'reading_minutes']
+
+
+def render_instance(instance):
+    """Fill the rendered fields of a lesson or section from its content"""
+    # Video lessons keep the video URL in `content`; there is nothing to render
+    is_rich_text = instance.content_type != 'VIDEO'
+    for field, value in render_content(instance.content if is_rich_text else '').items():
+        setattr(instance, field, value)
+
+
+def render_on_save(instance, kwargs):
+    """
+    Render before a save. Partial saves that leave the content alone skip
+    rendering; ones that include it also write the rendered fields.
+    Returns the save kwargs.
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None:
+        render_instance(instance)
+        return kwargs
+
+    # auto_now is only written when listed, and sync clients rely on it
+    kwargs['update_fields'] = set(update_fields) | {'updated_at'}
+    if {'content', 'content_type'} & set(update_fields):
+        render_instance(instance)
+        kwargs['update_fields'] |= set(RENDERED_FIELDS)
+    return kwargs
+
+
+def render_existing(chunk_size=500, report=None):
+    """
+    Render every lesson and section in pk-ordered chunks, one bulk update per
+    chunk, and bump the content version of the courses touched.
+    report(model, done) is called after each chunk. Returns the number of
+    courses refreshed.
+    """
+    from .models import Course, Lesson, LessonSection
+
+    course_ids = set()
+    for model, course_path in ((Lesson, 'module__course_id'), (LessonSection, 'lesson__module__course_id')):
+        done = 0
+        last = None
+        while True:
+            queryset = model.objects.order_by('pk').annotate(course_id=F(course_path)).only(
+                'pk', 'content', 'content_type', *RENDERED_FIELDS
+            )
+            if last is not None:
+                queryset = queryset.filter(pk__gt=last)
+            rows = list(queryset[:chunk_size])
+            if not rows:
+                break
+
+            now = timezone.now()
+            for row in rows:
+                render_instance(row)
+                row.updated_at = now
+                course_ids.add(row.course_id)
+            with transaction.atomic():
+                model.objects.bulk_update(rows, [*RENDERED_FIELDS, 'updated_at'])
+            last = rows[-1].pk
+            done += len(rows)
+            if report:
+                report(model, done)
+
+    # bulk_update skips the signals that invalidate cached course trees
+    Course.objects.filter(pk__in=course_ids).update(content_version=F('content_version') + 1)
+    return len(course_ids)
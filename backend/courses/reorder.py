@@ -0,0 +1,114 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from .models import Course
+
+
+class OrderConflict(Exception):
+    def __init__(self, current_version):
+        super().__init__('Course content changed since it was loaded')
+        self.current_version = current_version
+
+
+def apply_order(queryset, ids, course_id, version):
+    """
+    Set `order` on every item of `queryset` to its position in `ids`.
+
+    `version` must match the course's content_version, which is bumped in the
+    same transaction, so two editors reordering from the same state cannot
+    both win. Changed rows are written with a single bulk_update. Returns the
+    new content version.
+    """
+    pk_field = queryset.model._meta.pk
+    try:
+        ids = [pk_field.to_python(pk) for pk in ids]
+    except ValidationError:
+        raise ValueError('ids contains an invalid id')
+
+    with transaction.atomic():
+        # Claim the next version first; this also locks the course row until commit
+        claimed = Course.objects.filter(pk=course_id, content_version=version).update(
+            content_version=F('content_version') + 1
+        )
+        if not claimed:
+            current = Course.objects.filter(pk=course_id).values_list('content_version', flat=True).first()
+            raise OrderConflict(current)
+
+        items = {item.pk: item for item in queryset.only('pk', 'order')}
+        if len(ids) != len(set(ids)) or set(ids) != set(items):
+            raise ValueError('ids must list every item exactly once')
+
+        # bulk_update skips auto_now, so touch updated_at by hand where there is one
+        fields = ['order']
+        if any(field.name == 'updated_at' for field in queryset.model._meta.concrete_fields):
+            fields.append('updated_at')
+        now = timezone.now()
+        changed = []
+        for position, pk in enumerate(ids):
+            item = items[pk]
+            if item.order != position:
+                item.order = position
+                item.updated_at = now
+                changed.append(item)
+        queryset.model.objects.bulk_update(changed, fields)
+    return version + 1
+
+
+class ReorderMixin:
+    """
+    Adds POST <list url>/reorder/ taking {"ids": [...], "version": <course content_version>}.
+
+    Views set `reorder_parent_kwarg`, the URL kwarg naming the parent of the
+    items, and `reorder_course_field`, the lookup from Course to that parent
+    ('pk' when the parent is the course itself). The course found this way
+    is the one whose version guards the change. get_reorder_queryset() can
+    narrow the items being ordered.
+    """
+    reorder_parent_kwarg = None
+    reorder_course_field = None
+
+    def get_reorder_queryset(self):
+        return self.get_queryset()
+
+    def get_reorder_course_id(self):
+        assert self.reorder_parent_kwarg is not None and self.reorder_course_field is not None, (
+            "'%s' should set `reorder_parent_kwarg` and `reorder_course_field`" % self.__class__.__name__
+        )
+        return get_object_or_404(
+            Course.objects.only('pk'), **{self.reorder_course_field: self.kwargs[self.reorder_parent_kwarg]}
+        ).pk
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser])
+    def reorder(self, request, *args, **kwargs):
+        """Apply a new order to all items under one parent in a single update"""
+        from .serializers import ReorderSerializer
+
+        if request.user.role not in ['ADMIN', 'CONTENT_MANAGER']:
+            return Response(
+                {'error': 'Only admins and content managers can reorder content'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = ReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        try:
+            version = apply_order(
+                self.get_reorder_queryset(), ids,
+                self.get_reorder_course_id(), serializer.validated_data['version']
+            )
+        except OrderConflict as e:
+            return Response(
+                {'error': str(e), 'version': e.current_version},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'ids': ids, 'version': version})
@@ -0,0 +1,155 @@
+"""
+Write-behind buffer for lesson resume positions.
+
+Clients send a heartbeat with their position every few seconds. Heartbeats
+only replace the buffered entry for their (user, lesson), and a background
+thread writes the buffer to UserProgress every RESUME_FLUSH_SECONDS with
+one bulk_update/bulk_create, so each learner causes at most one write per
+lesson per interval. Reads merge the buffer over the database rows.
+
+The buffer is per process; with several workers a read may not see a
+heartbeat another worker has not flushed yet, which is at most one
+interval stale.
+"""
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import Lesson, LessonSection, UserProgress
+
+logger = logging.getLogger(__name__)
+
+RESUME_FIELDS = ['resume_section', 'resume_position', 'position_updated_at', 'updated_at']
+
+
+class ResumeBuffer:
+    def __init__(self, interval=None):
+        self.interval = interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, user_id, lesson_id, section_id, position, at=None):
+        """Keep the latest position for (user, lesson); older heartbeats are dropped"""
+        at = at or timezone.now()
+        with self._lock:
+            current = self._entries.get((user_id, lesson_id))
+            if current is None or at >= current[2]:
+                self._entries[(user_id, lesson_id)] = (section_id, position, at)
+        self._start()
+
+    def pending(self, user_id, lesson_ids=None):
+        """Buffered {lesson_id: (section_id, position, at)} for a user"""
+        with self._lock:
+            return {
+                lesson_id: entry for (entry_user, lesson_id), entry in self._entries.items()
+                if entry_user == user_id and (lesson_ids is None or lesson_id in lesson_ids)
+            }
+
+    def flush(self):
+        """Write every buffered position; returns the number of rows written"""
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        if not entries:
+            return 0
+        try:
+            return self._write(entries)
+        except Exception:
+            # Put the positions back unless newer heartbeats arrived meanwhile
+            with self._lock:
+                for key, entry in entries.items():
+                    current = self._entries.get(key)
+                    if current is None or current[2] < entry[2]:
+                        self._entries[key] = entry
+            raise
+
+    def _write(self, entries):
+        # Heartbeats are not checked per request, so drop unknown lessons and sections here
+        lesson_ids = set(Lesson.objects.filter(id__in={key[1] for key in entries}).values_list('id', flat=True))
+        section_ids = set(LessonSection.objects.filter(
+            id__in={entry[0] for entry in entries.values() if entry[0]}
+        ).values_list('id', flat=True))
+        entries = {key: entry for key, entry in entries.items() if key[1] in lesson_ids}
+
+        with transaction.atomic():
+            existing = {
+                (progress.user_id, progress.lesson_id): progress
+                for progress in UserProgress.objects.filter(
+                    user_id__in={key[0] for key in entries},
+                    lesson_id__in={key[1] for key in entries}
+                ).only('id', 'user_id', 'lesson_id', 'position_updated_at')
+            }
+            to_create, to_update = [], []
+            now = timezone.now()
+            for (user_id, lesson_id), (section_id, position, at) in entries.items():
+                section_id = section_id if section_id in section_ids else None
+                progress = existing.get((user_id, lesson_id))
+                if progress is None:
+                    to_create.append(UserProgress(
+                        user_id=user_id, lesson_id=lesson_id, resume_section_id=section_id,
+                        resume_position=position, position_updated_at=at
+                    ))
+                elif progress.position_updated_at is None or progress.position_updated_at < at:
+                    # Another worker may already have written a newer position
+                    progress.resume_section_id = section_id
+                    progress.resume_position = position
+                    progress.position_updated_at = at
+                    progress.updated_at = now
+                    to_update.append(progress)
+
+            UserProgress.objects.bulk_create(to_create, ignore_conflicts=True)
+            UserProgress.objects.bulk_update(to_update, RESUME_FIELDS)
+        return len(to_create) + len(to_update)
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        interval = self.interval or getattr(settings, 'RESUME_FLUSH_SECONDS', 30)
+        stop = threading.Event()
+        while not stop.wait(interval):
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush resume positions")
+
+
+buffer = ResumeBuffer()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception("Failed to flush resume positions at exit")
+
+
+def resume_positions(user, lessons):
+    """
+    {lesson_id: {'section', 'position', 'updated_at'}} for `lessons`,
+    the database rows overlaid with anything still in the buffer.
+    """
+    lesson_ids = set(lessons.values_list('id', flat=True))
+    positions = {
+        lesson_id: (section_id, position, at)
+        for lesson_id, section_id, position, at in UserProgress.objects.filter(
+            user=user, lesson_id__in=lesson_ids, position_updated_at__isnull=False
+        ).values_list('lesson_id', 'resume_section_id', 'resume_position', 'position_updated_at')
+    }
+    for lesson_id, entry in buffer.pending(user.id, lesson_ids).items():
+        if lesson_id not in positions or positions[lesson_id][2] <= entry[2]:
+            positions[lesson_id] = entry
+
+    return {
+        lesson_id: {'section': section_id, 'position': position, 'updated_at': at}
+        for lesson_id, (section_id, position, at) in positions.items()
+    }
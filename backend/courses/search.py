@@ -0,0 +1,291 @@
+import base64
+import json
+import re
+import uuid
+from django.db import connection
+from django.utils.html import escape, strip_tags
+
+SEARCH_TABLE = 'courses_search_index'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def create_search_table(schema_editor):
+    """Create the search index table for the current database vendor"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f"""
+            CREATE TABLE {SEARCH_TABLE} (
+                object_type VARCHAR(20) NOT NULL,
+                object_id CHAR(32) NOT NULL,
+                course_id CHAR(32) NOT NULL,
+                lesson_id CHAR(32) NULL,
+                published BOOL NOT NULL DEFAULT 0,
+                title VARCHAR(200) NOT NULL,
+                body LONGTEXT NOT NULL,
+                PRIMARY KEY (object_type, object_id),
+                KEY {SEARCH_TABLE}_course (course_id),
+                FULLTEXT KEY {SEARCH_TABLE}_ft (title, body)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+    elif vendor == 'sqlite':
+        # FTS5 shadow table; only title and body are tokenized. No stemming, so
+        # prefix matches behave like MySQL's boolean mode
+        schema_editor.execute(f"""
+            CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+                object_type UNINDEXED, object_id UNINDEXED, course_id UNINDEXED,
+                lesson_id UNINDEXED, published UNINDEXED, title, body,
+                tokenize = 'unicode61'
+            )
+        """)
+    else:
+        schema_editor.execute(f"""
+            CREATE TABLE {SEARCH_TABLE} (
+                object_type VARCHAR(20) NOT NULL,
+                object_id CHAR(32) NOT NULL,
+                course_id CHAR(32) NOT NULL,
+                lesson_id CHAR(32) NULL,
+                published BOOLEAN NOT NULL DEFAULT FALSE,
+                title VARCHAR(200) NOT NULL,
+                body TEXT NOT NULL,
+                PRIMARY KEY (object_type, object_id)
+            )
+        """)
+
+
+def drop_search_table(schema_editor):
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def _hex(value):
+    return uuid.UUID(str(value)).hex if value is not None else None
+
+
+def _uuid(value):
+    return str(uuid.UUID(value)) if value else None
+
+
+def _text(*parts):
+    return ' '.join(strip_tags(part) for part in parts if part)
+
+
+def _write(object_type, object_id, course_id, lesson_id, published, title, body):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE object_type = %s AND object_id = %s",
+            [object_type, _hex(object_id)]
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (object_type, object_id, course_id, lesson_id, published, title, body) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [object_type, _hex(object_id), _hex(course_id), _hex(lesson_id), int(published), title, body]
+        )
+
+
+def index_course(course):
+    published = course.status == 'PUBLISHED'
+    _write('course', course.id, course.id, None, published, course.title, _text(course.description))
+    # Lessons and sections inherit the course's visibility
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {SEARCH_TABLE} SET published = %s WHERE course_id = %s",
+            [int(published), _hex(course.id)]
+        )
+
+
+def index_lesson(lesson, course):
+    _write(
+        'lesson', lesson.id, course.id, lesson.id, course.status == 'PUBLISHED',
+        lesson.title, _text(lesson.description, lesson.content)
+    )
+
+
+def index_section(section, course):
+    _write(
+        'section', section.id, course.id, section.lesson_id, course.status == 'PUBLISHED',
+        section.title, _text(section.description, section.content)
+    )
+
+
+def index_lessons_and_sections(course, lessons, sections):
+    """Index newly created lessons and sections of one course with a single multi-row insert"""
+    published = int(course.status == 'PUBLISHED')
+    rows = [
+        ('lesson', _hex(lesson.id), _hex(course.id), _hex(lesson.id), published,
+         lesson.title, _text(lesson.description, lesson.content))
+        for lesson in lessons
+    ] + [
+        ('section', _hex(section.id), _hex(course.id), _hex(section.lesson_id), published,
+         section.title, _text(section.description, section.content))
+        for section in sections
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (object_type, object_id, course_id, lesson_id, published, title, body) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            rows
+        )
+
+
+def remove_from_index(object_type, object_id):
+    """Remove a row; a course takes its lessons and sections with it, a lesson its sections"""
+    with connection.cursor() as cursor:
+        column = {'course': 'course_id', 'lesson': 'lesson_id'}.get(object_type, 'object_id')
+        params = [_hex(object_id)]
+        where = f"{column} = %s"
+        if object_type not in ('course', 'lesson'):
+            where += " AND object_type = %s"
+            params.append(object_type)
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {where}", params)
+
+
+def rebuild_index():
+    """Reindex every course, lesson and section"""
+    from .models import Course, Lesson, LessonSection
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    courses = {course.id: course for course in Course.objects.all()}
+    for course in courses.values():
+        index_course(course)
+    for lesson in Lesson.objects.select_related('module').iterator():
+        index_lesson(lesson, courses[lesson.module.course_id])
+    for section in LessonSection.objects.select_related('lesson__module').iterator():
+        index_section(section, courses[section.lesson.module.course_id])
+
+
+def parse_terms(query):
+    return [term.lower() for term in TOKEN_RE.findall(query or '')][:10]
+
+
+def encode_cursor(score, course_id):
+    raw = json.dumps({'s': score, 'c': course_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(data['s']), str(data['c'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def highlight(text, terms, width=160):
+    """Return an HTML-escaped excerpt around the first matching term with matches wrapped in <mark>"""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms if lowered.find(term) != -1]
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    excerpt = text[start:start + width]
+
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE) if terms else None
+    parts = []
+    last = 0
+    for match in pattern.finditer(excerpt) if pattern else []:
+        parts.append(escape(excerpt[last:match.start()]))
+        parts.append(f"<mark>{escape(match.group(0))}</mark>")
+        last = match.end()
+    parts.append(escape(excerpt[last:]))
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return prefix + ''.join(parts) + suffix
+
+
+def _match_sql(terms):
+    """Return (higher-is-better score expression, WHERE clause, score params, WHERE params)"""
+    vendor = connection.vendor
+    if vendor == 'mysql':
+        query = ' '.join(f'+{term}*' for term in terms)
+        match = "MATCH(title, body) AGAINST (%s IN BOOLEAN MODE)"
+        return match, match, [query], [query]
+    if vendor == 'sqlite':
+        query = ' '.join(f'"{term}"*' for term in terms)
+        # rank is bm25() exposed as a column, which stays usable inside subqueries
+        return "-rank", f"{SEARCH_TABLE} MATCH %s", [], [query]
+    like = ' AND '.join('(LOWER(title) LIKE %s OR LOWER(body) LIKE %s)' for _ in terms)
+    params = [value for term in terms for value in (f'%{term}%', f'%{term}%')]
+    return "1.0", like, [], params
+
+
+def search(query, limit=10, cursor=None, hits_per_course=3):
+    """
+    Ranked search grouped by course.
+
+    Courses are ordered by their best hit's score; `cursor` is the value
+    returned as `next_cursor` by the previous page.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return [], None
+
+    score_sql, where_sql, score_params, where_params = _match_sql(terms)
+    after = decode_cursor(cursor) if cursor else None
+
+    # Rank courses by their best matching document
+    having = ''
+    having_params = []
+    if after:
+        having = "HAVING MAX(score) < %s OR (MAX(score) = %s AND course_id > %s)"
+        having_params = [after[0], after[0], after[1]]
+
+    with connection.cursor() as db:
+        db.execute(
+            f"SELECT course_id, MAX(score) FROM ("
+            f"  SELECT course_id, {score_sql} AS score FROM {SEARCH_TABLE}"
+            f"  WHERE {where_sql} AND published = %s"
+            f") ranked GROUP BY course_id {having} "
+            f"ORDER BY MAX(score) DESC, course_id LIMIT %s",
+            score_params + where_params + [1] + having_params + [limit + 1]
+        )
+        course_rows = db.fetchall()
+
+    has_more = len(course_rows) > limit
+    course_rows = course_rows[:limit]
+    if not course_rows:
+        return [], None
+
+    course_ids = [row[0] for row in course_rows]
+    placeholders = ', '.join(['%s'] * len(course_ids))
+    with connection.cursor() as db:
+        db.execute(
+            f"SELECT object_type, object_id, course_id, lesson_id, title, body, {score_sql} AS score "
+            f"FROM {SEARCH_TABLE} WHERE {where_sql} AND course_id IN ({placeholders}) "
+            f"ORDER BY score DESC",
+            score_params + where_params + course_ids
+        )
+        hit_rows = db.fetchall()
+
+    hits_by_course = {}
+    for object_type, object_id, course_id, lesson_id, title, body, score in hit_rows:
+        hits = hits_by_course.setdefault(course_id, [])
+        if len(hits) < hits_per_course:
+            hits.append({
+                'type': object_type,
+                'id': _uuid(object_id),
+                'lesson_id': _uuid(lesson_id),
+                'title': title,
+                'snippet': highlight(body or title, terms),
+                'score': float(score),
+            })
+
+    from .models import Course
+    titles = {
+        course_id.hex: title
+        for course_id, title in Course.objects.filter(id__in=course_ids).values_list('id', 'title')
+    }
+
+    results = []
+    for course_id, score in course_rows:
+        results.append({
+            'course_id': _uuid(course_id),
+            'course_title': titles.get(course_id, ''),
+            'score': float(score),
+            'hits': hits_by_course.get(course_id, []),
+        })
+
+    last = course_rows[-1]
+    next_cursor = encode_cursor(float(last[1]), last[0]) if has_more else None
+    return results, next_cursor
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import CourseCategory, Course, Module, Lesson, UserProgress, Enrollment, LessonSection, ModuleProgress
 from users.models import User
+from backend.images import variant_urls
 
 class CourseCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -17,6 +18,7 @@ class CourseSerializer(serializers.ModelSerializer):
     module_count = serializers.SerializerMethodField()
     actual_duration_hours = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
+    thumbnail_variants = serializers.SerializerMethodField()
     class Meta:
         model = Course
         fields = '__all__'
@@ -30,14 +32,21 @@ class CourseSerializer(serializers.ModelSerializer):
         return obj.calculate_total_duration()
 
     def get_thumbnail_url(self, obj):
-        """Return absolute URL for thumbnail"""
+        """Return absolute URL for thumbnail, preferring the card-sized JPEG"""
         if obj.thumbnail:
             request = self.context.get('request')
+            variants = variant_urls(obj.thumbnail_variants, request)
+            if variants:
+                return variants.get('640', variants[max(variants, key=int)])['jpeg']
             if request:
                 return request.build_absolute_uri(obj.thumbnail.url)
             return obj.thumbnail.url
         return None
 
+    def get_thumbnail_variants(self, obj):
+        """Resized thumbnails by width, as WebP and JPEG"""
+        return variant_urls(obj.thumbnail_variants, self.context.get('request'))
+
     def validate_status(self, value):
         # If trying to set status to PUBLISHED, check if course has modules
         if value == 'PUBLISHED':
@@ -78,8 +87,17 @@ class ModuleSerializer(serializers.ModelSerializer):
 class ModuleProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = ModuleProgress
-        fields = ['id', 'user', 'module', 'is_completed', 'completed_at']
-        read_only_fields = ['user', 'completed_at']
+        fields = ['id', 'user', 'module', 'is_completed', 'completed_at', 'updated_at']
+        read_only_fields = ['user', 'completed_at', 'updated_at']
+
+class LessonListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Fetch the sections of every lesson in the list with a single query
+        from .tree import get_section_tree
+
+        lessons = list(data.all() if hasattr(data, 'all') else data)
+        get_section_tree(self.context, [lesson.id for lesson in lessons])
+        return super().to_representation(lessons)
 
 class LessonSerializer(serializers.ModelSerializer):
     sections = serializers.SerializerMethodField()
@@ -90,11 +108,12 @@ class LessonSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lesson
         fields = '__all__'
+        list_serializer_class = LessonListSerializer
 
     def get_sections(self, obj):
-        sections = obj.sections.filter(parent_section__isnull=True).order_by('order')
-        serializer = LessonSectionSerializer(sections, many=True, context=self.context)
-        return serializer.data
+        from .tree import get_section_tree
+
+        return get_section_tree(self.context, [obj.id]).roots(obj.id)
 
     def get_has_quiz(self, obj):
         return obj.content_type == 'QUIZ'
@@ -115,17 +134,55 @@ class LessonSectionSerializer(serializers.ModelSerializer):
         }
     
     def get_subsections(self, obj):
-        subsections = obj.subsections.all().order_by('order')
-        return LessonSectionSerializer(
-            subsections,
-            many=True,
-            context=self.context
-        ).data
+        from .tree import get_section_tree
+
+        return get_section_tree(self.context, [obj.lesson_id]).children(obj.id)
+class CourseTreeModuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Module
+        fields = '__all__'
+
+class CourseTreeLessonSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = '__all__'
+
+class CourseTreeSectionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LessonSection
+        fields = '__all__'
+
 class UserProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProgress
         fields = '__all__'
-        read_only_fields = ('user', 'last_accessed', 'completed_at')
+        read_only_fields = (
+            'user', 'last_accessed', 'completed_at', 'resume_section', 'resume_position', 'position_updated_at',
+            'completion_updated_at'
+        )
+
+
+class ProgressEventSerializer(serializers.Serializer):
+    lesson = serializers.UUIDField()
+    is_completed = serializers.BooleanField()
+    client_timestamp = serializers.DateTimeField(required=False)
+
+
+class ResumePositionSerializer(serializers.Serializer):
+    lesson = serializers.UUIDField()
+    section = serializers.UUIDField(required=False, allow_null=True)
+    position = serializers.FloatField(min_value=0)
+
+
+class ReorderSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=1000)
+    version = serializers.IntegerField(min_value=1)
+
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    users = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=10000)
+    courses = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=100)
+    notify = serializers.BooleanField(default=True)
 
 
 class EnrollmentSerializer(serializers.ModelSerializer):
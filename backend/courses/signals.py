@@ -1,8 +1,12 @@
-from django.db.models.signals import post_save
+import weakref
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.db import transaction
-from .models import UserProgress, ModuleProgress, Lesson
+from django.db.models import Count, Exists, OuterRef, Q, QuerySet
+from .models import Course, UserProgress, ModuleProgress, Module, Lesson, LessonSection, Tombstone
 from django.utils import timezone
+from . import search
+from backend.images import refresh_derivatives, THUMBNAIL_WIDTHS
 
 @receiver(post_save, sender=UserProgress)
 def update_module_progress_from_lesson(sender, instance, **kwargs):
@@ -15,39 +19,37 @@ def update_module_progress_from_lesson(sender, instance, **kwargs):
 def _update_module_progress(instance):
     """Actual implementation separated to avoid recursion"""
     if instance.is_completed:
-        module = instance.lesson.module
-        user = instance.user
-        
-        # Get all lessons in this module
-        lessons = Lesson.objects.filter(module=module)
-        
-        # Count completed lessons for this user in this module
-        completed_lessons = UserProgress.objects.filter(
-            user=user,
-            lesson__in=lessons,
-            is_completed=True
-        ).count()
-        
-        # Update module progress if all lessons are completed
-        if completed_lessons == lessons.count():
-            # Use update_or_create but avoid signal recursion
-            progress, created = ModuleProgress.objects.get_or_create(
-                user=user,
-                module=module,
-                defaults={
-                    'is_completed': True,
-                    'completed_at': instance.completed_at or timezone.now()
-                }
-            )
-            if not created and not progress.is_completed:
-                # Manually update without triggering post_save
-                ModuleProgress.objects.filter(
-                    user=user, 
-                    module=module
-                ).update(
-                    is_completed=True,
-                    completed_at=instance.completed_at or timezone.now()
-                )
+        # Resolve the lesson's module inside the aggregate query itself
+        module_ids = Lesson.objects.filter(pk=instance.lesson_id).values('module_id')
+        complete_finished_modules(instance.user_id, module_ids, instance.completed_at)
+
+def complete_finished_modules(user_id, module_ids, completed_at=None):
+    """
+    Mark every module in module_ids whose lessons the user has all completed.
+
+    Lesson totals and completed counts come from one grouped query; the
+    ModuleProgress rows are then inserted/updated in bulk, so the number of
+    queries does not depend on how many modules or lessons are involved.
+    """
+    completed_at = completed_at or timezone.now()
+    counts = Lesson.objects.filter(module_id__in=module_ids).values('module_id').annotate(
+        total=Count('id'),
+        done=Count('id', filter=Q(Exists(UserProgress.objects.filter(
+            user_id=user_id, lesson_id=OuterRef('pk'), is_completed=True
+        ))))
+    )
+    finished = [row['module_id'] for row in counts if row['total'] and row['done'] == row['total']]
+    if not finished:
+        return []
+
+    ModuleProgress.objects.bulk_create([
+        ModuleProgress(user_id=user_id, module_id=module_id, is_completed=True, completed_at=completed_at)
+        for module_id in finished
+    ], ignore_conflicts=True)
+    ModuleProgress.objects.filter(
+        user_id=user_id, module_id__in=finished, is_completed=False
+    ).update(is_completed=True, completed_at=completed_at, updated_at=timezone.now())
+    return finished
 
 @receiver(post_save, sender=ModuleProgress)
 def update_lesson_progress_from_module(sender, instance, **kwargs):
@@ -60,30 +62,192 @@ def update_lesson_progress_from_module(sender, instance, **kwargs):
 def _update_lesson_progress(instance):
     """Actual implementation separated to avoid recursion"""
     if instance.is_completed:
-        user = instance.user
-        module = instance.module
         completed_at = instance.completed_at or timezone.now()
-        
-        # Get all lessons in this module
-        lessons = Lesson.objects.filter(module=module)
-        
-        # Mark all lessons as completed without triggering individual signals
-        for lesson in lessons:
-            # Use update_or_create but update without save if possible
-            progress, created = UserProgress.objects.get_or_create(
-                user=user,
-                lesson=lesson,
-                defaults={
-                    'is_completed': True,
-                    'completed_at': completed_at
-                }
-            )
-            if not created and not progress.is_completed:
-                # Manually update without triggering post_save
-                UserProgress.objects.filter(
-                    user=user,
-                    lesson=lesson
-                ).update(
-                    is_completed=True,
-                    completed_at=completed_at
-                )
\ No newline at end of file
+        lesson_ids = list(Lesson.objects.filter(module_id=instance.module_id).values_list('id', flat=True))
+
+        # Create the missing rows, then complete the existing incomplete ones.
+        # Neither statement sends post_save, so this does not recurse.
+        UserProgress.objects.bulk_create([
+            UserProgress(user_id=instance.user_id, lesson_id=lesson_id, is_completed=True, completed_at=completed_at)
+            for lesson_id in lesson_ids
+        ], ignore_conflicts=True)
+        UserProgress.objects.filter(
+            user_id=instance.user_id,
+            lesson_id__in=lesson_ids,
+            is_completed=False
+        ).update(is_completed=True, completed_at=completed_at, updated_at=timezone.now())
+
+def backfill_lesson_progress(completions, batch_size=1000, dry_run=False):
+    """
+    Complete every lesson of every (user_id, module_id, completed_at) module completion.
+
+    Set-based counterpart of _update_lesson_progress for imports: lessons and
+    existing progress are read in two queries, then missing rows are inserted
+    and incomplete ones updated in bulk. Returns (created, updated); with
+    dry_run nothing is written.
+    """
+    completed_at_by_pair = {}
+    for user_id, module_id, completed_at in completions:
+        completed_at_by_pair[(user_id, module_id)] = completed_at or timezone.now()
+    if not completed_at_by_pair:
+        return 0, 0
+
+    user_ids = {user_id for user_id, _ in completed_at_by_pair}
+    module_ids = {module_id for _, module_id in completed_at_by_pair}
+    lessons = list(Lesson.objects.filter(module_id__in=module_ids).values_list('id', 'module_id'))
+
+    existing = {
+        (user_id, lesson_id): (pk, is_completed)
+        for pk, user_id, lesson_id, is_completed in UserProgress.objects.filter(
+            user_id__in=user_ids, lesson_id__in=[lesson_id for lesson_id, _ in lessons]
+        ).values_list('id', 'user_id', 'lesson_id', 'is_completed')
+    }
+
+    lessons_by_module = {}
+    for lesson_id, module_id in lessons:
+        lessons_by_module.setdefault(module_id, []).append(lesson_id)
+
+    to_create, to_update = [], []
+    now = timezone.now()
+    for (user_id, module_id), completed_at in completed_at_by_pair.items():
+        for lesson_id in lessons_by_module.get(module_id, []):
+            pk, is_completed = existing.get((user_id, lesson_id), (None, False))
+            if pk is None:
+                to_create.append(UserProgress(
+                    user_id=user_id, lesson_id=lesson_id, is_completed=True, completed_at=completed_at
+                ))
+            elif not is_completed:
+                to_update.append(UserProgress(pk=pk, is_completed=True, completed_at=completed_at, updated_at=now))
+
+    if dry_run:
+        return len(to_create), len(to_update)
+
+    # Neither statement sends post_save, so the module signals are not re-run
+    UserProgress.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+    UserProgress.objects.bulk_update(to_update, ['is_completed', 'completed_at', 'updated_at'], batch_size=batch_size)
+    return len(to_create), len(to_update)
+
+
+# Course content versioning
+@receiver(post_save, sender=Module)
+def bump_version_from_module(sender, instance, **kwargs):
+    Course.bump_content_version(instance.course_id)
+
+@receiver(post_save, sender=Lesson)
+def bump_version_from_lesson(sender, instance, **kwargs):
+    course_id = Module.objects.filter(pk=instance.module_id).values_list('course_id', flat=True).first()
+    Course.bump_content_version(course_id)
+
+@receiver(post_save, sender=LessonSection)
+def bump_version_from_section(sender, instance, **kwargs):
+    course_id = Lesson.objects.filter(pk=instance.lesson_id).values_list('module__course_id', flat=True).first()
+    Course.bump_content_version(course_id)
+
+
+# Deletes. A cascade sends post_delete for every child row, so the receivers
+# below return before any query unless the row itself was the target of the
+# delete call; the target's own receiver covers its children. Course lookups
+# and version bumps are shared by all rows of one delete call, so a queryset
+# delete costs one lookup per parent and one bump per course.
+_delete_calls = {}
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+def deleted_directly(instance, origin):
+    """Whether `instance` was deleted itself rather than cascaded from its parent"""
+    return _origin_model(origin) is type(instance)
+
+def _delete_call(origin):
+    # Keyed by identity: model instances compare by pk, which the delete clears
+    key = id(origin)
+    if key not in _delete_calls:
+        _delete_calls[key] = {'courses': {}, 'bumped': set()}
+        weakref.finalize(origin, _delete_calls.pop, key, None)
+    return _delete_calls[key]
+
+def course_for_delete(origin, parent_model, parent_id, course_field):
+    """The course of a deleted row's parent, looked up once per parent for the delete call"""
+    courses = _delete_call(origin)['courses']
+    key = (parent_model, parent_id)
+    if key not in courses:
+        courses[key] = parent_model.objects.filter(pk=parent_id).values_list(course_field, flat=True).first()
+    return courses[key]
+
+def bump_for_delete(origin, course_id):
+    """Bump the course's content version once for the delete call"""
+    bumped = _delete_call(origin)['bumped']
+    if course_id and course_id not in bumped:
+        bumped.add(course_id)
+        Course.bump_content_version(course_id)
+
+@receiver(post_delete, sender=Module)
+def record_module_deletion(sender, instance, origin=None, **kwargs):
+    if deleted_directly(instance, origin):
+        bump_for_delete(origin, instance.course_id)
+        Tombstone.record('module', instance, instance.course_id)
+
+@receiver(post_delete, sender=Lesson)
+def record_lesson_deletion(sender, instance, origin=None, **kwargs):
+    if deleted_directly(instance, origin):
+        course_id = course_for_delete(origin, Module, instance.module_id, 'course_id')
+        bump_for_delete(origin, course_id)
+        Tombstone.record('lesson', instance, course_id)
+
+@receiver(post_delete, sender=LessonSection)
+def record_section_deletion(sender, instance, origin=None, **kwargs):
+    # Subsections cascaded from a deleted section count as direct: they share its lesson
+    if deleted_directly(instance, origin):
+        course_id = course_for_delete(origin, Lesson, instance.lesson_id, 'module__course_id')
+        bump_for_delete(origin, course_id)
+        Tombstone.record('section', instance, course_id)
+
+@receiver(post_delete, sender=UserProgress)
+def record_progress_deletion(sender, instance, origin=None, **kwargs):
+    if deleted_directly(instance, origin):
+        course_id = course_for_delete(origin, Lesson, instance.lesson_id, 'module__course_id')
+        Tombstone.record('progress', instance, course_id, instance.user_id)
+
+@receiver(post_delete, sender=ModuleProgress)
+def record_module_progress_deletion(sender, instance, origin=None, **kwargs):
+    if deleted_directly(instance, origin):
+        course_id = course_for_delete(origin, Module, instance.module_id, 'course_id')
+        Tombstone.record('module_progress', instance, course_id, instance.user_id)
+
+
+# Search index maintenance
+@receiver(post_save, sender=Course)
+def index_course_for_search(sender, instance, **kwargs):
+    search.index_course(instance)
+
+@receiver(post_save, sender=Course)
+def update_thumbnail_variants(sender, instance, **kwargs):
+    """Resize a new thumbnail to the catalog card widths"""
+    refresh_derivatives(instance, 'thumbnail', 'thumbnail_variants', THUMBNAIL_WIDTHS)
+
+@receiver(post_delete, sender=Course)
+def remove_course_from_search(sender, instance, **kwargs):
+    search.remove_from_index('course', instance.id)
+
+@receiver(post_save, sender=Lesson)
+def index_lesson_for_search(sender, instance, **kwargs):
+    course = Course.objects.filter(modules__id=instance.module_id).first()
+    if course:
+        search.index_lesson(instance, course)
+
+@receiver(post_delete, sender=Lesson)
+def remove_lesson_from_search(sender, instance, origin=None, **kwargs):
+    # Removes the lesson's sections too; a deleted course clears all of its rows
+    if _origin_model(origin) in (Lesson, Module):
+        search.remove_from_index('lesson', instance.id)
+
+@receiver(post_save, sender=LessonSection)
+def index_section_for_search(sender, instance, **kwargs):
+    course = Course.objects.filter(modules__lessons__id=instance.lesson_id).first()
+    if course:
+        search.index_section(instance, course)
+
+@receiver(post_delete, sender=LessonSection)
+def remove_section_from_search(sender, instance, origin=None, **kwargs):
+    if deleted_directly(instance, origin):
+        search.remove_from_index('section', instance.id)
@@ -1,3 +1,1538 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from datetime import timedelta
+from unittest import mock
+import pandas as pd
+from PIL import Image
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 
-# Create your tests here.
+from assessments.models import Question, Answer, Survey, SurveyQuestion, SurveyChoice, UserAttempt
+from backend import media
+from backend.pagination import KeysetPagination
+from notifications.models import Notification
+from users.models import User
+from .models import (
+    Course, Module, Lesson, LessonSection, UserProgress, ModuleProgress, Enrollment, BackgroundJob,
+    OfflinePackage, CourseSnapshot, CourseRecommendation, Tombstone,
+)
+from .admin import enqueue_lesson_completion_migration
+from .bundle import export_course, import_course, BundleError
+from .clone import clone_course
+from .completion import course_completion_rates
+from .progress_import import stage_sheet, hash_passwords
+from .recommendations import build_recommendations, recommended_courses
+from .resume import ResumeBuffer, resume_positions
+from .rendering import render_content
+from .offline import get_package, build_delta
+from .sync import course_changes
+from .dashboard import learner_dashboard, dashboard_etag
+from .serializers import LessonSerializer
+from .tree import get_section_tree, get_course_snapshot
+from . import resume, search
+from .signals import _update_lesson_progress, _update_module_progress
+
+
+class ProgressPropagationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='learner@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+        )
+        self.course = Course.objects.create(title='Course', description='Course', created_by=self.user)
+
+    def make_module(self, lesson_count):
+        module = Module.objects.create(course=self.course, title=f'Module {lesson_count}')
+        lessons = [
+            Lesson.objects.create(module=module, title=f'Lesson {i}', content_type='TEXT', order=i)
+            for i in range(lesson_count)
+        ]
+        return module, lessons
+
+    def complete_module(self, module):
+        with self.captureOnCommitCallbacks():
+            return ModuleProgress.objects.create(user=self.user, module=module, is_completed=True)
+
+    def complete_lesson(self, lesson):
+        with self.captureOnCommitCallbacks():
+            return UserProgress.objects.create(user=self.user, lesson=lesson, is_completed=True)
+
+    def test_lesson_backfill_query_count_is_constant(self):
+        for lesson_count in (2, 40):
+            module, lessons = self.make_module(lesson_count)
+            # One lesson already started but not completed
+            UserProgress.objects.bulk_create([UserProgress(user=self.user, lesson=lessons[0])])
+            progress = self.complete_module(module)
+
+            # lesson ids + bulk insert + update of incomplete rows
+            with self.assertNumQueries(3):
+                _update_lesson_progress(progress)
+
+            self.assertEqual(
+                UserProgress.objects.filter(user=self.user, lesson__module=module, is_completed=True).count(),
+                lesson_count
+            )
+
+    def test_module_completion_query_count_is_constant(self):
+        for lesson_count in (2, 40):
+            module, lessons = self.make_module(lesson_count)
+            UserProgress.objects.bulk_create([
+                UserProgress(user=self.user, lesson=lesson, is_completed=True) for lesson in lessons[:-1]
+            ])
+
+            progress = self.complete_lesson(lessons[-1])
+            # grouped aggregate + bulk insert + update of incomplete rows
+            with self.assertNumQueries(3):
+                _update_module_progress(progress)
+
+            self.assertTrue(ModuleProgress.objects.get(user=self.user, module=module).is_completed)
+
+    def test_module_not_completed_until_all_lessons_done(self):
+        module, lessons = self.make_module(5)
+        progress = self.complete_lesson(lessons[0])
+
+        with self.assertNumQueries(1):
+            _update_module_progress(progress)
+
+        self.assertFalse(ModuleProgress.objects.filter(user=self.user, module=module).exists())
+
+    def test_signals_run_on_commit(self):
+        module, lessons = self.make_module(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            ModuleProgress.objects.create(user=self.user, module=module, is_completed=True)
+
+        self.assertEqual(
+            UserProgress.objects.filter(user=self.user, lesson__module=module, is_completed=True).count(), 3
+        )
+
+
+class CompletionRateTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+
+    def make_course(self, lesson_count):
+        course = Course.objects.create(
+            title=f'Course {lesson_count}', description='Course', created_by=self.author, status='PUBLISHED'
+        )
+        module = Module.objects.create(course=course, title='Module')
+        lessons = Lesson.objects.bulk_create([
+            Lesson(module=module, title=f'Lesson {i}', content_type='TEXT', order=i) for i in range(lesson_count)
+        ])
+        return course, lessons
+
+    def make_learner(self, n, course, lessons):
+        learner = User.objects.create_user(
+            email=f'learner{n}@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+        )
+        Enrollment.objects.create(user=learner, course=course)
+        UserProgress.objects.bulk_create([
+            UserProgress(user=learner, lesson=lesson, is_completed=True) for lesson in lessons
+        ])
+        return learner
+
+    def test_counts_learners_who_completed_every_lesson(self):
+        course, lessons = self.make_course(3)
+        self.make_learner(1, course, lessons)
+        self.make_learner(2, course, lessons[:2])
+        other, other_lessons = self.make_course(1)
+        self.make_learner(3, other, other_lessons)
+        # Progress without an enrollment is not a completion
+        UserProgress.objects.bulk_create([
+            UserProgress(user=self.author, lesson=lesson, is_completed=True) for lesson in lessons
+        ])
+
+        with self.assertNumQueries(4):
+            rates = course_completion_rates()
+
+        by_course = {row['course_id']: row for row in rates['courses']}
+        self.assertEqual(by_course[course.id]['total_enrollments'], 2)
+        self.assertEqual(by_course[course.id]['completed_enrollments'], 1)
+        self.assertEqual(by_course[course.id]['completion_rate'], 50.0)
+        self.assertEqual(by_course[other.id]['completed_enrollments'], 1)
+        self.assertEqual(rates['overall_completion_rate'], 66.67)
+
+
+class ResumePositionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='learner@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+        )
+        course = Course.objects.create(title='Course', description='Course', created_by=self.user)
+        module = Module.objects.create(course=course, title='Module')
+        self.lessons = Lesson.objects.bulk_create([
+            Lesson(module=module, title=f'Lesson {i}', content_type='VIDEO', order=i) for i in range(3)
+        ])
+        self.buffer = ResumeBuffer(interval=3600)
+
+    def test_heartbeats_coalesce_into_one_write_per_lesson(self):
+        for second in range(10):
+            for lesson in self.lessons:
+                self.buffer.record(self.user.id, lesson.id, None, float(second))
+
+        # lessons + existing rows + bulk insert, plus the transaction's savepoint pair
+        with self.assertNumQueries(5):
+            self.assertEqual(self.buffer.flush(), 3)
+
+        self.assertEqual(
+            set(UserProgress.objects.filter(user=self.user).values_list('resume_position', flat=True)), {9.0}
+        )
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_flush_keeps_completion_state(self):
+        UserProgress.objects.create(user=self.user, lesson=self.lessons[0], is_completed=True)
+        self.buffer.record(self.user.id, self.lessons[0].id, None, 42.5)
+        self.buffer.flush()
+
+        progress = UserProgress.objects.get(user=self.user, lesson=self.lessons[0])
+        self.assertTrue(progress.is_completed)
+        self.assertEqual(progress.resume_position, 42.5)
+
+    def test_reads_merge_buffer_over_database(self):
+        self.buffer.record(self.user.id, self.lessons[0].id, None, 10)
+        self.buffer.flush()
+        original = resume.buffer
+        resume.buffer = self.buffer
+        try:
+            self.buffer.record(self.user.id, self.lessons[0].id, None, 20)
+            self.buffer.record(self.user.id, self.lessons[1].id, None, 5)
+            positions = resume_positions(self.user, Lesson.objects.filter(module__course__title='Course'))
+        finally:
+            resume.buffer = original
+
+        self.assertEqual(positions[self.lessons[0].id]['position'], 20)
+        self.assertEqual(positions[self.lessons[1].id]['position'], 5)
+        self.assertNotIn(self.lessons[2].id, positions)
+
+
+class RenderContentTests(TestCase):
+    def test_sanitizes_html(self):
+        rendered = render_content(
+            '<p onclick="steal()">Hi <a href="javascript:alert(1)">x</a></p>'
+            '<script>alert(1)</script><img src="a.png" onerror="steal()"><p>open <em>tag'
+        )
+        self.assertEqual(
+            rendered['content_html'],
+            '<p>Hi <a>x</a></p><img src="a.png"><p>open <em>tag</em></p>'
+        )
+        self.assertEqual(rendered['excerpt'], 'Hi x open tag')
+        self.assertEqual(rendered['word_count'], 4)
+
+    def test_self_closed_drop_tags_do_not_swallow_what_follows(self):
+        # Unquoted, as in <iframe src=x/>, the slash belongs to the value and the tag stays open
+        for tag in ('<svg/>', '<iframe src="x"/>', '<math/>', '<script />'):
+            rendered = render_content(f'<p>before</p>{tag}<p>after</p>')
+            self.assertEqual(rendered['content_html'], '<p>before</p><p>after</p>', tag)
+
+    def test_unclosed_drop_tags_do_not_swallow_what_follows(self):
+        # Dropping stops where the parent element ends
+        rendered = render_content('<div><iframe>fallback<p>inside</p></div><p>after</p>')
+        self.assertEqual(rendered['content_html'], '<div></div><p>after</p>')
+        # Or, with no parent, at the end of input: the rest is parsed again
+        for tag in ('<iframe src="x">', '<svg><g>', '<embed src="x">', '<script>'):
+            rendered = render_content(f'<p>before</p>{tag}<p>after</p>')
+            self.assertEqual(rendered['content_html'], '<p>before</p><p>after</p>', tag)
+        rendered = render_content('<p>a</p><script>alert(1)<b>bold</b>')
+        self.assertEqual(rendered['content_html'], '<p>a</p>alert(1)<b>bold</b>')
+
+    def test_drops_script_and_data_urls(self):
+        rendered = render_content(
+            '<a href="JaVaScRiPt:alert(1)">a</a><a href=" javascript:alert(1)">b</a>'
+            '<a href="java&#x09;script:alert(1)">c</a><a href="javascript&colon;alert(1)">d</a>'
+            '<img src="data:image/svg+xml;base64,PHN2Zz4=">'
+            '<a href="https://example.com/" target="_blank">e</a><a href="/lessons/1">f</a>'
+        )
+        self.assertEqual(
+            rendered['content_html'],
+            '<a>a</a><a>b</a><a>c</a><a>d</a><img>'
+            '<a href="https://example.com/" target="_blank" rel="noopener noreferrer">e</a>'
+            '<a href="/lessons/1">f</a>'
+        )
+
+    def test_lesson_save_renders_content(self):
+        user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        course = Course.objects.create(title='Course', description='Course', created_by=user)
+        module = Module.objects.create(course=course, title='Module')
+        lesson = Lesson.objects.create(module=module, title='Lesson', content_type='TEXT', content='<p>one</p>')
+        self.assertEqual(lesson.content_html, '<p>one</p>')
+
+        lesson.content = '<p>%s</p>' % ' '.join(['word'] * 450)
+        lesson.save(update_fields=['content'])
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.word_count, 450)
+        self.assertEqual(lesson.reading_minutes, 3)
+
+    def test_backfill_migration_renders_existing_rows(self):
+        from django.apps import apps
+        migration = importlib.import_module('courses.migrations.0024_render_lesson_content')
+
+        user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        course = Course.objects.create(title='Course', description='Course', created_by=user)
+        module = Module.objects.create(course=course, title='Module')
+        source = '<p onclick="x()">Old <b>lesson</b></p><script>alert(1)</script>'
+        lesson = Lesson.objects.create(module=module, title='Lesson', content_type='TEXT', content=source)
+        # As saved before content_html existed
+        Lesson.objects.filter(pk=lesson.pk).update(content_html='', excerpt='', word_count=0)
+        version = Course.objects.get(pk=course.pk).content_version
+
+        migration.render_lesson_content(apps, None)
+
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.content_html, render_content(source)['content_html'])
+        self.assertEqual((lesson.excerpt, lesson.word_count), ('Old lesson', 2))
+        self.assertEqual(Course.objects.get(pk=course.pk).content_version, version + 1)
+
+
+class OfflinePackageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        self.course = Course.objects.create(title='Course', description='Course', created_by=user)
+        self.module = Module.objects.create(course=self.course, title='Module')
+        self.lessons = [
+            Lesson.objects.create(module=self.module, title=f'Lesson {i}', content_type='TEXT', content=f'<p>{i}</p>')
+            for i in range(3)
+        ]
+
+    def test_delta_holds_only_changed_items(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            first = get_package(self.course)
+            self.lessons[0].content = '<p>changed</p>'
+            self.lessons[0].save()
+            removed = self.lessons[1].id
+            self.lessons[1].delete()
+            self.course.refresh_from_db()
+            second = get_package(self.course)
+            first.refresh_from_db()
+            with build_delta(second, first) as delta, zipfile.ZipFile(delta) as archive:
+                changes = json.loads(archive.read('delta.json'))
+                names = set(archive.namelist())
+
+        self.assertNotEqual(first.version_key, second.version_key)
+        # Superseded packages keep their manifest but not their file
+        self.assertFalse(first.file)
+        self.assertEqual(changes['added'], [])
+        self.assertEqual(changes['changed'], sorted(['course.json', f'lessons/{self.lessons[0].id}.json']))
+        self.assertEqual(changes['removed'], [f'lessons/{removed}.json'])
+        self.assertEqual(names, {'delta.json', 'manifest.json', *changes['changed']})
+
+    def test_losing_a_concurrent_build_keeps_the_winner_file(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            first = get_package(self.course)
+            with open(first.file.path, 'rb') as f:
+                original = f.read()
+            # A second request that looked before the first one saved its row
+            with mock.patch.object(OfflinePackage.objects, 'filter', return_value=mock.Mock(first=lambda: None)):
+                second = get_package(self.course)
+
+            self.assertEqual((second.pk, second.file.name), (first.pk, first.file.name))
+            with open(first.file.path, 'rb') as f:
+                self.assertEqual(f.read(), original)
+            self.assertEqual(os.listdir(os.path.dirname(first.file.path)), [os.path.basename(first.file.name)])
+
+
+class CourseSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='learner@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+        )
+        self.course = Course.objects.create(title='Course', description='Course', created_by=self.user)
+        self.module = Module.objects.create(course=self.course, title='Module')
+        self.lessons = [
+            Lesson.objects.create(module=self.module, title=f'Lesson {i}', content_type='TEXT') for i in range(3)
+        ]
+
+    def test_returns_only_rows_changed_since_cursor(self):
+        since = timezone.now()
+        self.lessons[0].title = 'Renamed'
+        self.lessons[0].save(update_fields=['title'])
+        removed = self.lessons[1].id
+        self.lessons[1].delete()
+        with self.captureOnCommitCallbacks():
+            UserProgress.objects.create(user=self.user, lesson=self.lessons[2], is_completed=True)
+
+        # one query per synced model plus the tombstones
+        with self.assertNumQueries(8):
+            changes = course_changes(self.course, self.user, since)
+
+        self.assertEqual([lesson['title'] for lesson in changes['lessons']], ['Renamed'])
+        self.assertEqual(changes['modules'], [])
+        self.assertEqual(len(changes['progress']), 1)
+        self.assertEqual(changes['deleted']['lessons'], [str(removed)])
+
+    def test_cascaded_rows_leave_no_tombstones(self):
+        since = timezone.now()
+        module_id = self.module.id
+        self.module.delete()
+
+        changes = course_changes(self.course, self.user, since)
+        self.assertEqual(changes['deleted']['modules'], [str(module_id)])
+        self.assertEqual(changes['deleted']['lessons'], [])
+
+
+class LearnerDashboardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='learner@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+        )
+
+    def enroll(self, n, lesson_count=2):
+        course = Course.objects.create(title=f'Course {n}', description='Course', created_by=self.user)
+        module = Module.objects.create(course=course, title='Module')
+        lessons = Lesson.objects.bulk_create([
+            Lesson(module=module, title=f'Lesson {i}', content_type='TEXT', order=i) for i in range(lesson_count)
+        ])
+        Enrollment.objects.create(user=self.user, course=course)
+        return lessons
+
+    def test_query_count_does_not_grow_with_enrollments(self):
+        lessons = self.enroll(1)
+        UserProgress.objects.bulk_create([UserProgress(user=self.user, lesson=lesson, is_completed=True) for lesson in lessons])
+        # enrollments, lesson totals, progress, module progress, certificates,
+        # attempt stats, recent attempts, unread notifications
+        with self.assertNumQueries(8):
+            learner_dashboard(self.user)
+
+        for n in range(2, 6):
+            self.enroll(n)
+        with self.assertNumQueries(8):
+            dashboard = learner_dashboard(self.user)
+
+        self.assertEqual(dashboard['stats']['enrolled_courses'], 5)
+        self.assertEqual(dashboard['stats']['completed_courses'], 1)
+
+    def test_etag_changes_with_progress(self):
+        lessons = self.enroll(1)
+        etag = dashboard_etag(self.user)
+        self.assertEqual(dashboard_etag(self.user), etag)
+
+        with self.captureOnCommitCallbacks():
+            UserProgress.objects.create(user=self.user, lesson=lessons[0], is_completed=True)
+        self.assertNotEqual(dashboard_etag(self.user), etag)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+
+    def make_course(self, title, lesson_content='', status='PUBLISHED'):
+        course = Course.objects.create(title=title, description='Course', created_by=self.user, status=status)
+        module = Module.objects.create(course=course, title='Module')
+        Lesson.objects.create(module=module, title='Lesson', content_type='TEXT', content=lesson_content)
+        return course
+
+    def test_ranks_courses_by_best_hit(self):
+        strong = self.make_course('Photosynthesis', '<p>photosynthesis photosynthesis photosynthesis</p>')
+        weak = self.make_course('Botany', '<p>Plants, soil, water and a word on photosynthesis among many others</p>')
+        self.make_course('Photosynthesis drafts', '<p>photosynthesis</p>', status='DRAFT')
+        self.make_course('Geology', '<p>rocks</p>')
+
+        results, next_cursor = search.search('photosynth')
+
+        self.assertEqual([result['course_id'] for result in results], [str(strong.id), str(weak.id)])
+        self.assertIsNone(next_cursor)
+        self.assertIn('<mark>', results[1]['hits'][0]['snippet'])
+
+    def test_cursor_pages_through_every_course_once(self):
+        courses = {str(self.make_course(f'Algebra {n}', '<p>algebra</p>').id) for n in range(5)}
+
+        seen, cursor = [], None
+        for _ in range(5):
+            results, cursor = search.search('algebra', limit=2, cursor=cursor)
+            seen += [result['course_id'] for result in results]
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), courses)
+
+
+class ProgressSyncTests(TestCase):
+    url = '/api/courses/user/progress/sync/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='learner@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+        )
+        course = Course.objects.create(title='Course', description='Course', created_by=self.user)
+        module = Module.objects.create(course=course, title='Module')
+        self.lessons = Lesson.objects.bulk_create([
+            Lesson(module=module, title=f'Lesson {i}', content_type='TEXT', order=i) for i in range(2)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, *events):
+        return self.client.post(self.url, {'events': [
+            {'lesson': str(lesson.id), 'is_completed': is_completed, 'client_timestamp': at.isoformat()}
+            for lesson, is_completed, at in events
+        ]}, format='json')
+
+    def test_latest_event_in_batch_wins(self):
+        now = timezone.now()
+        lesson = self.lessons[0]
+        response = self.sync(
+            (lesson, True, now - timedelta(minutes=1)),
+            (lesson, False, now - timedelta(minutes=5)),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(UserProgress.objects.get(user=self.user, lesson=lesson).is_completed)
+
+    def test_events_older_than_applied_state_are_skipped(self):
+        now = timezone.now()
+        lesson = self.lessons[0]
+        self.sync((lesson, True, now - timedelta(minutes=1)))
+        # A batch queued earlier on another device arrives late
+        response = self.sync((lesson, False, now - timedelta(minutes=10)))
+
+        self.assertEqual(response.data['stale'], [str(lesson.id)])
+        self.assertEqual(response.data['applied'], 0)
+        self.assertTrue(UserProgress.objects.get(user=self.user, lesson=lesson).is_completed)
+
+    def test_uncompleting_clears_completed_at(self):
+        now = timezone.now()
+        lesson = self.lessons[0]
+        self.sync((lesson, True, now - timedelta(minutes=5)))
+        self.sync((lesson, False, now - timedelta(minutes=1)))
+
+        progress = UserProgress.objects.get(user=self.user, lesson=lesson)
+        self.assertFalse(progress.is_completed)
+        self.assertIsNone(progress.completed_at)
+
+    def test_rejects_body_that_is_not_an_object(self):
+        response = self.client.post(self.url, [{'lesson': str(self.lessons[0].id), 'is_completed': True}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        start = timezone.now()
+        # Two courses share a timestamp, so the id tie-breaker decides their order
+        self.courses = [
+            Course.objects.create(
+                title=f'Course {n}', description='Course', created_by=user,
+                created_at=start - timedelta(minutes=min(n, 3))
+            )
+            for n in range(5)
+        ]
+
+    def page(self, url):
+        paginator = KeysetPagination()
+        paginator.page_size = 2
+        request = Request(APIRequestFactory().get(url))
+        rows = paginator.paginate_queryset(Course.objects.all(), request)
+        return paginator, [course.id for course in rows]
+
+    def test_pages_cover_every_row_once_without_count(self):
+        url, seen = '/courses/', []
+        while url:
+            with self.assertNumQueries(1):
+                paginator, ids = self.page(url)
+            seen += ids
+            url = paginator.get_next_link()
+            self.assertNotIn('count', paginator.get_paginated_response([]).data)
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), {course.id for course in self.courses})
+        self.assertEqual(seen[:3], [course.id for course in self.courses[:3]])
+
+    def test_count_and_page_numbers_on_request(self):
+        paginator, ids = self.page('/courses/?include_count=true')
+        self.assertEqual(paginator.get_paginated_response([]).data['count'], 5)
+
+        paginator, ids = self.page('/courses/?page=3')
+        # Courses 3 and 4 share a timestamp; the lower id comes last
+        self.assertEqual(ids, [min(self.courses[3].id, self.courses[4].id)])
+        self.assertEqual(paginator.get_paginated_response([]).data['count'], 5)
+
+    def test_user_attempts_page_without_a_page_length_count(self):
+        learner = User.objects.create_user(
+            email='learner@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+        )
+        module = Module.objects.create(course=self.courses[0], title='Module')
+        lesson = Lesson.objects.create(module=module, title='Quiz', content_type='QUIZ')
+        UserAttempt.objects.bulk_create([UserAttempt(user=learner, lesson=lesson, score=n) for n in range(60)])
+        client = APIClient()
+        client.force_authenticate(learner)
+
+        url, scores = '/api/assessments/user-attempts/', []
+        while url:
+            data = client.get(url).data
+            self.assertNotIn('count', data)
+            scores += [attempt['score'] for attempt in data['data'].values()]
+            url = data['next']
+        self.assertEqual(sorted(scores), list(range(60)))
+
+        data = client.get('/api/assessments/user-attempts/', {'include_count': 'true'}).data
+        self.assertEqual((data['count'], len(data['data'])), (60, 50))
+
+
+class BulkEnrollTests(TestCase):
+    url = '/api/courses/bulk-enroll/'
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='Passw0rd!', first_name='Test', last_name='Admin', role='ADMIN'
+        )
+        self.learners = [
+            User.objects.create_user(
+                email=f'learner{n}@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+            )
+            for n in range(3)
+        ]
+        self.course = Course.objects.create(title='Course', description='Course', created_by=self.admin)
+        Enrollment.objects.create(user=self.learners[2], course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_reports_a_status_per_user_and_course(self):
+        missing_course = uuid.uuid4()
+        response = self.client.post(self.url, {
+            'users': [str(self.learners[0].id), 'LEARNER1@example.com', 'nobody@example.com', str(self.learners[2].id)],
+            'courses': [str(self.course.id), str(missing_course)],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        statuses = {
+            (row['user'], row['course_id']): row['status'] for row in response.data['results']
+        }
+        course_id = str(self.course.id)
+        self.assertEqual(statuses[(str(self.learners[0].id), course_id)], 'enrolled')
+        self.assertEqual(statuses[('LEARNER1@example.com', course_id)], 'enrolled')
+        self.assertEqual(statuses[('nobody@example.com', course_id)], 'user_not_found')
+        self.assertEqual(statuses[(str(self.learners[2].id), course_id)], 'already_enrolled')
+        self.assertEqual(statuses[(str(self.learners[0].id), str(missing_course))], 'course_not_found')
+        self.assertEqual(response.data['summary']['enrolled'], 2)
+        self.assertEqual(
+            response.data['summary']['notifications'],
+            Notification.objects.filter(recipient__in=self.learners[:2], notification_type='COURSE').count()
+        )
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 3)
+
+    def test_identifiers_that_are_neither_ids_nor_emails_are_not_found(self):
+        response = self.client.post(self.url, {
+            'users': [str(self.learners[0].id), 'learner1@example.com', 'bob', str(uuid.uuid4())],
+            'courses': [str(self.course.id)],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['status'] for row in response.data['results']],
+            ['enrolled', 'enrolled', 'user_not_found', 'user_not_found']
+        )
+
+    def test_pairs_enrolled_by_a_concurrent_call_are_not_reported(self):
+        pairs = {(learner.id, self.course.id) for learner in self.learners[:2]}
+        bulk_create = Enrollment.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # Another request enrolls the first learner between the read and the insert
+            Enrollment.objects.create(user=self.learners[0], course=self.course)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Enrollment.objects, 'bulk_create', racing_bulk_create):
+            created = Enrollment.enroll_many(pairs)
+
+        self.assertEqual(created, {(self.learners[1].id, self.course.id)})
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 3)
+
+    def test_learners_cannot_bulk_enroll(self):
+        self.client.force_authenticate(self.learners[0])
+        response = self.client.post(self.url, {
+            'users': [str(self.learners[1].id)], 'courses': [str(self.course.id)]
+        }, format='json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Enrollment.objects.filter(user=self.learners[1]).exists())
+
+    def test_requires_sign_in(self):
+        response = APIClient().post(self.url, {
+            'users': [str(self.learners[1].id)], 'courses': [str(self.course.id)]
+        }, format='json')
+
+        self.assertIn(response.status_code, (401, 403))
+
+
+class AdminBulkEnrollTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', password='Passw0rd!', first_name='Test', last_name='Admin'
+        )
+        self.learners = [
+            User.objects.create_user(
+                email=f'learner{n}@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+            )
+            for n in range(3)
+        ]
+        self.course = Course.objects.create(title='Course', description='Course', created_by=self.admin)
+        Enrollment.objects.create(user=self.learners[2], course=self.course)
+        self.client.force_login(self.admin)
+
+    def upload(self, rows, **data):
+        workbook = io.BytesIO()
+        pd.DataFrame(rows, columns=['user_email', 'user_id']).to_excel(workbook, index=False)
+        workbook.name = 'enroll.xlsx'
+        workbook.seek(0)
+        return self.client.post(
+            reverse('admin:courses_course_bulk_enroll'),
+            dict(data, excel_file=workbook, course_id=str(self.course.id))
+        )
+
+    def test_enrolls_new_users_and_reports_errors(self):
+        response = self.upload([
+            ['LEARNER0@example.com', ''],
+            ['', str(self.learners[1].id)],
+            ['learner0@example.com', ''],
+            ['nobody@example.com', ''],
+            ['', 'not-an-id'],
+            ['learner2@example.com', ''],
+        ])
+
+        self.assertRedirects(response, reverse('admin:courses_course_changelist'), fetch_redirect_response=False)
+        self.assertEqual(
+            set(Enrollment.objects.filter(course=self.course).values_list('user_id', flat=True)),
+            {learner.id for learner in self.learners}
+        )
+        self.assertEqual(
+            Notification.objects.filter(recipient__in=self.learners[:2], notification_type='COURSE').count(), 2
+        )
+        self.assertEqual(
+            [(row, error) for row, _, _, error in self.client.session['bulk_enroll_report']],
+            [(5, 'User not found'), (6, 'Invalid user ID')]
+        )
+
+    def test_dry_run_changes_nothing(self):
+        self.upload([['learner0@example.com', '']], dry_run='1')
+        self.assertFalse(Enrollment.objects.filter(user=self.learners[0]).exists())
+
+    def test_stored_error_report_is_capped(self):
+        with mock.patch('courses.admin.BULK_ENROLL_REPORT_ROWS', 2):
+            self.upload([[f'nobody{n}@example.com', ''] for n in range(5)])
+        self.assertEqual(len(self.client.session['bulk_enroll_report']), 2)
+
+
+class StageSheetTests(TestCase):
+    def test_reads_each_date_on_its_own_and_reports_unreadable_ones(self):
+        module_id = uuid.uuid4()
+        df = pd.DataFrame([
+            [1, 'Ann Lee', 'ann@example.com', '', 'completed 2024-01-15'],
+            [2, 'Bo Kim', 'bo@example.com', '', 'Completed Jan 3 2024'],
+            [3, 'Cy Ray', 'cy@example.com', '', 'completed 15/01/2024'],
+            [4, 'Di Fox', 'di@example.com', '', 'completed soon'],
+            [5, 'Ed Cho', 'ed@example.com', '', 'completed'],
+        ], columns=['No.', 'NAME', 'EMAIL ADDRESS', 'PHONE NUMBER', str(module_id)])
+
+        staged = stage_sheet(df)
+
+        dates = dict(staged['completions'][['email', 'completed_at']].itertuples(index=False))
+        self.assertEqual(dates['ann@example.com'].date().isoformat(), '2024-01-15')
+        self.assertEqual(dates['bo@example.com'].date().isoformat(), '2024-01-03')
+        self.assertEqual(dates['cy@example.com'].date().isoformat(), '2024-01-15')
+        self.assertNotIn('di@example.com', dates)
+        # No date given: completed now
+        self.assertEqual(dates['ed@example.com'].date(), timezone.now().date())
+        self.assertEqual(
+            staged['errors'], [f"Row 5, column '{module_id}': Invalid completion date 'completed soon'"]
+        )
+
+
+class LessonCompletionMigrationJobTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', password='Passw0rd!', first_name='Test', last_name='Admin'
+        )
+        self.request = RequestFactory().post('/')
+        self.request.user = self.admin
+
+    def running_job(self, heartbeat_at):
+        return BackgroundJob.objects.create(
+            kind='LESSON_COMPLETION_MIGRATION', status='RUNNING', created_by=self.admin,
+            started_at=heartbeat_at, heartbeat_at=heartbeat_at
+        )
+
+    def test_live_running_job_is_left_alone(self):
+        job = self.running_job(timezone.now())
+        with mock.patch('courses.admin.enqueue') as enqueue:
+            self.assertEqual(enqueue_lesson_completion_migration(self.request), job)
+        enqueue.assert_not_called()
+
+    def test_stale_running_job_is_resumed(self):
+        job = self.running_job(timezone.now() - BackgroundJob.STALE_AFTER - timedelta(minutes=1))
+        with mock.patch('courses.admin.enqueue') as enqueue:
+            self.assertEqual(enqueue_lesson_completion_migration(self.request), job)
+        enqueue.assert_called_once()
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+
+    def test_report_refreshes_heartbeat(self):
+        job = self.running_job(timezone.now() - BackgroundJob.STALE_AFTER - timedelta(minutes=1))
+        self.assertTrue(job.is_stale)
+        job.report(processed=10)
+        job.refresh_from_db()
+        self.assertFalse(job.is_stale)
+
+
+class ModuleProgressImportJobTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', password='Passw0rd!', first_name='Test', last_name='Admin'
+        )
+        self.client.force_login(self.admin)
+
+    def running_job(self, heartbeat_at):
+        return BackgroundJob.objects.create(
+            kind='MODULE_PROGRESS_IMPORT', status='RUNNING', created_by=self.admin,
+            started_at=heartbeat_at, heartbeat_at=heartbeat_at, errors=['Row 3: bad date']
+        )
+
+    def test_passwords_are_hashed_in_thread_with_progress(self):
+        progress = []
+        with mock.patch('courses.progress_import.HASH_REPORT_EVERY', 2):
+            hashed = hash_passwords(['a', 'b', 'c', 'd', 'e'], on_progress=progress.append)
+
+        self.assertEqual(progress, [2, 4])
+        self.assertTrue(check_password('e', hashed[4]))
+
+    def test_stale_import_is_failed(self):
+        stale = self.running_job(timezone.now() - BackgroundJob.STALE_AFTER - timedelta(minutes=1))
+        live = self.running_job(timezone.now())
+
+        response = self.client.get(reverse('admin:courses_moduleprogress_import_status', args=[stale.id]))
+
+        self.assertEqual(response.status_code, 200)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'FAILED')
+        self.assertIsNotNone(stale.finished_at)
+        self.assertEqual(len(stale.errors), 2)
+        self.assertEqual(BackgroundJob.objects.get(pk=live.pk).status, 'RUNNING')
+
+
+class CloneCourseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        self.course = Course.objects.create(
+            title='Course', description='Course', created_by=self.user, status='PUBLISHED'
+        )
+        module = Module.objects.create(course=self.course, title='Module')
+        lesson = Lesson.objects.create(module=module, title='Lesson', content_type='TEXT')
+        parent = LessonSection.objects.create(lesson=lesson, title='Parent')
+        LessonSection.objects.create(lesson=lesson, parent_section=parent, title='Child')
+        question = Question.objects.create(lesson=lesson, question_text='Why?', question_type='MCQ')
+        Answer.objects.create(question=question, answer_text='Because', is_correct=True)
+        survey = Survey.objects.create(module=module, title='Survey')
+        survey_question = SurveyQuestion.objects.create(survey=survey, question_text='How?', question_type='MCQ')
+        SurveyChoice.objects.create(question=survey_question, choice_text='Well')
+
+    def test_copies_every_level_under_new_ids(self):
+        copy = clone_course(self.course, self.user)
+
+        self.assertEqual((copy.title, copy.status), ('Course (Copy)', 'DRAFT'))
+        module = Module.objects.get(course=copy)
+        lesson = Lesson.objects.get(module=module)
+        child = LessonSection.objects.get(lesson=lesson, title='Child')
+        self.assertEqual(child.parent_section.title, 'Parent')
+        self.assertEqual(child.parent_section.lesson_id, lesson.id)
+        answer = Answer.objects.get(question__lesson=lesson)
+        self.assertEqual((answer.answer_text, answer.question.question_text), ('Because', 'Why?'))
+        choice = SurveyChoice.objects.get(question__survey__module=module)
+        self.assertEqual(choice.choice_text, 'Well')
+
+        # Nothing is shared with the original
+        original_ids = set(Lesson.objects.filter(module__course=self.course).values_list('id', flat=True))
+        self.assertNotIn(lesson.id, original_ids)
+        self.assertEqual(LessonSection.objects.filter(lesson__module__course=self.course).count(), 2)
+        self.assertEqual(Answer.objects.count(), 2)
+        self.assertEqual(SurveyChoice.objects.count(), 2)
+
+
+class ReorderTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='Passw0rd!', first_name='Test', last_name='Admin', role='ADMIN'
+        )
+        self.course = Course.objects.create(title='Course', description='Course', created_by=self.admin)
+        self.modules = [Module.objects.create(course=self.course, title=f'Module {i}', order=i) for i in range(3)]
+        self.course.refresh_from_db()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def reorder(self, ids, version):
+        return self.client.post(
+            f'/api/courses/{self.course.id}/modules/reorder/',
+            {'ids': [str(pk) for pk in ids], 'version': version}, format='json'
+        )
+
+    def test_reorders_and_bumps_the_version(self):
+        ids = [module.id for module in reversed(self.modules)]
+        response = self.reorder(ids, self.course.content_version)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], self.course.content_version + 1)
+        self.assertEqual(
+            list(Module.objects.filter(course=self.course).order_by('order').values_list('id', flat=True)), ids
+        )
+
+    def test_stale_version_conflicts(self):
+        version = self.course.content_version
+        self.reorder([module.id for module in reversed(self.modules)], version)
+        # A second editor still holding the old version
+        response = self.reorder([module.id for module in self.modules], version)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['version'], version + 1)
+        self.assertEqual(Module.objects.get(pk=self.modules[0].pk).order, 2)
+
+    def test_incomplete_ids_are_rejected(self):
+        response = self.reorder([self.modules[0].id], self.course.content_version)
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_parent_section_is_rejected(self):
+        lesson = Lesson.objects.create(module=self.modules[0], title='Lesson', content_type='TEXT')
+        section = LessonSection.objects.create(lesson=lesson, title='Section')
+        self.course.refresh_from_db()
+        response = self.client.post(
+            f'/api/courses/{self.course.id}/modules/{self.modules[0].id}/lessons/{lesson.id}/sections/reorder/',
+            {'ids': [str(section.id)], 'version': self.course.content_version, 'parent_section': 'not-a-uuid'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_nested_items_are_guarded_by_their_course(self):
+        lesson = Lesson.objects.create(module=self.modules[0], title='Lesson', content_type='TEXT')
+        sections = [LessonSection.objects.create(lesson=lesson, title=f'Section {i}', order=i) for i in range(2)]
+        self.course.refresh_from_db()
+        url = f'/api/courses/{self.course.id}/modules/{self.modules[0].id}/lessons/{lesson.id}/sections/reorder/'
+
+        response = self.client.post(
+            url, {'ids': [str(sections[1].id), str(sections[0].id)], 'version': self.course.content_version},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).content_version, response.data['version'])
+
+        missing_lesson = url.replace(str(lesson.id), str(uuid.uuid4()))
+        response = self.client.post(
+            missing_lesson, {'ids': [str(sections[0].id)], 'version': response.data['version']}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class MediaServeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'lesson_pdfs'))
+        with open(os.path.join(self.media_root, 'lesson_pdfs', 'notes.pdf'), 'wb') as f:
+            f.write(bytes(range(100)))
+
+    def get(self, path='lesson_pdfs/notes.pdf', **headers):
+        request = RequestFactory().get('/media/' + path, **headers)
+        request.user = AnonymousUser()
+        with override_settings(MEDIA_ROOT=self.media_root, MEDIA_SERVE_MODE='django'):
+            response = media.serve(request, path)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_serves_byte_ranges(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, len(body), response['Accept-Ranges']), (200, 100, 'bytes'))
+
+        response, body = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, bytes(range(10, 20)))
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+
+        response, body = self.get(HTTP_RANGE='bytes=-5')
+        self.assertEqual(body, bytes(range(95, 100)))
+
+        response, _ = self.get(HTTP_RANGE='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_validators(self):
+        response, _ = self.get()
+        etag = response['ETag']
+
+        response, body = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, body), (304, b''))
+
+        # A stale If-Range gets the whole file instead of the range
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, len(body)), (200, 100))
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual((response.status_code, len(body)), (206, 10))
+
+    def test_protected_prefixes_require_sign_in(self):
+        with override_settings(MEDIA_PROTECTED_PREFIXES=['lesson_pdfs/']):
+            response, _ = self.get()
+        self.assertEqual(response.status_code, 401)
+
+        with self.assertRaises(Http404):
+            self.get('../secret.txt')
+
+
+class ThumbnailVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+
+    def png(self, name):
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 400), 'teal').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_only_a_new_file_is_resized(self):
+        course = Course.objects.create(
+            title='Course', description='Course', created_by=self.user, thumbnail=self.png('cover.png')
+        )
+        self.assertEqual(sorted(course.thumbnail_variants['sizes'], key=int), ['320', '640', '800'])
+
+        with mock.patch('backend.images.make_derivatives') as make:
+            course.title = 'Renamed'
+            course.save()
+        make.assert_not_called()
+
+        course.thumbnail = self.png('other.png')
+        course.save()
+        self.assertEqual(course.thumbnail_variants['source'], course.thumbnail.name)
+
+    def test_unreadable_image_is_not_retried_on_every_save(self):
+        course = Course.objects.create(
+            title='Course', description='Course', created_by=self.user,
+            thumbnail=SimpleUploadedFile('broken.png', b'not an image', content_type='image/png')
+        )
+        course.refresh_from_db()
+        self.assertEqual(course.thumbnail_variants['sizes'], {})
+        self.assertIn('error', course.thumbnail_variants)
+
+        with mock.patch('backend.images.make_derivatives') as make:
+            course.save()
+        make.assert_not_called()
+
+    def variant_names(self, course):
+        return [name for variant in course.thumbnail_variants['sizes'].values() for name in variant.values()]
+
+    def test_sources_with_the_same_stem_keep_their_own_variants(self):
+        jpeg = io.BytesIO()
+        Image.new('RGB', (800, 400), 'navy').save(jpeg, 'JPEG')
+        first = Course.objects.create(
+            title='First', description='Course', created_by=self.user,
+            thumbnail=SimpleUploadedFile('photo.jpg', jpeg.getvalue(), content_type='image/jpeg')
+        )
+        second = Course.objects.create(
+            title='Second', description='Course', created_by=self.user, thumbnail=self.png('photo.png')
+        )
+
+        self.assertFalse(set(self.variant_names(first)) & set(self.variant_names(second)))
+        # Still the navy JPEG, not the teal PNG uploaded after it
+        with default_storage.open(first.thumbnail_variants['sizes']['320']['jpeg']) as variant:
+            self.assertLess(Image.open(variant).convert('RGB').getpixel((0, 0))[1], 60)
+        self.assertTrue(all(default_storage.exists(name) for name in self.variant_names(first)))
+
+    def test_replacing_a_thumbnail_deletes_its_old_variants(self):
+        course = Course.objects.create(
+            title='Course', description='Course', created_by=self.user, thumbnail=self.png('cover.png')
+        )
+        old = self.variant_names(course)
+        copy = clone_course(course, self.user)
+
+        course.thumbnail = self.png('other.png')
+        course.save()
+
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+        self.assertTrue(all(default_storage.exists(name) for name in self.variant_names(course)))
+        # The copy shares the old thumbnail file but not its variants
+        copy.refresh_from_db()
+        self.assertEqual(copy.thumbnail_variants['source'], copy.thumbnail.name)
+        self.assertTrue(all(default_storage.exists(name) for name in self.variant_names(copy)))
+
+
+class CatalogFilterTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        self.python = Course.objects.create(
+            title='Python basics', description='Course', created_by=user, status='PUBLISHED', duration_hours=3
+        )
+        self.rust = Course.objects.create(
+            title='Rust basics', description='Course', created_by=user, status='DRAFT', duration_hours=12
+        )
+
+    def test_catalog_applies_filters_and_facets(self):
+        response = self.client.get('/api/courses/catalog/', {'title': 'python', 'duration': '2_to_5'})
+
+        self.assertEqual([course['id'] for course in response.data['results']], [str(self.python.id)])
+        durations = {row['value']: row['count'] for row in response.data['facets']['duration']}
+        self.assertEqual(durations['2_to_5'], 1)
+
+    def test_other_actions_ignore_catalog_filters(self):
+        response = self.client.get(f'/api/courses/{self.rust.id}/', {'status': 'PUBLISHED'})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/courses/', {'title': 'python'})
+        self.assertEqual(response.data['count'], 2)
+
+
+class LessonNavigationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='learner@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+        )
+        self.course = Course.objects.create(title='Course', description='Course', created_by=self.user)
+        # Created out of order; navigation follows `order`
+        second = Module.objects.create(course=self.course, title='Second', order=1)
+        first = Module.objects.create(course=self.course, title='First', order=0)
+        self.lessons = [
+            Lesson.objects.create(module=module, title=f'{module.title} {i}', content_type='TEXT', order=i)
+            for module in (first, second) for i in range(2)
+        ]
+        self.course.refresh_from_db()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def navigate(self, lesson=None):
+        params = {'lesson': str(lesson.id)} if lesson else {}
+        return self.client.get(f'/api/courses/{self.course.id}/navigation/', params)
+
+    def test_previous_and_next_cross_module_boundaries(self):
+        data = self.navigate(self.lessons[1]).data
+
+        self.assertEqual(data['previous']['id'], str(self.lessons[0].id))
+        self.assertEqual(data['next']['id'], str(self.lessons[2].id))
+        self.assertEqual((data['position'], data['module']['title'], data['module']['position']), (1, 'First', 1))
+        self.assertIsNone(self.navigate(self.lessons[0]).data['previous'])
+        self.assertIsNone(self.navigate(self.lessons[3]).data['next'])
+
+    def test_resumes_after_the_last_finished_lesson(self):
+        self.assertEqual(self.navigate().data['resume']['id'], str(self.lessons[0].id))
+
+        UserProgress.objects.bulk_create([
+            UserProgress(user=self.user, lesson=self.lessons[0], is_completed=True),
+            # last_accessed is auto_now, so a later resume position marks the most recent lesson
+            UserProgress(user=self.user, lesson=self.lessons[2], is_completed=True,
+                         position_updated_at=timezone.now() + timedelta(minutes=1)),
+        ])
+        data = self.navigate().data
+        self.assertEqual(data['resume']['id'], str(self.lessons[3].id))
+        self.assertEqual((data['completed'], data['total']), (2, 4))
+        self.assertEqual(len(data['lessons']), 4)
+
+    def test_index_follows_reorders(self):
+        self.navigate()
+        self.lessons[0].order = 5
+        self.lessons[0].save()
+
+        self.assertEqual(self.navigate().data['lessons'][0]['id'], str(self.lessons[1].id))
+
+    def test_unknown_lesson_and_anonymous_requests(self):
+        response = self.client.get(f'/api/courses/{self.course.id}/navigation/', {'lesson': 'nope'})
+        self.assertEqual(response.status_code, 404)
+        response = APIClient().get(f'/api/courses/{self.course.id}/navigation/')
+        self.assertIn(response.status_code, (401, 403))
+
+
+class CourseBundleTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='Passw0rd!', first_name='Test', last_name='Admin', role='ADMIN'
+        )
+
+    def make_course(self):
+        course = Course.objects.create(title='Course', description='About', created_by=self.admin, duration_hours=4)
+        module = Module.objects.create(course=course, title='Module')
+        lesson = Lesson.objects.create(
+            module=module, title='Lesson', content_type='TEXT', content='<p>Body</p>',
+            pdf_file=SimpleUploadedFile('notes.pdf', b'%PDF-1.4 notes')
+        )
+        parent = LessonSection.objects.create(lesson=lesson, title='Parent')
+        LessonSection.objects.create(lesson=lesson, parent_section=parent, title='Child')
+        question = Question.objects.create(lesson=lesson, question_text='Why?', question_type='MCQ')
+        Answer.objects.create(question=question, answer_text='Because', is_correct=True)
+        survey = Survey.objects.create(module=module, title='Survey')
+        survey_question = SurveyQuestion.objects.create(survey=survey, question_text='How?', question_type='MCQ')
+        SurveyChoice.objects.create(question=survey_question, choice_text='Well')
+        return course
+
+    def bundle(self, **replace):
+        """A bundle zip of a fresh course, with the given members replaced"""
+        source = zipfile.ZipFile(io.BytesIO(b''.join(export_course(self.make_course()))))
+        out = io.BytesIO()
+        with source, zipfile.ZipFile(out, 'w') as target:
+            for name in source.namelist():
+                target.writestr(name, replace.get(name, source.read(name)))
+        out.seek(0)
+        return out
+
+    def test_round_trip_copies_content_and_files(self):
+        course, counts = import_course(self.bundle(), self.admin)
+
+        self.assertEqual(counts['sections'], 2)
+        self.assertEqual((course.title, course.duration_hours, course.status), ('Course', 4, 'DRAFT'))
+        lesson = Lesson.objects.get(module__course=course)
+        self.assertEqual(lesson.content_html, '<p>Body</p>')
+        with lesson.pdf_file.open('rb') as pdf:
+            self.assertEqual(pdf.read(), b'%PDF-1.4 notes')
+        child = LessonSection.objects.get(lesson=lesson, title='Child')
+        self.assertEqual(child.parent_section.lesson_id, lesson.id)
+        self.assertEqual(Answer.objects.get(question__lesson=lesson).answer_text, 'Because')
+        self.assertEqual(SurveyChoice.objects.get(question__survey__module__course=course).choice_text, 'Well')
+        self.assertEqual(Lesson.objects.count(), 2)
+
+    def test_malformed_bundles_are_rejected(self):
+        manifest = json.loads(zipfile.ZipFile(self.bundle()).read('manifest.json'))
+        untitled = dict(manifest, course=dict(manifest['course'], title=None))
+        for replace in (
+            {'lessons.jsonl': b'{"id": \n'},
+            {'lessons.jsonl': b'["not", "a", "row"]\n'},
+            {'modules.jsonl': json.dumps({'id': 'x', 'course_id': manifest['source_id'], 'order': 'first'})},
+            {'manifest.json': json.dumps(untitled)},
+        ):
+            bundle = self.bundle(**replace)
+            courses = Course.objects.count()
+            with self.assertRaises(BundleError):
+                import_course(bundle, self.admin)
+            self.assertEqual(Course.objects.count(), courses)
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile('course.zip', self.bundle(**{'lessons.jsonl': b'{'}).read())
+        response = client.post('/api/courses/import/', {'bundle': upload})
+        self.assertEqual(response.status_code, 400)
+
+
+class CourseTreeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_course(self, size):
+        course = Course.objects.create(title=f'Course {size}', description='Course', created_by=self.user)
+        for m in range(size):
+            module = Module.objects.create(course=course, title=f'Module {m}', order=m)
+            for i in range(size):
+                lesson = Lesson.objects.create(module=module, title=f'Lesson {m}.{i}', content_type='TEXT', order=i)
+                parent = LessonSection.objects.create(lesson=lesson, title='Parent')
+                LessonSection.objects.create(lesson=lesson, parent_section=parent, title='Child')
+                question = Question.objects.create(lesson=lesson, question_text='Why?', question_type='MCQ')
+                Answer.objects.create(question=question, answer_text='Because', is_correct=True)
+        return course
+
+    def tree(self, course, **headers):
+        return self.client.get(f'/api/courses/{course.id}/tree/', **headers)
+
+    def test_tree_nests_modules_lessons_sections_and_questions(self):
+        course = self.make_course(2)
+        data = json.loads(self.tree(course).content)
+
+        self.assertEqual((data['id'], data['title']), (str(course.id), 'Course 2'))
+        self.assertEqual([module['title'] for module in data['modules']], ['Module 0', 'Module 1'])
+        lesson = data['modules'][1]['lessons'][0]
+        self.assertEqual(lesson['title'], 'Lesson 1.0')
+        self.assertEqual([section['title'] for section in lesson['sections']], ['Parent'])
+        self.assertEqual([child['title'] for child in lesson['sections'][0]['subsections']], ['Child'])
+        self.assertEqual(lesson['questions'][0]['answers'][0]['answer_text'], 'Because')
+
+    def test_query_count_does_not_grow_with_the_course(self):
+        for size in (1, 4):
+            course = self.make_course(size)
+            # course + modules + lessons + sections + questions + answers
+            with self.assertNumQueries(6):
+                self.assertEqual(self.tree(course).status_code, 200)
+
+    def test_current_etag_is_not_modified(self):
+        course = self.make_course(1)
+        etag = self.tree(course)['ETag']
+
+        response = self.tree(course, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.tree(course, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_lesson_and_section_edits_change_the_etag(self):
+        course = self.make_course(1)
+        etag = self.tree(course)['ETag']
+
+        lesson = Lesson.objects.get(module__course=course)
+        lesson.title = 'Renamed'
+        lesson.save()
+        response = self.tree(course, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['modules'][0]['lessons'][0]['title'], 'Renamed')
+
+        etag = response['ETag']
+        section = LessonSection.objects.get(lesson=lesson, parent_section__isnull=True)
+        section.title = 'Intro'
+        section.save()
+        self.assertNotEqual(self.tree(course)['ETag'], etag)
+
+
+class SectionTreeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        self.course = Course.objects.create(title='Course', description='Course', created_by=self.user)
+        self.module = Module.objects.create(course=self.course, title='Module')
+
+    def make_lesson(self, order, depth):
+        """A lesson with two chains of sections nested `depth` levels deep"""
+        lesson = Lesson.objects.create(module=self.module, title=f'Lesson {order}', content_type='TEXT', order=order)
+        for branch in range(2):
+            parent = None
+            for level in range(depth):
+                parent = LessonSection.objects.create(
+                    lesson=lesson, parent_section=parent, title=f'{branch}.{level}', order=branch
+                )
+        return lesson
+
+    def test_any_depth_serializes_with_one_section_query(self):
+        for depth in (1, 4):
+            lessons = [self.make_lesson(i, depth) for i in range(3)]
+            queryset = Lesson.objects.filter(pk__in=[lesson.id for lesson in lessons]).order_by('order')
+            # lessons + sections
+            with self.assertNumQueries(2):
+                data = LessonSerializer(queryset, many=True).data
+
+            for lesson in data:
+                self.assertEqual(len(lesson['sections']), 2)
+                section, levels = lesson['sections'][0], 1
+                while section['subsections']:
+                    section, levels = section['subsections'][0], levels + 1
+                self.assertEqual((levels, section['title']), (depth, f'0.{depth - 1}'))
+
+    def test_uncovered_lessons_extend_the_cached_tree(self):
+        first, second = self.make_lesson(0, 3), self.make_lesson(1, 3)
+        context = {}
+        tree = get_section_tree(context, [first.id])
+
+        with self.assertNumQueries(1):
+            self.assertIs(get_section_tree(context, [first.id, second.id]), tree)
+        with self.assertNumQueries(0):
+            get_section_tree(context, [second.id])
+        self.assertEqual(len(tree.roots(first.id)), 2)
+        self.assertEqual(tree.roots(second.id)[0]['subsections'][0]['title'], '0.1')
+
+
+class CourseSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        self.course = Course.objects.create(
+            title='Course', description='Course', created_by=self.user, status='PUBLISHED'
+        )
+        module = Module.objects.create(course=self.course, title='Module')
+        self.lesson = Lesson.objects.create(module=module, title='Lesson', content_type='QUIZ')
+        self.question = Question.objects.create(lesson=self.lesson, question_text='Why?', question_type='MCQ')
+        self.answer = Answer.objects.create(question=self.question, answer_text='Because', is_correct=True)
+
+    def snapshot(self):
+        self.course.refresh_from_db()
+        return json.loads(get_course_snapshot(self.course))
+
+    def test_second_read_reuses_the_stored_bytes(self):
+        payload = get_course_snapshot(self.course)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_course_snapshot(self.course), payload)
+        self.assertEqual(bytes(CourseSnapshot.objects.get(course=self.course).payload), payload)
+
+    def test_quiz_edits_rebuild_the_snapshot(self):
+        self.snapshot()
+
+        for instance, field, value in ((self.question, 'question_text', 'How?'), (self.answer, 'answer_text', 'So')):
+            version = Course.objects.get(pk=self.course.pk).content_version
+            setattr(instance, field, value)
+            instance.save()
+            self.assertEqual(Course.objects.get(pk=self.course.pk).content_version, version + 1)
+
+            question = self.snapshot()['modules'][0]['lessons'][0]['questions'][0]
+            self.assertIn(value, (question['question_text'], question['answers'][0]['answer_text']))
+            # Only the current version is kept
+            self.assertEqual(CourseSnapshot.objects.filter(course=self.course).count(), 1)
+
+    def test_unpublished_courses_are_not_stored(self):
+        Course.objects.filter(pk=self.course.pk).update(status='DRAFT')
+
+        self.assertEqual(self.snapshot()['title'], 'Course')
+        self.assertFalse(CourseSnapshot.objects.filter(course=self.course).exists())
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+        self.courses = {
+            name: Course.objects.create(
+                title=name, description='Course', created_by=author,
+                status='DRAFT' if name == 'Draft' else 'PUBLISHED'
+            )
+            for name in ('Python', 'Django', 'SQL', 'Unused', 'Draft')
+        }
+        self.learners = {}
+        # Python is taken with Django three times and with SQL twice
+        for n, names in enumerate((
+            ('Python', 'Django', 'SQL'), ('Python', 'Django'), ('Python', 'SQL'), ('Python', 'Django', 'Draft'),
+        )):
+            learner = User.objects.create_user(
+                email=f'learner{n}@example.com', password='Passw0rd!', first_name='Test', last_name='Learner'
+            )
+            Enrollment.objects.bulk_create([Enrollment(user=learner, course=self.courses[name]) for name in names])
+            self.learners[n] = learner
+
+    def titles(self, recommendations):
+        return [recommendation.recommended.title for recommendation in recommendations]
+
+    def test_neighbours_are_ranked_by_co_enrollment(self):
+        build_recommendations(top_k=2)
+
+        self.assertEqual(self.titles(recommended_courses(self.courses['Python'])), ['Django', 'SQL'])
+        self.assertEqual(self.titles(recommended_courses(self.courses['SQL'])), ['Python', 'Django'])
+        # Drafts are never suggested and unused courses get nothing
+        self.assertFalse(CourseRecommendation.objects.filter(recommended=self.courses['Draft']).exists())
+        self.assertFalse(CourseRecommendation.objects.filter(course=self.courses['Unused']).exists())
+
+        build_recommendations(top_k=1)
+        self.assertEqual(self.titles(CourseRecommendation.objects.filter(course=self.courses['Python'])), ['Django'])
+
+    def test_own_enrollments_are_excluded_and_anonymous_requests_get_all(self):
+        call_command('build_course_recommendations', stdout=io.StringIO())
+        python = self.courses['Python']
+
+        self.assertEqual(self.titles(recommended_courses(python, self.learners[2])), ['Django'])
+        self.assertEqual(self.titles(recommended_courses(python, AnonymousUser())), ['Django', 'SQL'])
+
+        response = APIClient().get(f'/api/courses/{python.id}/recommended/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([course['title'] for course in response.data], ['Django', 'SQL'])
+
+    def test_courses_created_during_the_run_do_not_break_it(self):
+        enrollments = Enrollment.objects.values_list
+
+        def values_list(*fields, **kwargs):
+            # A course and an enrollment in it appear while the run is under way
+            course = Course.objects.create(
+                title='Late', description='Course', created_by=self.learners[0], status='PUBLISHED'
+            )
+            Enrollment.objects.create(user=self.learners[0], course=course)
+            return enrollments(*fields, **kwargs)
+
+        with mock.patch.object(Enrollment.objects, 'values_list', values_list):
+            build_recommendations()
+
+        self.assertEqual(self.titles(recommended_courses(self.courses['Python'])), ['Django', 'SQL', 'Late'])
+
+
+class DeleteSignalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='author@example.com', password='Passw0rd!', first_name='Test', last_name='Author'
+        )
+
+    def make_course(self, size):
+        course = Course.objects.create(title=f'Course {size}', description='Course', created_by=self.user)
+        for m in range(size):
+            module = Module.objects.create(course=course, title=f'Module {m}', order=m)
+            for i in range(size):
+                lesson = Lesson.objects.create(module=module, title=f'Lesson {m}.{i}', content_type='TEXT', order=i)
+                parent = LessonSection.objects.create(lesson=lesson, title='Parent')
+                LessonSection.objects.create(lesson=lesson, parent_section=parent, title='Child')
+                question = Question.objects.create(lesson=lesson, question_text='Why?', question_type='MCQ')
+                Answer.objects.create(question=question, answer_text='Because', is_correct=True)
+                UserProgress.objects.create(user=self.user, lesson=lesson)
+        return course
+
+    def search_rows(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT object_type FROM {search.SEARCH_TABLE} WHERE course_id = %s", [course_id.hex]
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+
+    def delete_queries(self, course):
+        with CaptureQueriesContext(connection) as queries:
+            course.delete()
+        return len(queries)
+
+    def test_course_delete_query_count_does_not_grow_with_its_content(self):
+        small, large = self.make_course(1), self.make_course(4)
+        large_id = large.id
+
+        self.assertEqual(self.delete_queries(small), self.delete_queries(large))
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(self.search_rows(large_id), [])
+
+    def test_queryset_delete_bumps_each_course_once(self):
+        course = self.make_course(2)
+        version = Course.objects.get(pk=course.pk).content_version
+        lessons = Lesson.objects.filter(module__course=course, module__order=0)
+        lesson_ids = {str(pk) for pk in lessons.values_list('pk', flat=True)}
+
+        lessons.delete()
+
+        self.assertEqual(Course.objects.get(pk=course.pk).content_version, version + 1)
+        self.assertEqual(set(Tombstone.objects.values_list('object_id', flat=True)), lesson_ids)
+        self.assertEqual(Tombstone.objects.get(object_id=lesson_ids.pop()).kind, 'lesson')
+        # The deleted lessons take their sections' search rows with them
+        self.assertEqual(self.search_rows(course.id), ['course', 'lesson', 'lesson'] + ['section'] * 4)
+
+    def test_direct_deletes_still_bump_and_leave_tombstones(self):
+        course = self.make_course(1)
+        question = Question.objects.get(lesson__module__course=course)
+        section = LessonSection.objects.get(lesson__module__course=course, parent_section=None)
+        version = Course.objects.get(pk=course.pk).content_version
+
+        question.answers.get().delete()
+        section.delete()
+
+        self.assertEqual(Course.objects.get(pk=course.pk).content_version, version + 2)
+        self.assertEqual(
+            sorted(Tombstone.objects.values_list('kind', flat=True)), ['answer', 'section', 'section']
+        )
+        self.assertEqual(self.search_rows(course.id), ['course', 'lesson'])
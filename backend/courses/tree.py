@@ -0,0 +1,142 @@
+from hashlib import md5
+from django.db import IntegrityError
+from rest_framework.renderers import JSONRenderer
+from .models import Module, Lesson, LessonSection, CourseSnapshot
+from .serializers import (
+    CourseTreeModuleSerializer, CourseTreeLessonSerializer, CourseTreeSectionSerializer
+)
+
+
+class SectionTree:
+    """
+    All sections of a set of lessons, fetched in one query and linked
+    parent -> children in memory, so any nesting depth costs the same.
+    """
+
+    def __init__(self, lesson_ids=None, context=None, sections=None):
+        self.lesson_ids = set()
+        self._roots = {}
+        self._children = {}
+        self.extend(lesson_ids, context, sections)
+
+    def extend(self, lesson_ids=None, context=None, sections=None):
+        """Add the sections of more lessons, keeping the ones already linked"""
+        if sections is None:
+            sections = LessonSection.objects.filter(lesson_id__in=list(lesson_ids)).order_by('order')
+        section_data = CourseTreeSectionSerializer(sections, many=True, context=context or {}).data
+
+        self.lesson_ids.update(str(lesson_id) for lesson_id in lesson_ids or [])
+        for section in section_data:
+            section['subsections'] = self._children.setdefault(str(section['id']), [])
+        for section in section_data:
+            self.lesson_ids.add(str(section['lesson']))
+            if section['parent_section']:
+                self._children.setdefault(str(section['parent_section']), []).append(section)
+            else:
+                self._roots.setdefault(str(section['lesson']), []).append(section)
+
+    def covers(self, lesson_id):
+        return str(lesson_id) in self.lesson_ids
+
+    def roots(self, lesson_id):
+        """Top-level sections of a lesson, each with nested subsections"""
+        return self._roots.get(str(lesson_id), [])
+
+    def children(self, section_id):
+        return self._children.get(str(section_id), [])
+
+
+def get_section_tree(context, lesson_ids):
+    """Return the section tree stored in the serializer context, building or extending it as needed"""
+    tree = context.get('section_tree')
+    if tree is None:
+        tree = SectionTree(lesson_ids, context)
+        context['section_tree'] = tree
+    else:
+        missing = [lesson_id for lesson_id in lesson_ids if not tree.covers(lesson_id)]
+        if missing:
+            tree.extend(missing, context)
+    return tree
+
+
+def course_content_key(course):
+    """Version key of the course content, derived from the course row alone"""
+    raw = f"{course.id}:{course.content_version}:{course.updated_at.isoformat()}"
+    return md5(raw.encode()).hexdigest()
+
+
+def course_tree_etag(course):
+    return '"%s"' % course_content_key(course)
+
+
+def build_course_tree(course, context=None):
+    """
+    Build modules -> lessons -> sections -> subsections for a course.
+
+    Uses one query per level (sections and subsections share a query,
+    answers are prefetched with the quiz questions) and links the rows
+    together in memory.
+    """
+    from assessments.models import Question
+    from assessments.serializers import QuestionSerializer
+
+    context = context or {}
+
+    modules = Module.objects.filter(course=course).order_by('order')
+    lessons = Lesson.objects.filter(module__course=course).order_by('order')
+    sections = LessonSection.objects.filter(lesson__module__course=course).order_by('order')
+
+    module_data = CourseTreeModuleSerializer(modules, many=True, context=context).data
+    lesson_data = CourseTreeLessonSerializer(lessons, many=True, context=context).data
+    section_tree = SectionTree(context=context, sections=sections)
+
+    questions = Question.objects.filter(lesson__module__course=course).order_by('order').prefetch_related('answers')
+    questions_by_lesson = {}
+    for question in QuestionSerializer(questions, many=True, context=context).data:
+        questions_by_lesson.setdefault(str(question['lesson']), []).append(question)
+
+    lessons_by_module = {}
+    for lesson in lesson_data:
+        lesson['sections'] = section_tree.roots(lesson['id'])
+        lesson['questions'] = questions_by_lesson.get(str(lesson['id']), [])
+        lessons_by_module.setdefault(str(lesson['module']), []).append(lesson)
+
+    for module in module_data:
+        module['lessons'] = lessons_by_module.get(str(module['id']), [])
+
+    return {
+        'id': str(course.id),
+        'title': course.title,
+        'description': course.description,
+        'status': course.status,
+        'content_version': course.content_version,
+        'modules': module_data,
+    }
+
+
+def get_course_snapshot(course):
+    """
+    Return the serialized course content as JSON bytes.
+
+    Published courses are served from CourseSnapshot; a missing snapshot
+    for the current version is built on first read and older versions
+    are dropped. Other courses are built on every request.
+    """
+    if course.status != 'PUBLISHED':
+        return JSONRenderer().render(build_course_tree(course))
+
+    version_key = course_content_key(course)
+    payload = CourseSnapshot.objects.filter(
+        course=course, version_key=version_key
+    ).values_list('payload', flat=True).first()
+    if payload is not None:
+        return bytes(payload)
+
+    payload = JSONRenderer().render(build_course_tree(course))
+    try:
+        CourseSnapshot.objects.create(course=course, version_key=version_key, payload=payload)
+    except IntegrityError:
+        # Another request built the same version first
+        pass
+    CourseSnapshot.objects.filter(course=course).exclude(version_key=version_key).delete()
+    return payload
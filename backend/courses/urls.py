@@ -45,6 +45,13 @@ urlpatterns = [
     path('user/progress/course/<uuid:course_id>/', views.UserProgressViewSet.as_view({
         'get': 'course_progress'
     }), name='course-progress'),
+    path('user/progress/sync/', views.UserProgressViewSet.as_view({
+        'post': 'sync'
+    }), name='sync-lesson-progress'),
+    path('user/progress/resume/', views.UserProgressViewSet.as_view({
+        'get': 'resume_positions',
+        'post': 'record_position'
+    }), name='lesson-resume-position'),
     path('user/progress/toggle/', views.UserProgressViewSet.as_view({
         'post': 'toggle_lesson_completion'
     }), name='toggle-lesson-completion'),
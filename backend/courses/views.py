@@ -1,17 +1,40 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.utils import timezone
 from rest_framework import status
-from django.db.models import Count
+from django.db.models import Count, F, Q
+from rest_framework.utils.urls import replace_query_param
 from django.shortcuts import get_object_or_404
-from .models import CourseCategory, Course, Module, Lesson, UserProgress, Enrollment, LessonSection, ModuleProgress
+from django.utils.cache import get_conditional_response
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse
+from django.utils.text import slugify
+from django.db import transaction
+from django.core.exceptions import ValidationError
+import uuid
+from .models import CourseCategory, Course, Module, Lesson, UserProgress, Enrollment, LessonSection, ModuleProgress, OfflinePackage
 from .serializers import (
     CourseCategorySerializer, CourseSerializer, 
     ModuleSerializer, LessonSerializer, LessonSectionSerializer,
-    UserProgressSerializer, ModuleProgressSerializer
+    UserProgressSerializer, ModuleProgressSerializer, ProgressEventSerializer,
+    BulkEnrollmentSerializer, ResumePositionSerializer
 )
+from .signals import complete_finished_modules
+from .tree import get_course_snapshot, course_tree_etag
+from .clone import clone_course
+from .bundle import export_course, import_course, BundleError
+from .reorder import ReorderMixin
+from .completion import course_completion_rates
+from .recommendations import recommended_courses
+from .filters import CourseFilter, CourseFacets
+from .navigation import navigation_index, lesson_navigation
+from .offline import get_package, build_delta
+from .sync import course_changes, decode_cursor
+from .dashboard import learner_dashboard, dashboard_etag
+from backend.pagination import StandardResultsSetPagination
+from backend import media
+from . import search, resume
 from users.models import User
 
 
@@ -31,6 +54,8 @@ class CourseViewSet(viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     parser_classes = [MultiPartParser, FormParser]
+    # Set per action; only the catalog takes course filters
+    filterset_class = None
    
 
     def get_permissions(self):
@@ -39,13 +64,63 @@ class CourseViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         
         # For other actions, use the original logic
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'tree', 'search']:
+            return [permissions.IsAuthenticated()]
+        # Actions that act on the signed-in user
+        if self.action in ['bulk_enroll', 'clone', 'export', 'import_bundle', 'navigation', 'sync',
+                           'offline', 'offline_delta', 'dashboard']:
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        """Get the full module/lesson/section/quiz tree for a course in one request"""
+        course = self.get_object()
+        etag = course_tree_etag(course)
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['Cache-Control'] = 'private, no-cache'
+            return not_modified
+
+        # Serve the pre-serialized snapshot bytes as-is, skipping DRF rendering
+        response = HttpResponse(get_course_snapshot(course), content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search over published courses, lessons and sections, grouped by course"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page_size = min(int(request.query_params.get('page_size', 10)), 50)
+        except ValueError:
+            page_size = 10
+
+        results, next_cursor = search.search(
+            query,
+            limit=page_size,
+            cursor=request.query_params.get('cursor')
+        )
+
+        next_url = None
+        if next_cursor:
+            params = request.query_params.copy()
+            params['cursor'] = next_cursor
+            next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+        return Response({
+            'next': next_url,
+            'results': results
+        })
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def approve(self, request, pk=None):
         course = self.get_object()
@@ -97,6 +172,273 @@ class CourseViewSet(viewsets.ModelViewSet):
             return Response({'success': True})
         return Response({'success': False, 'message': 'Already enrolled'}, status=400)
 
+    @action(detail=False, methods=['get'], filterset_class=CourseFilter)
+    def catalog(self, request):
+        """
+        Filtered, paginated courses plus per-facet counts (status, category,
+        duration band). Facet values are comma-separated, e.g.
+        ?category=<id>,<id>&duration=2_to_5&title=python&page=2
+        """
+        facets = CourseFacets(request.query_params)
+        counts, total = facets.counts()
+
+        paginator = StandardResultsSetPagination()
+        try:
+            page_size = paginator.get_page_size(request)
+            page = max(int(request.query_params.get(paginator.page_query_param, 1)), 1)
+        except ValueError:
+            page = 1
+        offset = (page - 1) * page_size
+        courses = facets.results().select_related('category').order_by(
+            '-is_featured', F('published_at').desc(nulls_last=True), '-created_at'
+        )[offset:offset + page_size]
+
+        url = request.build_absolute_uri()
+        return Response({
+            'count': total,
+            'next': replace_query_param(url, paginator.page_query_param, page + 1) if offset + page_size < total else None,
+            'previous': replace_query_param(url, paginator.page_query_param, page - 1) if page > 1 else None,
+            'results': self.get_serializer(courses, many=True).data,
+            'facets': counts,
+        })
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def navigation(self, request, pk=None):
+        """
+        Previous/next lessons for ?lesson=<id> and the lesson to resume, in
+        module then lesson order. Without ?lesson the whole index is returned.
+        """
+        course = get_object_or_404(Course, pk=pk)
+        lesson_id = request.query_params.get('lesson')
+        try:
+            data = lesson_navigation(course, request.user, lesson_id)
+        except ValidationError:
+            data = None
+        if data is None:
+            return Response({'error': 'Lesson not found in this course'}, status=status.HTTP_404_NOT_FOUND)
+        if lesson_id is None:
+            data.update(navigation_index(course))
+        return Response(data)
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def sync(self, request, pk=None):
+        """
+        Content and the user's progress changed since ?since=<cursor>, with the
+        ids deleted since then. Omit `since` for a full sync, then pass the
+        returned cursor on the next poll.
+        """
+        course = get_object_or_404(Course, pk=pk)
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = decode_cursor(since)
+            except (ValueError, OverflowError):
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(course_changes(course, request.user, since or None, self.get_serializer_context()))
+
+    def get_offline_course(self, request, pk):
+        """The course if the user may download it for offline use, else an error response"""
+        course = get_object_or_404(Course, pk=pk)
+        if request.user.role not in ['ADMIN', 'CONTENT_MANAGER'] and \
+                not Enrollment.objects.filter(user=request.user, course=course).exists():
+            return None, Response(
+                {'error': 'You are not enrolled in this course'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return course, None
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def offline(self, request, pk=None):
+        """
+        Download the offline package for the current content version. Byte
+        ranges are supported so interrupted downloads can resume.
+        """
+        course, error = self.get_offline_course(request, pk)
+        if error:
+            return error
+
+        package = get_package(course)
+        response = media.serve(request._request, package.file.name)
+        response['X-Package-Version'] = package.version_key
+        response['Content-Disposition'] = f'attachment; filename="{slugify(course.title) or "course"}-offline.zip"'
+        return response
+
+    @action(detail=True, methods=['get'], url_path='offline/delta', permission_classes=[permissions.IsAuthenticated])
+    def offline_delta(self, request, pk=None):
+        """
+        Changes since the package version in ?version=: a zip with the added
+        and changed items and a delta.json listing the removed ones. Answers
+        304 when the version is current and 410 when it is too old to diff,
+        in which case the client downloads the full package again.
+        """
+        course, error = self.get_offline_course(request, pk)
+        if error:
+            return error
+        version = request.query_params.get('version')
+        if not version:
+            return Response({'error': 'version is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        package = get_package(course)
+        if version == package.version_key:
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        since = OfflinePackage.objects.filter(course=course, version_key=version).first()
+        if since is None:
+            return Response(
+                {'error': 'Package version is unknown or too old, download the full package',
+                 'version': package.version_key},
+                status=status.HTTP_410_GONE
+            )
+
+        response = FileResponse(build_delta(package, since), content_type='application/zip')
+        response['X-Package-Version'] = package.version_key
+        response['Content-Disposition'] = f'attachment; filename="{slugify(course.title) or "course"}-delta.zip"'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def recommended(self, request, pk=None):
+        """Courses often taken by learners of this one, skipping those the user is enrolled in"""
+        course = get_object_or_404(Course, pk=pk)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), 20)
+        except ValueError:
+            limit = 5
+
+        recommendations = recommended_courses(course, request.user, limit)
+        courses = self.get_serializer([r.recommended for r in recommendations], many=True).data
+        for data, recommendation in zip(courses, recommendations):
+            data['score'] = round(recommendation.score, 4)
+            data['co_enrollments'] = recommendation.co_enrollments
+        return Response(courses)
+
+    @action(detail=True, methods=['post'], parser_classes=[JSONParser, MultiPartParser, FormParser],
+            permission_classes=[permissions.IsAuthenticated])
+    def clone(self, request, pk=None):
+        """Copy the course with all of its content into a new draft course"""
+        if request.user.role not in ['ADMIN', 'CONTENT_MANAGER']:
+            return Response(
+                {'error': 'Only admins and content managers can clone courses'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        course = self.get_object()
+        title = (request.data.get('title') or '').strip()[:200] or None
+        new_course = clone_course(course, request.user, title=title)
+        serializer = self.get_serializer(new_course)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def export(self, request, pk=None):
+        """Download the course with its content and files as a bundle zip"""
+        if request.user.role not in ['ADMIN', 'CONTENT_MANAGER']:
+            return Response(
+                {'error': 'Only admins and content managers can export courses'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        course = self.get_object()
+        response = StreamingHttpResponse(export_course(course), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{slugify(course.title) or "course"}.zip"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser],
+            permission_classes=[permissions.IsAuthenticated])
+    def import_bundle(self, request):
+        """Create a new draft course from an exported bundle zip"""
+        if request.user.role not in ['ADMIN', 'CONTENT_MANAGER']:
+            return Response(
+                {'error': 'Only admins and content managers can import courses'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if 'bundle' not in request.FILES:
+            return Response({'error': 'No bundle provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            course, counts = import_course(request.FILES['bundle'], request.user)
+        except BundleError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = self.get_serializer(course).data
+        data['imported'] = counts
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='bulk-enroll', parser_classes=[JSONParser],
+            permission_classes=[permissions.IsAuthenticated])
+    def bulk_enroll(self, request):
+        """Enroll a list of users (ids or emails) in one or more courses"""
+        if request.user.role not in ['ADMIN', 'CONTENT_MANAGER']:
+            return Response(
+                {'error': 'Only admins and content managers can bulk enroll users'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = BulkEnrollmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course_ids = list(dict.fromkeys(serializer.validated_data['courses']))
+        identifiers = list(dict.fromkeys(
+            identifier.strip() for identifier in serializer.validated_data['users'] if identifier.strip()
+        ))
+
+        # Each identifier is either a user id or an email; resolve them all in one query.
+        # Anything else cannot match a user and is reported as user_not_found.
+        keys = {}
+        for identifier in identifiers:
+            try:
+                keys[identifier] = ('id', User._meta.pk.to_python(identifier))
+            except ValidationError:
+                keys[identifier] = ('email', identifier.lower()) if '@' in identifier else None
+
+        user_ids = {}
+        users = User.objects.filter(
+            Q(id__in=[key[1] for key in keys.values() if key and key[0] == 'id']) |
+            Q(email__in=[key[1] for key in keys.values() if key and key[0] == 'email'])
+        ).values_list('id', 'email')
+        for user_id, email in users:
+            user_ids[('id', user_id)] = user_id
+            user_ids[('email', email.lower())] = user_id
+
+        courses = {course.id: course for course in Course.objects.filter(id__in=course_ids).only('id', 'title')}
+
+        pairs = {
+            (user_ids[keys[identifier]], course_id)
+            for identifier in identifiers if keys[identifier] in user_ids
+            for course_id in course_ids if course_id in courses
+        }
+        with transaction.atomic():
+            created = Enrollment.enroll_many(pairs)
+            notified = 0
+            if created and serializer.validated_data['notify']:
+                from notifications.signals import create_enrollment_notifications
+                notified = create_enrollment_notifications(
+                    (user_id, courses[course_id]) for user_id, course_id in created
+                )
+
+        results = []
+        summary = {'enrolled': 0, 'already_enrolled': 0, 'user_not_found': 0, 'course_not_found': 0}
+        for identifier in identifiers:
+            user_id = user_ids.get(keys[identifier])
+            for course_id in course_ids:
+                if course_id not in courses:
+                    row_status = 'course_not_found'
+                elif user_id is None:
+                    row_status = 'user_not_found'
+                elif (user_id, course_id) in created:
+                    row_status = 'enrolled'
+                else:
+                    row_status = 'already_enrolled'
+                summary[row_status] += 1
+                results.append({
+                    'user': identifier,
+                    'user_id': str(user_id) if user_id else None,
+                    'course_id': str(course_id),
+                    'status': row_status
+                })
+
+        return Response({
+            'summary': dict(summary, notifications=notified),
+            'results': results
+        })
+
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def enrollment(self, request, pk=None):
         course = self.get_object()
@@ -120,6 +462,24 @@ class CourseViewSet(viewsets.ModelViewSet):
             'enrollment_count': count
         })
     
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """
+        Enrolled courses with progress, certificates, the unread notification
+        count and recent quiz attempts in one request. The ETag covers all of
+        it, so an unchanged dashboard costs one query and a 304.
+        """
+        etag = dashboard_etag(request.user)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['Cache-Control'] = 'private, no-cache'
+            return not_modified
+
+        response = Response(learner_dashboard(request.user, self.get_serializer_context()))
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @action(detail=False, methods=['get'])
     def user_enrollments(self, request):
         """Get all courses the user is enrolled in"""
@@ -153,51 +513,22 @@ class CourseViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def completion_rates(self, request):
         """Get completion rates for all courses"""
-        courses = Course.objects.filter(status='PUBLISHED')
-        completion_data = []
-        
-        total_enrollments_all = 0
-        total_completions_all = 0
-        
-        for course in courses:
-            enrollments_count = Enrollment.objects.filter(course=course).count()
-            if enrollments_count == 0:
-                continue
-            
-            # Get total lessons once per course
-            total_lessons = Lesson.objects.filter(module__course=course).count()
-            if total_lessons == 0:
-                continue
-            
-            # Aggregated query to count users who have completed all lessons (percentage == 100)
-            completed_users = UserProgress.objects.filter(
-                lesson__module__course=course,
-                is_completed=True,
-                user__enrollment__course=course  # Ensure only enrolled users
-            ).values('user').annotate(
-                completed_count=Count('lesson')
-            ).filter(
-                completed_count=total_lessons
-            ).count()
-            
-            completion_rate = round((completed_users / enrollments_count) * 100, 2) if enrollments_count > 0 else 0
-            
-            completion_data.append({
-                'course_id': str(course.id),
-                'course_title': course.title,
-                'enrollments': enrollments_count,
-                'completions': completed_users,
-                'completion_rate': completion_rate
-            })
-            
-            total_enrollments_all += enrollments_count
-            total_completions_all += completed_users
-        
-        # Calculate overall completion rate
-        overall_rate = round((total_completions_all / total_enrollments_all) * 100, 2) if total_enrollments_all > 0 else 0
-        
+        rates = course_completion_rates()
+        # Courses nobody is enrolled in, or without lessons, are left out of the list
+        completion_data = [
+            {
+                'course_id': str(row['course_id']),
+                'course_title': row['course_title'],
+                'enrollments': row['total_enrollments'],
+                'completions': row['completed_enrollments'],
+                'completion_rate': row['completion_rate']
+            }
+            for row in rates['courses']
+            if row['total_enrollments'] and row['total_lessons']
+        ]
+
         return Response({
-            'overall_completion_rate': overall_rate,
+            'overall_completion_rate': rates['overall_completion_rate'],
             'courses': completion_data
         })
     @action(detail=False, methods=['get'])
@@ -214,9 +545,11 @@ class CourseViewSet(viewsets.ModelViewSet):
         
         return Response(data)
 
-class ModuleViewSet(viewsets.ModelViewSet):
+class ModuleViewSet(ReorderMixin, viewsets.ModelViewSet):
     serializer_class = ModuleSerializer
     permission_classes = [permissions.IsAuthenticated]  
+    reorder_parent_kwarg = 'course_pk'
+    reorder_course_field = 'pk'
 
     def get_queryset(self):
         return Module.objects.filter(course_id=self.kwargs['course_pk'])
@@ -277,10 +610,12 @@ class ModuleProgressViewSet(viewsets.GenericViewSet):
         serializer = ModuleProgressSerializer(progress)
         return Response(serializer.data)
 
-class LessonViewSet(viewsets.ModelViewSet):
+class LessonViewSet(ReorderMixin, viewsets.ModelViewSet):
     serializer_class = LessonSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    reorder_parent_kwarg = 'module_pk'
+    reorder_course_field = 'modules'
 
     def get_queryset(self):
         return Lesson.objects.filter(module_id=self.kwargs['module_pk'])
@@ -303,18 +638,29 @@ class LessonViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def with_sections(self, request, course_pk=None, module_pk=None):
         lessons = Lesson.objects.filter(module_id=module_pk).order_by('order')
-        lessons = lessons.prefetch_related('sections', 'sections__subsections')
         serializer = self.get_serializer(lessons, many=True)
         return Response(serializer.data)
 
-class LessonSectionViewSet(viewsets.ModelViewSet):
+class LessonSectionViewSet(ReorderMixin, viewsets.ModelViewSet):
     serializer_class = LessonSectionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    reorder_parent_kwarg = 'lesson_pk'
+    reorder_course_field = 'modules__lessons'
 
     def get_queryset(self):
         lesson_id = self.kwargs.get('lesson_pk')
         return LessonSection.objects.filter(lesson_id=lesson_id).order_by('order')
 
+    def get_reorder_queryset(self):
+        # Sections are ordered among their siblings; omit parent_section for top-level sections
+        parent_section = self.request.data.get('parent_section') or None
+        if parent_section is not None:
+            try:
+                parent_section = uuid.UUID(str(parent_section))
+            except ValueError:
+                raise ValueError('parent_section is not a valid id')
+        return self.get_queryset().filter(parent_section_id=parent_section)
+
     def perform_create(self, serializer):
         lesson = get_object_or_404(Lesson, id=self.kwargs.get('lesson_pk'))
         parent_section_id = self.request.data.get('parent_section')
@@ -441,6 +787,122 @@ class UserProgressViewSet(viewsets.ModelViewSet):
         
         return Response(progress_data)
 
+    @action(detail=False, methods=['post'])
+    def record_position(self, request):
+        """
+        Resume-position heartbeat. Only the latest position per lesson is
+        kept in memory and written to the database on the next flush.
+        """
+        serializer = ResumePositionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        resume.buffer.record(request.user.id, data['lesson'], data.get('section'), data['position'])
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'])
+    def resume_positions(self, request):
+        """Where the learner left off, for ?lesson=<id> or every lesson of ?course=<id>"""
+        lessons = Lesson.objects.all()
+        try:
+            if request.query_params.get('lesson'):
+                lessons = lessons.filter(id=request.query_params['lesson'])
+            elif request.query_params.get('course'):
+                lessons = lessons.filter(module__course_id=request.query_params['course'])
+            else:
+                return Response({'error': 'lesson or course is required'}, status=status.HTTP_400_BAD_REQUEST)
+            positions = resume.resume_positions(request.user, lessons)
+        except ValidationError:
+            return Response({'error': 'Invalid id'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({str(lesson_id): position for lesson_id, position in positions.items()})
+
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Apply a batch of offline progress events in one transaction.
+
+        Events are idempotent: the latest event per lesson (by client
+        timestamp) sets the completion flag, unless the stored flag was set
+        later, so a batch replayed late cannot undo newer progress. Module
+        completion is recomputed once for the affected modules and course
+        progress is returned.
+        """
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected an object with an events list'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ProgressEventSerializer(data=request.data.get('events', []), many=True)
+        serializer.is_valid(raise_exception=True)
+
+        now = timezone.now()
+        latest = {}
+        for event in serializer.validated_data:
+            timestamp = min(event.get('client_timestamp') or now, now)
+            current = latest.get(event['lesson'])
+            if current is None or timestamp >= current[1]:
+                latest[event['lesson']] = (event['is_completed'], timestamp)
+
+        lessons = {
+            row['id']: row for row in
+            Lesson.objects.filter(id__in=latest.keys()).values('id', 'module_id', 'module__course_id')
+        }
+        ignored = [str(lesson_id) for lesson_id in latest if lesson_id not in lessons]
+
+        with transaction.atomic():
+            existing = {
+                progress.lesson_id: progress for progress in
+                UserProgress.objects.select_for_update().filter(user=request.user, lesson_id__in=lessons.keys())
+            }
+            to_create = []
+            to_update = []
+            stale = []
+            for lesson_id in lessons:
+                is_completed, timestamp = latest[lesson_id]
+                progress = existing.get(lesson_id)
+                if progress is None:
+                    to_create.append(UserProgress(
+                        user=request.user,
+                        lesson_id=lesson_id,
+                        is_completed=is_completed,
+                        completed_at=timestamp if is_completed else None,
+                        completion_updated_at=timestamp
+                    ))
+                    continue
+                # Rows completed before completion_updated_at existed only have completed_at
+                applied_at = progress.completion_updated_at or progress.completed_at
+                if applied_at is not None and timestamp < applied_at:
+                    stale.append(str(lesson_id))
+                    continue
+                if progress.is_completed == is_completed and timestamp == applied_at:
+                    # Replay of the event already applied
+                    continue
+                progress.is_completed = is_completed
+                progress.completed_at = (progress.completed_at or timestamp) if is_completed else None
+                progress.completion_updated_at = timestamp
+                progress.last_accessed = now
+                progress.updated_at = now
+                to_update.append(progress)
+
+            UserProgress.objects.bulk_create(to_create, ignore_conflicts=True)
+            UserProgress.objects.bulk_update(
+                to_update, ['is_completed', 'completed_at', 'completion_updated_at', 'last_accessed', 'updated_at']
+            )
+
+            module_ids = {lessons[p.lesson_id]['module_id'] for p in to_create + to_update if p.is_completed}
+            if module_ids:
+                complete_finished_modules(request.user.id, module_ids)
+
+        course_ids = {row['module__course_id'] for row in lessons.values()}
+        courses = []
+        for course in Course.objects.filter(id__in=course_ids):
+            progress = UserProgress.get_course_progress(request.user, course)
+            progress['course_id'] = str(course.id)
+            courses.append(progress)
+
+        return Response({
+            'applied': len(to_create) + len(to_update),
+            'ignored': ignored,
+            'stale': stale,
+            'courses': courses
+        })
+
     @action(detail=False, methods=['post'])
     def toggle_lesson_completion(self, request):
         lesson_id = request.data.get('lesson')
@@ -38,6 +38,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['recipient', 'created_at']),
         ]
     
     def __str__(self):
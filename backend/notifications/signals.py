@@ -65,6 +65,37 @@ def notify_course_enrollment(sender, instance, created, **kwargs):
                 action_url=reverse('course-detail', kwargs={'pk': instance.course.id})
             )
 
+def create_enrollment_notifications(enrollments, batch_size=1000):
+    """Bulk version of notify_course_enrollment for (user_id, course) pairs"""
+    enrollments = list(enrollments)
+    subscribed = set(
+        NotificationPreference.objects.filter(
+            user_id__in={user_id for user_id, _ in enrollments},
+            course_updates=True
+        ).values_list('user_id', flat=True)
+    )
+
+    action_urls = {}
+    notifications = []
+    for user_id, course in enrollments:
+        if user_id not in subscribed:
+            continue
+        if course.id not in action_urls:
+            action_urls[course.id] = reverse('course-detail', kwargs={'pk': course.id})
+        notifications.append(Notification(
+            recipient_id=user_id,
+            title="Course Enrollment",
+            message=f"You have enrolled in '{course.title}'",
+            notification_type='COURSE',
+            priority='MEDIUM',
+            related_object_id=course.id,
+            related_content_type='course',
+            action_url=action_urls[course.id]
+        ))
+
+    Notification.objects.bulk_create(notifications, batch_size=batch_size)
+    return len(notifications)
+
 
 # Assessment notifications
 @receiver(post_save, sender=UserAttempt)
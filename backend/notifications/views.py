@@ -7,10 +7,12 @@ from django.db.models import Q
 from .models import Notification, NotificationPreference
 from .serializers import NotificationSerializer, NotificationPreferenceSerializer
 from users.models import User
+from backend.pagination import KeysetPagination
 
 class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user)
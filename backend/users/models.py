@@ -55,6 +55,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     last_name = models.CharField(max_length=100)
     gender = models.CharField(max_length=10)
     profile_image = models.ImageField(upload_to='profile_images/', null=True, blank=True)
+    # Resized copies of the profile image, see backend.images
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     phone = models.CharField(max_length=20)
     date_of_birth = models.CharField(max_length=20)
     county = models.CharField(max_length=100)
@@ -79,6 +81,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['role', 'date_joined']),
+            models.Index(fields=['date_joined']),
+        ]
+
     def __str__(self):
         return f"{self.email} ({self.get_role_display()})"
 
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import User
+from backend.images import variant_urls
 from django.contrib.auth import authenticate
 from django.core.exceptions import ValidationError
 import re
@@ -23,16 +24,21 @@ def validate_password_complexity(password):
 
 class UserSerializer(serializers.ModelSerializer):
     profile_image = serializers.ImageField(required=False, allow_null=True)
+    profile_image_variants = serializers.SerializerMethodField()
     class Meta:
         model = User
         fields = [
             'id', 'email', 'first_name', 'last_name', 'role', 'gender', 'phone',
             'date_of_birth', 'county', 'education', 'innovation', 'innovation_stage',
             'innovation_in_whitebox', 'innovation_industry', 'training', 'training_institution',
-            'date_joined', 'profile_image', 'is_verified'
+            'date_joined', 'profile_image', 'profile_image_variants', 'is_verified'
         ]
         read_only_fields = ['id', 'date_joined', 'is_verified']
 
+    def get_profile_image_variants(self, obj):
+        """Resized avatars by width, as WebP and JPEG"""
+        return variant_urls(obj.profile_image_variants, self.context.get('request'))
+
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
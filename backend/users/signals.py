@@ -4,6 +4,7 @@ from django.urls import reverse
 from django.utils import timezone
 from .models import User
 from notifications.models import Notification
+from backend.images import refresh_derivatives, AVATAR_WIDTHS
 
 # @receiver(post_save, sender=User)
 # def handle_user_signup(sender, instance, created, **kwargs):
@@ -51,4 +52,9 @@ def handle_first_login(sender, instance, **kwargs):
         # Save without triggering the signal again
         User.objects.filter(pk=instance.pk).update(
             first_login_notification_sent=True
-        )
\ No newline at end of file
+        )
+
+@receiver(post_save, sender=User)
+def update_profile_image_variants(sender, instance, **kwargs):
+    """Resize a new profile image to the avatar widths"""
+    refresh_derivatives(instance, 'profile_image', 'profile_image_variants', AVATAR_WIDTHS)
@@ -4,14 +4,14 @@ from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.core.files.storage import default_storage
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.core.files.base import ContentFile
 from django.utils import timezone
 from django.db.models import Count
 from datetime import timedelta
 from .email_utils import send_verification_email, send_password_reset_email
 import os
 import uuid
-from rest_framework.pagination import PageNumberPagination
+from backend.pagination import KeysetPagination
+from backend.images import variant_urls
 from rest_framework import filters
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import User
@@ -100,16 +100,17 @@ class ProfileImageView(APIView):
                 if os.path.exists(old_image_path):
                     os.remove(old_image_path)
 
-            # Save new image
+            # Save new image; storage copies the upload in chunks
             file_name = f"profile_images/user_{request.user.id}_{profile_image.name}"
-            file_path = default_storage.save(file_name, ContentFile(profile_image.read()))
+            file_path = default_storage.save(file_name, profile_image)
             
-            # Update user profile
+            # Update user profile; the post_save receiver replaces the resized variants
             request.user.profile_image = file_path
             request.user.save()
 
             return Response({
-                'profile_image_url': request.user.profile_image.url
+                'profile_image_url': request.user.profile_image.url,
+                'profile_image_variants': variant_urls(request.user.profile_image_variants, request)
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -118,26 +119,29 @@ class ProfileImageView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class UserPagination(KeysetPagination):
+    ordering = ('date_joined', 'id')
+
+class UserSelectionPagination(KeysetPagination):
+    page_size = 100
+    max_page_size = 500
+    ordering = ('email',)
+
 class UserListView(generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]  
-    pagination_class = None
+    pagination_class = UserPagination
 
 class UserDetailView(generics.RetrieveAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
 class LearnerListView(generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = UserPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['email', 'first_name', 'last_name']
     
@@ -580,7 +584,7 @@ class UserSelectionListView(generics.ListAPIView):
     """
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = None
+    pagination_class = UserSelectionPagination
     
     def get_queryset(self):
         return User.objects.filter(is_active=True).order_by('email')
\ No newline at end of file
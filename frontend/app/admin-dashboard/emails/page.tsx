@@ -57,12 +57,20 @@ export default function BulkEmailPage() {
     try {
       setLoading(true);
       // Use the new endpoint for user selection
-      const response = await usersApi.getUsersForSelection();
-      
-      if (response.data) {
-        setUsers(response.data);
-      }
-      if (response.error) setError(response.error);
+      // The selection endpoint is cursor paginated; follow it to the end
+      const allUsers: User[] = [];
+      let cursor = '';
+      do {
+        const response = await usersApi.getUsersForSelection(cursor);
+        if (response.error) {
+          setError(response.error);
+          break;
+        }
+        allUsers.push(...(response.data?.results || []));
+        const next = response.data?.next;
+        cursor = next ? new URL(next).searchParams.get('cursor') || '' : '';
+      } while (cursor);
+      setUsers(allUsers);
     } catch (err) {
       setError('An error occurred while fetching users');
     } finally {
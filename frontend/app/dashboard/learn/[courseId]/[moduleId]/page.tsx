@@ -354,7 +354,7 @@ export default function ModulePage() {
               contentRefs.current[`${lesson.id}-main`] = el 
             }}
             className="lesson-content formatted-content" 
-            dangerouslySetInnerHTML={{ __html: lesson.content }}
+            dangerouslySetInnerHTML={{ __html: lesson.content_html ?? '' }}
             data-lesson-id={lesson.id}
             data-content-type="main"
             onClick={() => {
@@ -422,7 +422,7 @@ export default function ModulePage() {
                       contentRefs.current[`${lesson.id}-section-${sectionIndex}`] = el 
                     }}
                     className="formatted-content"
-                    dangerouslySetInnerHTML={{ __html: section.content }} 
+                    dangerouslySetInnerHTML={{ __html: section.content_html ?? '' }} 
                     data-lesson-id={lesson.id}
                     data-content-type="section"
                     onClick={() => {
@@ -458,7 +458,7 @@ export default function ModulePage() {
                               contentRefs.current[`${lesson.id}-subsection-${sectionIndex}-${subIndex}`] = el 
                             }}
                             className="formatted-content"
-                            dangerouslySetInnerHTML={{ __html: sub.content }} 
+                            dangerouslySetInnerHTML={{ __html: sub.content_html ?? '' }} 
                             data-lesson-id={lesson.id}
                             data-content-type="subsection"
                             onClick={() => {
@@ -2,7 +2,7 @@
 'use client'
 
 import { useAuth } from '@/context/AuthContext'
-import { assessmentsApi } from '@/lib/api'
+import { assessmentsApi, UserAttempt } from '@/lib/api'
 import { useEffect, useState } from 'react'
 import { Card, Table, ProgressBar, Badge, Spinner, Alert, Form } from 'react-bootstrap'
 import ProtectedRoute from '@/components/ProtectedRoute'
@@ -39,34 +39,42 @@ export default function MyScoresPage() {
     const fetchScores = async () => {
       try {
         setLoading(true)
-        const response = await assessmentsApi.getUserAttempts()
+        // Attempts are cursor paginated; follow them to the end so the stats cover every attempt
+        const allAttempts: UserAttempt[] = []
+        let cursor = ''
+        do {
+          const response = await assessmentsApi.getUserAttempts(cursor)
+          if (response.error) {
+            setError(response.error)
+            return
+          }
+          allAttempts.push(...Object.values(response.data?.data || {}))
+          const next = response.data?.next
+          cursor = next ? new URL(next).searchParams.get('cursor') || '' : ''
+        } while (cursor)
 
-        if (response.data) {
-          const attemptsArray: CleanAttempt[] = Object.values(response.data.data || {})
-            .filter((attempt): attempt is NonNullable<typeof attempt> => !!attempt)
-            .map(attempt => {
-              let scoreValue = 0;
-              if (typeof attempt.score === 'number') {
-                scoreValue = attempt.score;
-              } else if (attempt.score && typeof attempt.score === 'object') {
-                scoreValue = typeof attempt.score.parsedValue === 'number' 
-                  ? attempt.score.parsedValue 
-                  : parseFloat(attempt.score.source) || 0;
-              }
+        const attemptsArray: CleanAttempt[] = allAttempts
+          .filter((attempt): attempt is NonNullable<typeof attempt> => !!attempt)
+          .map(attempt => {
+            let scoreValue = 0;
+            if (typeof attempt.score === 'number') {
+              scoreValue = attempt.score;
+            } else if (attempt.score && typeof attempt.score === 'object') {
+              scoreValue = typeof attempt.score.parsedValue === 'number' 
+                ? attempt.score.parsedValue 
+                : parseFloat(attempt.score.source) || 0;
+            }
 
-              return {
-                id: attempt.id,
-                score: scoreValue,
-                passed: attempt.passed,
-                attempt_date: attempt.attempt_date,
-                lesson: attempt.lesson,
-              };
-            });
+            return {
+              id: attempt.id,
+              score: scoreValue,
+              passed: attempt.passed,
+              attempt_date: attempt.attempt_date,
+              lesson: attempt.lesson,
+            };
+          });
 
-          setAttempts(attemptsArray);
-        } else if (response.error) {
-          setError(response.error);
-        }
+        setAttempts(attemptsArray);
       } catch (err) {
         setError('Failed to fetch scores. Please try again later.');
         console.error('Error fetching scores:', err);
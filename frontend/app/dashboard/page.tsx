@@ -7,7 +7,7 @@ import LearnerSidebar from '@/components/LearnerSidebar'
 import TopNavbar from '@/components/TopNavbar'
 import { Progress } from '@/components/ui/progress'
 import { useEffect, useState } from 'react'
-import { coursesApi, certificatesApi } from '@/lib/api'
+import { coursesApi } from '@/lib/api'
 import { Menu } from 'lucide-react'
 
 interface CourseProgress {
@@ -33,39 +33,20 @@ export default function DashboardPage() {
       try {
         setLoading(true)
         
-        // Fetch all data in parallel
-        const [enrollmentsRes, certificatesRes] = await Promise.all([
-          coursesApi.getUserEnrollments(),
-          certificatesApi.getUserCertificates(),
-        ])
-    
-        // Initialize progress data
-        let completedCourses = 0
-        const progressData: CourseProgress[] = []
-    
-        // Process enrollments to get progress for each course
-        if (enrollmentsRes.data) {
-          for (const enrollment of enrollmentsRes.data) {
-            const progressRes = await coursesApi.getCourseProgress(enrollment.course_id)
-            if (progressRes.data) {
-              progressData.push({
-                course_id: enrollment.course_id,
-                course_title: enrollment.course_title,
-                percentage: progressRes.data.percentage || 0
-              })
-              if (progressRes.data.percentage === 100) {
-                completedCourses++
-              }
-            }
-          }
-        }
+        // Enrollments, progress and certificates come back in one request
+        const dashboardRes = await coursesApi.getDashboard()
+        const dashboard = dashboardRes.data
     
         setStats({
-          enrolledCourses: enrollmentsRes.data?.length || 0,
-          completedCourses,
-          certificatesCount: certificatesRes.data?.results?.length || 0
+          enrolledCourses: dashboard?.stats.enrolled_courses || 0,
+          completedCourses: dashboard?.stats.completed_courses || 0,
+          certificatesCount: dashboard?.stats.certificates || 0
         })
-        setCourseProgress(progressData)
+        setCourseProgress((dashboard?.courses || []).map((course) => ({
+          course_id: course.course_id,
+          course_title: course.course_title,
+          percentage: course.percentage || 0
+        })))
       } catch (error) {
         console.error('Error fetching dashboard data:', error)
       } finally {
@@ -115,7 +115,7 @@ export default function LearnerSidebar({
           <div className="avatar d-flex align-items-center justify-content-center mx-auto mb-2">
             {user?.profile_image ? (
               <img
-                src={user.profile_image}
+                src={user.profile_image_variants?.['128']?.jpeg || user.profile_image}
                 alt={`${user.first_name} ${user.last_name}`}
                 className="rounded-circle object-cover"
                 style={{ 
@@ -26,7 +26,7 @@ export default function ProfileDropdown({ user }: { user: User }) {
     <Dropdown show={showDropdown} onToggle={(isOpen) => setShowDropdown(isOpen)}>
       <Dropdown.Toggle variant="light" id="dropdown-profile" className="d-flex align-items-center">
         <Image
-          src={user?.profile_image || '/images/default-profile.png'} // Use profile_image
+          src={user?.profile_image_variants?.['128']?.jpeg || user?.profile_image || '/images/default-profile.png'} // Use profile_image
           roundedCircle
           width={40}
           height={40}
@@ -16,6 +16,7 @@ interface User {
   date_registered: string;
   gender: string;
   profile_image: string | null;
+  profile_image_variants?: Record<string, { webp: string; jpeg: string }>;
   phone: string;
   date_of_birth: string;
   county: string;
@@ -178,7 +178,10 @@ export const usersApi = {
     };
   }>('/auth/bulk-email/', 'POST', data),
 
-  getUsersForSelection: () => apiRequest<User[]>('/auth/users/selection/'),
+  getUsersForSelection: (cursor: string = '') =>
+    apiRequest<{results: User[]; next: string | null; previous: string | null}>(
+      `/auth/users/selection/${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`
+    ),
 };
 
 // Courses API
@@ -301,6 +304,7 @@ markModuleCompleted: (moduleId: string) =>
   getTotalEnrollments: () => apiRequest<{ total_enrollments: number }>('/courses/enrollments/total/'),
   // getUserEnrollments: () => apiRequest<{course_id: string}[]>('/courses/user/enrollments/'),
   getUserEnrollments: () => apiRequest<{ course_id: string; course_title: string }[]>('/courses/user/enrollments/'),
+  getDashboard: () => apiRequest<LearnerDashboard>('/courses/dashboard/'),
   getCourseEnrollments: (courseId: string) => 
     apiRequest<{ course_id: string; course_title: string; enrollment_count: number }>(
       `/courses/${courseId}/enrollments/`
@@ -331,7 +335,10 @@ getQuestions: (lessonId: string) => apiRequest<PaginatedResponse<Question>>(`/as
     apiRequest<Question>(`/assessments/lessons/${lessonId}/questions/${questionId}/`, 'PUT', question),
   deleteQuestion: (lessonId: string, questionId: string) => 
     apiRequest(`/assessments/lessons/${lessonId}/questions/${questionId}/`, 'DELETE'),
-  getUserAttempts: () => apiRequest<{ status: string; data: { [key: string]: UserAttempt }; count: number }>(`/assessments/user-attempts/`),
+  getUserAttempts: (cursor: string = '') =>
+    apiRequest<{ status: string; data: { [key: string]: UserAttempt }; next: string | null; previous: string | null }>(
+      `/assessments/user-attempts/${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`
+    ),
 
 
 
@@ -568,6 +575,8 @@ export interface User {
   date_registered: string;
   gender: string;
   profile_image: string | null;
+  // Resized avatars keyed by width ('64', '128', '256')
+  profile_image_variants?: Record<string, { webp: string; jpeg: string }>;
   phone: string;
   date_of_birth: string;
   county: string;
@@ -643,6 +652,11 @@ export interface Lesson {
   title: string;
   content_type: string;
   content: string;
+  // Sanitized and summarised by the backend when saved
+  content_html?: string;
+  excerpt?: string;
+  word_count?: number;
+  reading_minutes?: number;
   duration_minutes: number;
   order: number;
   is_required: boolean;
@@ -657,6 +671,11 @@ export interface LessonSection {
   lesson: string | Lesson;
   title: string;
   content: string;
+  // Sanitized and summarised by the backend when saved
+  content_html?: string;
+  excerpt?: string;
+  word_count?: number;
+  reading_minutes?: number;
   order: number;
   is_subsection: boolean;
   parent_section: string | LessonSection | null;
@@ -836,6 +855,48 @@ export interface UserAttempt {
   responses?: UserResponse[];
 }
 
+export interface LearnerDashboard {
+  stats: {
+    enrolled_courses: number;
+    completed_courses: number;
+    certificates: number;
+    unread_notifications: number;
+    quiz_attempts: number;
+    quizzes_passed: number;
+    average_score: number;
+  };
+  courses: Array<{
+    course_id: string;
+    course_title: string;
+    thumbnail_url: string | null;
+    enrolled_at: string;
+    last_accessed: string | null;
+    completed: number;
+    total: number;
+    percentage: number;
+    completed_modules: string[];
+    completed_modules_count: number;
+    total_modules_count: number;
+    is_course_completed: boolean;
+  }>;
+  certificates: Array<{
+    id: string;
+    course_id: string;
+    course_title: string;
+    certificate_number: string;
+    issued_date: string;
+    pdf_url: string | null;
+    verification_url: string;
+  }>;
+  recent_attempts: Array<{
+    id: string;
+    score: number;
+    passed: boolean;
+    attempt_date: string;
+    lesson: { title: string; module: { title: string; course: { title: string } } };
+  }>;
+}
+
 export interface UserResponse {
   id: string;
   attempt: string | UserAttempt;